@@ -0,0 +1,123 @@
+"""
+Micro-batching de búsquedas concurrentes
+Agrupa las queries individuales que llegan dentro de una ventana corta y las ejecuta
+como un solo lote (un paso de embeddings y una búsqueda en el índice)
+"""
+import asyncio
+import bisect
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+from langchain_core.documents import Document
+
+# Límites superiores de los buckets de los histogramas
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+QUEUE_WAIT_BUCKETS_MS = [0.5, 1, 2, 5, 10, 20, 50, 100]
+
+class _Histogram:
+    """Histograma acumulado simple con buckets fijos"""
+    
+    def __init__(self, buckets: List[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+    
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+    
+    def to_dict(self) -> Dict[str, Any]:
+        labels = [f"<={bucket}" for bucket in self.buckets] + [f">{self.buckets[-1]}"]
+        return {
+            "buckets": dict(zip(labels, self.counts)),
+            "count": self.count,
+            "avg": round(self.total / self.count, 3) if self.count else 0.0,
+        }
+
+class QueryCoalescer:
+    """
+    Coalescedor de queries individuales en lotes
+    
+    Cada llamada a search() se encola; el lote se ejecuta cuando se juntan
+    max_batch_size queries o cuando vence la ventana de window_ms desde la primera.
+    Los resultados se reparten a cada llamador en su orden original.
+    """
+    
+    def __init__(
+        self,
+        search_batch: Callable[[List[str], int], Awaitable[List[List[Document]]]],
+        window_ms: float = 5,
+        max_batch_size: int = 32
+    ):
+        self._search_batch = search_batch
+        self.window_ms = window_ms
+        self.max_batch_size = max_batch_size
+        self._pending: List[Tuple[str, int, asyncio.Future, float]] = []
+        self._timer = None
+        self._tasks = set()
+        self.batch_sizes = _Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_ms = _Histogram(QUEUE_WAIT_BUCKETS_MS)
+        self.errors = 0
+    
+    async def search(self, query: str, k: int = 3) -> List[Document]:
+        """
+        Encola una query y espera el resultado de su lote
+        
+        Args:
+            query: Texto de búsqueda
+            k: Número de resultados a retornar
+        
+        Returns:
+            Lista de documentos similares
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((query, k, future, time.perf_counter()))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_ms / 1000, self._flush)
+        return await future
+    
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            # Se guarda una referencia para que el task no sea recolectado antes de terminar
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+    
+    async def _run(self, batch: List[Tuple[str, int, asyncio.Future, float]]) -> None:
+        started = time.perf_counter()
+        self.batch_sizes.observe(len(batch))
+        for _, _, _, enqueued in batch:
+            self.queue_wait_ms.observe((started - enqueued) * 1000)
+        
+        # Un solo k por lote: se busca el mayor y se recorta por llamador
+        k = max(item_k for _, item_k, _, _ in batch)
+        try:
+            results = await self._search_batch([query for query, _, _, _ in batch], k)
+        except Exception as e:
+            self.errors += 1
+            for _, _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, item_k, future, _), docs in zip(batch, results):
+            if not future.done():
+                future.set_result(docs[:item_k])
+    
+    def stats(self) -> Dict[str, Any]:
+        """Histogramas de tamaño de lote y de latencia de cola añadida"""
+        return {
+            "window_ms": self.window_ms,
+            "max_batch_size": self.max_batch_size,
+            "batch_size": self.batch_sizes.to_dict(),
+            "queue_wait_ms": self.queue_wait_ms.to_dict(),
+            "errors": self.errors,
+        }
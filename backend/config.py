@@ -16,6 +16,12 @@ class VectorStoreType(str, Enum):
     PINECONE = "pinecone"
     WEAVIATE = "weaviate"
 
+class EmbeddingBackend(str, Enum):
+    """Backends de inferencia de embeddings"""
+    TORCH = "torch"
+    ONNX = "onnx"
+    ONNX_INT8 = "onnx-int8"
+
 # Vector store seleccionado (por defecto FAISS)
 VECTOR_STORE_TYPE = VectorStoreType(
     os.getenv("VECTOR_STORE_TYPE", "faiss").lower()
@@ -24,27 +30,150 @@ VECTOR_STORE_TYPE = VectorStoreType(
 # Configuración común
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE", "cpu")
+
+# Backend de inferencia: torch (sentence-transformers), onnx u onnx-int8 (onnxruntime, solo CPU)
+# Los modelos ONNX se exportan con scripts/export_onnx_embeddings.py a EMBEDDING_ONNX_PATH/<modelo>
+EMBEDDING_BACKEND = EmbeddingBackend(os.getenv("EMBEDDING_BACKEND", "torch").lower())
+EMBEDDING_ONNX_PATH = Path(os.getenv("EMBEDDING_ONNX_PATH", "./models/onnx"))
+# Hilos intra-op de la inferencia (0 = valor por defecto de torch/onnxruntime)
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", 0))
+
+# Caché de embeddings de queries (QUERY_CACHE_SIZE=0 la desactiva)
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", 1024))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", 3600))
+QUERY_CACHE_MAX_MB = float(os.getenv("QUERY_CACHE_MAX_MB", 64))
+
+# Caché persistente de embeddings de documentos (por modelo y hash de chunk)
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_PATH = Path(os.getenv("EMBEDDING_CACHE_PATH", "./vector_stores_data/embedding_cache"))
+EMBEDDING_CACHE_DTYPE = os.getenv("EMBEDDING_CACHE_DTYPE", "float32")
+
+# Caché semántica de resultados de /afp-query: opt-in, puede devolver el resultado de otra pregunta parecida
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.95))
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", 1024))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", 3600))
 
 # Configuración del servidor
 HOST = os.getenv("HOST", "localhost")
 PORT = int(os.getenv("PORT", 8000))
 
+# Varios workers con gunicorn (gunicorn -c gunicorn.conf.py main:app): el modelo y el índice
+# se cargan antes del fork y cada worker queda fuera de rotación (/ready = 503) hasta calentarse
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", 2))
+READY_WARMUP_QUERIES = int(os.getenv("READY_WARMUP_QUERIES", 3))
+
+# Recarga en caliente del índice: cada INDEX_RELOAD_INTERVAL segundos se compara la versión
+# publicada con la cargada (0 = solo con POST /admin/reload); las consultas en curso terminan
+# sobre el índice anterior, que se libera al terminar la última (o tras INDEX_RELOAD_DRAIN_TIMEOUT)
+INDEX_RELOAD_INTERVAL = float(os.getenv("INDEX_RELOAD_INTERVAL", 5))
+INDEX_RELOAD_DRAIN_TIMEOUT = float(os.getenv("INDEX_RELOAD_DRAIN_TIMEOUT", 30))
+# Token para los endpoints /admin/* (header X-Admin-Token); vacío = sin autenticación
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Concurrencia: hilos para búsquedas y embeddings fuera del event loop
+SEARCH_EXECUTOR_WORKERS = int(os.getenv("SEARCH_EXECUTOR_WORKERS", 4))
+
+# Máximo de queries por petición a /search/batch
+BATCH_SEARCH_MAX_QUERIES = int(os.getenv("BATCH_SEARCH_MAX_QUERIES", 256))
+
+# Micro-batching: agrupa queries concurrentes durante BATCH_WINDOW_MS o hasta BATCH_MAX_SIZE
+BATCHING_ENABLED = os.getenv("BATCHING_ENABLED", "false").lower() == "true"
+BATCH_WINDOW_MS = float(os.getenv("BATCH_WINDOW_MS", 5))
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", 32))
+
+# Métricas: histogramas por etapa y contadores en /metrics (formato Prometheus)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+# Trazas OpenTelemetry de cada etapa (requiere opentelemetry-api; exporta por OTLP si
+# OTEL_EXPORTER_OTLP_ENDPOINT está definido y opentelemetry-sdk está instalado)
+OTEL_ENABLED = os.getenv("OTEL_ENABLED", "false").lower() == "true"
+OTEL_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "rag-vector-stores")
+
+# Profiler de muestreo opt-in: header X-Profile por petición y POST /admin/profile por ventana
+# (si PROFILING_TOKEN está definido, hay que enviarlo en el header X-Profile-Token)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+PROFILING_INTERVAL_MS = float(os.getenv("PROFILING_INTERVAL_MS", 5))
+PROFILING_MAX_SECONDS = float(os.getenv("PROFILING_MAX_SECONDS", 60))
+
+# Configuración del ingest (pipeline en streaming)
+DATA_PATH = Path(os.getenv("DATA_PATH", "./data"))
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", 500))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", 50))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 64))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", 2))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", 8))
+# Subida a Pinecone/Weaviate: vectores por petición, peticiones en paralelo y reintentos
+# (backoff exponencial desde REMOTE_UPSERT_BACKOFF segundos) ante errores transitorios
+REMOTE_UPSERT_BATCH_SIZE = int(os.getenv("REMOTE_UPSERT_BATCH_SIZE", 100))
+REMOTE_UPSERT_CONCURRENCY = int(os.getenv("REMOTE_UPSERT_CONCURRENCY", 4))
+REMOTE_UPSERT_MAX_RETRIES = int(os.getenv("REMOTE_UPSERT_MAX_RETRIES", 5))
+REMOTE_UPSERT_BACKOFF = float(os.getenv("REMOTE_UPSERT_BACKOFF", 0.5))
+
 # Configuración específica por vector store
 PINECONE_API_KEY = None
 PINECONE_ENVIRONMENT = None
 PINECONE_INDEX_NAME = None
+PINECONE_HOST = None
 
 WEAVIATE_URL = None
 WEAVIATE_API_KEY = None
 WEAVIATE_INDEX_NAME = None
 
+# Clientes remotos: uno por proceso con conexiones keep-alive (ver vector_stores/clients.py)
+# Pinecone: hilos del cliente HTTP, conexiones por host y timeout de cada consulta (segundos)
+PINECONE_POOL_THREADS = int(os.getenv("PINECONE_POOL_THREADS", SEARCH_EXECUTOR_WORKERS))
+PINECONE_POOL_MAXSIZE = int(os.getenv("PINECONE_POOL_MAXSIZE", 16))
+PINECONE_TIMEOUT = float(os.getenv("PINECONE_TIMEOUT", 10))
+# Weaviate: sesiones REST del pool y timeouts de conexión, consulta e inserción (segundos)
+WEAVIATE_POOL_CONNECTIONS = int(os.getenv("WEAVIATE_POOL_CONNECTIONS", 10))
+WEAVIATE_POOL_MAXSIZE = int(os.getenv("WEAVIATE_POOL_MAXSIZE", 16))
+WEAVIATE_INIT_TIMEOUT = float(os.getenv("WEAVIATE_INIT_TIMEOUT", 5))
+WEAVIATE_QUERY_TIMEOUT = float(os.getenv("WEAVIATE_QUERY_TIMEOUT", 10))
+WEAVIATE_INSERT_TIMEOUT = float(os.getenv("WEAVIATE_INSERT_TIMEOUT", 90))
+# Segundos que se reutiliza el último chequeo de salud de un store remoto (se refresca en segundo plano)
+STORE_HEALTH_TTL = float(os.getenv("STORE_HEALTH_TTL", 10))
+
+# Búsquedas resilientes en Pinecone/Weaviate (ver vector_stores/resilience.py)
+# Plazo total de cada consulta remota en ms (incluido el hedge); al vencer se responde con la réplica FAISS
+REMOTE_SEARCH_DEADLINE_MS = float(os.getenv("REMOTE_SEARCH_DEADLINE_MS", 2000))
+# Hedging: repetir la consulta si no respondió tras el percentil HEDGE_PERCENTILE de la latencia reciente
+# (nunca antes de HEDGE_MIN_DELAY_MS ni con menos de HEDGE_MIN_SAMPLES latencias observadas)
+HEDGING_ENABLED = os.getenv("HEDGING_ENABLED", "true").lower() == "true"
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", 95))
+HEDGE_MIN_DELAY_MS = float(os.getenv("HEDGE_MIN_DELAY_MS", 20))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", 20))
+# Circuit breaker: fallos seguidos que abren el circuito y segundos hasta la consulta de prueba
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 5))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", 30))
+# Responder con el índice FAISS local (mismo corpus) cuando el store remoto está degradado
+FAISS_FALLBACK_ENABLED = os.getenv("FAISS_FALLBACK_ENABLED", "true").lower() == "true"
+# Hilos propios de las búsquedas en la réplica: no esperan detrás de llamadas remotas colgadas
+FAISS_FALLBACK_WORKERS = int(os.getenv("FAISS_FALLBACK_WORKERS", 2))
+
 FAISS_VECTORSTORE_PATH = Path("./vector_stores_data/faiss")
+# Leer el índice FAISS con memory map (compartido entre workers vía la caché del sistema operativo)
+FAISS_MMAP = os.getenv("FAISS_MMAP", "true").lower() == "true"
+# Tipo de índice FAISS (factory string: "Flat", "IVF1024,Flat", "HNSW32", "IVF1024,PQ16", "SQ8"...)
+FAISS_INDEX_FACTORY = os.getenv("FAISS_INDEX_FACTORY", "Flat")
+# Vectores usados para entrenar índices IVF/PQ durante el ingest
+FAISS_TRAIN_SIZE = int(os.getenv("FAISS_TRAIN_SIZE", 65536))
+# Parámetros de búsqueda: listas IVF visitadas y tamaño de la lista de candidatos de HNSW
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", 16))
+FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", 64))
+# Versiones del índice FAISS que se conservan en vector_stores_data/faiss/releases (la publicada nunca se borra)
+FAISS_KEEP_RELEASES = int(os.getenv("FAISS_KEEP_RELEASES", 3))
+INDEX_VERSIONS_PATH = Path("./vector_stores_data/versions")
+MANIFESTS_PATH = Path("./vector_stores_data/manifests")
 
 # Cargar configuración según el vector store seleccionado
 if VECTOR_STORE_TYPE == VectorStoreType.PINECONE:
     PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
     PINECONE_ENVIRONMENT = os.getenv("PINECONE_ENVIRONMENT", "us-east-1-aws")
     PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "afp-chatbot")
+    # URL del plano de control alternativo: Pinecone Local o scripts/mock_pinecone.py
+    PINECONE_HOST = os.getenv("PINECONE_HOST") or None
     
     if not PINECONE_API_KEY:
         raise ValueError(
@@ -0,0 +1,193 @@
+"""
+Registro de modelos de embeddings compartido por todo el proceso
+Cada modelo se carga una sola vez (por nombre y dispositivo) y se reutiliza
+en los vector stores, el ingest y los scripts de benchmarking
+"""
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+from langchain_huggingface import HuggingFaceEmbeddings
+from config import (
+    EMBEDDING_MODEL,
+    EMBEDDING_DEVICE,
+    EMBEDDING_BACKEND,
+    EMBEDDING_ONNX_PATH,
+    EMBEDDING_THREADS,
+    QUERY_CACHE_SIZE,
+    QUERY_CACHE_TTL,
+    QUERY_CACHE_MAX_MB,
+    EMBEDDING_CACHE_ENABLED,
+    EMBEDDING_CACHE_PATH,
+    EMBEDDING_CACHE_DTYPE,
+    EmbeddingBackend
+)
+from process_stats import rss_mb
+from .query_cache import CachedEmbeddings, QueryEmbeddingCache, normalize_query
+from .disk_cache import DiskCachedEmbeddings, DiskEmbeddingCache, model_slug
+from .onnx_backend import OnnxEmbeddings
+
+_models: Dict[Tuple[str, str], Any] = {}
+_registry: Dict[Tuple[str, str], Any] = {}
+_document_registry: Dict[Tuple[str, str], Any] = {}
+_load_stats: Dict[Tuple[str, str], Dict[str, Any]] = {}
+_lock = threading.RLock()
+
+def create_embeddings(
+    model_name: str,
+    device: str = "cpu",
+    backend: EmbeddingBackend = EMBEDDING_BACKEND,
+    threads: int = EMBEDDING_THREADS
+):
+    """
+    Crea un modelo de embeddings sin registrarlo ni envolverlo en cachés
+    (lo usan _load_model y scripts/benchmark_embeddings.py para comparar backends)
+    
+    Args:
+        model_name: Nombre del modelo sentence-transformers
+        device: Dispositivo de inferencia (los backends ONNX solo usan CPU)
+        backend: torch, onnx u onnx-int8
+        threads: Hilos intra-op de la inferencia (0 = valor por defecto)
+    """
+    backend = EmbeddingBackend(backend)
+    if backend == EmbeddingBackend.TORCH:
+        if threads > 0:
+            import torch
+            torch.set_num_threads(threads)
+        return HuggingFaceEmbeddings(model_name=model_name, model_kwargs={"device": device})
+    if device != "cpu":
+        print(f"⚠️  El backend {backend.value} solo usa CPU (EMBEDDING_DEVICE={device} se ignora)")
+    return OnnxEmbeddings(
+        EMBEDDING_ONNX_PATH / model_slug(model_name),
+        quantized=backend == EmbeddingBackend.ONNX_INT8,
+        threads=threads
+    )
+
+def _cache_slug(model_name: str) -> str:
+    """Carpeta de la caché en disco: los vectores de cada backend se guardan por separado"""
+    if EMBEDDING_BACKEND == EmbeddingBackend.TORCH:
+        return model_slug(model_name)
+    return f"{model_slug(model_name)}__{EMBEDDING_BACKEND.value}"
+
+def _load_model(key: Tuple[str, str]):
+    """Carga (una sola vez) el modelo base de un (nombre, dispositivo)"""
+    with _lock:
+        if key not in _models:
+            rss_before = rss_mb()
+            start = time.perf_counter()
+            _models[key] = create_embeddings(key[0], key[1])
+            load_time = time.perf_counter() - start
+            rss_after = rss_mb()
+            rss_delta = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+            _load_stats[key] = {
+                "model": key[0],
+                "device": key[1],
+                "backend": EMBEDDING_BACKEND.value,
+                "load_time_s": round(load_time, 3),
+                "rss_delta_mb": round(rss_delta, 1) if rss_delta is not None else None,
+                "rss_mb": round(rss_after, 1) if rss_after is not None else None,
+            }
+            memory_info = f", RSS +{rss_delta:.0f}MB" if rss_delta is not None else ""
+            print(f"✅ Modelo de embeddings cargado ({key[0]} en {key[1]}, {EMBEDDING_BACKEND.value}) en {load_time:.2f}s{memory_info}")
+        return _models[key]
+
+def get_embeddings(model_name: str = None, device: str = None):
+    """
+    Retorna el modelo de embeddings compartido, cargándolo la primera vez
+    
+    Si QUERY_CACHE_SIZE > 0 el modelo se envuelve con la caché de embeddings de queries.
+    
+    Args:
+        model_name: Nombre del modelo (por defecto EMBEDDING_MODEL)
+        device: Dispositivo de inferencia (por defecto EMBEDDING_DEVICE)
+        
+    Returns:
+        Instancia de Embeddings de LangChain
+    """
+    key = (model_name or EMBEDDING_MODEL, device or EMBEDDING_DEVICE)
+    embeddings = _registry.get(key)
+    if embeddings is not None:
+        return embeddings
+    
+    with _lock:
+        if key not in _registry:
+            embeddings = _load_model(key)
+            if QUERY_CACHE_SIZE > 0:
+                embeddings = CachedEmbeddings(
+                    embeddings,
+                    QueryEmbeddingCache(
+                        max_entries=QUERY_CACHE_SIZE,
+                        ttl_seconds=QUERY_CACHE_TTL,
+                        max_bytes=int(QUERY_CACHE_MAX_MB * 1024 * 1024)
+                    )
+                )
+            _registry[key] = embeddings
+    return _registry[key]
+
+def get_document_embeddings(model_name: str = None, device: str = None):
+    """
+    Retorna el modelo de embeddings para indexar documentos
+    
+    Comparte el modelo cargado con get_embeddings; si EMBEDDING_CACHE_ENABLED,
+    embed_documents consulta primero la caché persistente en disco (por modelo y hash de chunk).
+    
+    Args:
+        model_name: Nombre del modelo (por defecto EMBEDDING_MODEL)
+        device: Dispositivo de inferencia (por defecto EMBEDDING_DEVICE)
+        
+    Returns:
+        Instancia de Embeddings de LangChain
+    """
+    key = (model_name or EMBEDDING_MODEL, device or EMBEDDING_DEVICE)
+    embeddings = _document_registry.get(key)
+    if embeddings is not None:
+        return embeddings
+    
+    with _lock:
+        if key not in _document_registry:
+            embeddings = _load_model(key)
+            if EMBEDDING_CACHE_ENABLED:
+                embeddings = DiskCachedEmbeddings(
+                    embeddings,
+                    DiskEmbeddingCache(EMBEDDING_CACHE_PATH / _cache_slug(key[0]), dtype=EMBEDDING_CACHE_DTYPE)
+                )
+            _document_registry[key] = embeddings
+    return _document_registry[key]
+
+def embed_queries(embeddings, texts: List[str]) -> List[List[float]]:
+    """
+    Calcula los embeddings de varias queries en una sola pasada del modelo
+    (aprovechando la caché de queries si el modelo la tiene)
+    """
+    if not texts:
+        return []
+    if isinstance(embeddings, CachedEmbeddings):
+        return embeddings.embed_queries(texts)
+    return embeddings.embed_documents(texts)
+
+def embedding_stats() -> List[Dict[str, Any]]:
+    """Estadísticas de carga (tiempo y memoria) y de caché de los modelos registrados"""
+    stats = []
+    for key, load_stats in _load_stats.items():
+        entry = dict(load_stats)
+        embeddings = _registry.get(key)
+        if isinstance(embeddings, CachedEmbeddings):
+            entry["query_cache"] = embeddings.cache.stats()
+        document_embeddings = _document_registry.get(key)
+        if isinstance(document_embeddings, DiskCachedEmbeddings):
+            entry["disk_cache"] = document_embeddings.cache.stats()
+        stats.append(entry)
+    return stats
+
+__all__ = [
+    "create_embeddings",
+    "get_embeddings",
+    "get_document_embeddings",
+    "embed_queries",
+    "embedding_stats",
+    "CachedEmbeddings",
+    "QueryEmbeddingCache",
+    "normalize_query",
+    "DiskCachedEmbeddings",
+    "DiskEmbeddingCache",
+    "OnnxEmbeddings",
+]
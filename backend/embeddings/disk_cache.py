@@ -0,0 +1,168 @@
+"""
+Caché persistente en disco de embeddings de documentos
+Clave: (modelo, hash SHA-256 del chunk). Cada modelo tiene su carpeta con:
+- vectors.bin: matriz float32/float16 fila por fila (se lee con np.memmap)
+- keys.txt: hash de cada fila, en el mismo orden
+- meta.json: dimensión y tipo de dato
+
+Ambos archivos son append-only, así que ingerir el mismo corpus en FAISS,
+Pinecone y Weaviate paga el costo de los embeddings una sola vez.
+"""
+import hashlib
+import json
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+def text_hash(text: str) -> str:
+    """Hash del texto (el mismo que usa ingest_manifest.content_hash para los chunks)"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def model_slug(model_name: str) -> str:
+    """Nombre de carpeta seguro para un modelo"""
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+
+class DiskEmbeddingCache:
+    """Caché append-only de vectores en disco, leída mediante memory map"""
+    
+    def __init__(self, directory: Path, dtype: str = "float32"):
+        self.directory = directory
+        self.dtype = np.dtype(dtype)
+        self.dim: Optional[int] = None
+        self._index: Dict[str, int] = {}
+        self._matrix = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._open()
+    
+    @property
+    def _vectors_path(self) -> Path:
+        return self.directory / "vectors.bin"
+    
+    @property
+    def _keys_path(self) -> Path:
+        return self.directory / "keys.txt"
+    
+    @property
+    def _meta_path(self) -> Path:
+        return self.directory / "meta.json"
+    
+    def _open(self) -> None:
+        """Carga el índice de claves y repara escrituras incompletas"""
+        if not self._meta_path.exists():
+            return
+        meta = json.loads(self._meta_path.read_text())
+        if meta["dtype"] != self.dtype.name:
+            # Se respeta el tipo con el que se creó la caché
+            self.dtype = np.dtype(meta["dtype"])
+        self.dim = meta["dim"]
+        keys = self._keys_path.read_text().split() if self._keys_path.exists() else []
+        row_bytes = self.dim * self.dtype.itemsize
+        size = self._vectors_path.stat().st_size if self._vectors_path.exists() else 0
+        valid = min(len(keys), size // row_bytes)
+        # Una ejecución interrumpida puede dejar filas (o bytes) o claves de más: se recortan
+        if size != valid * row_bytes:
+            with open(self._vectors_path, "r+b") as f:
+                f.truncate(valid * row_bytes)
+        if len(keys) != valid:
+            keys = keys[:valid]
+            self._keys_path.write_text("".join(f"{key}\n" for key in keys))
+        self._index = {key: row for row, key in enumerate(keys)}
+        self._matrix = None
+    
+    def _rows(self) -> np.ndarray:
+        if self._matrix is None or len(self._matrix) != len(self._index):
+            self._matrix = np.memmap(self._vectors_path, dtype=self.dtype, mode="r", shape=(len(self._index), self.dim)) if self._index else None
+        return self._matrix
+    
+    def get_many(self, keys: List[str]) -> List[Optional[np.ndarray]]:
+        """Vectores (float32) de las claves dadas; None para las que no están"""
+        with self._lock:
+            matrix = self._rows()
+            results = []
+            for key in keys:
+                row = self._index.get(key)
+                if row is None:
+                    self.misses += 1
+                    results.append(None)
+                else:
+                    self.hits += 1
+                    results.append(np.asarray(matrix[row], dtype=np.float32))
+            return results
+    
+    def put_many(self, keys: List[str], vectors: np.ndarray) -> None:
+        """Agrega vectores nuevos (las claves ya presentes se ignoran)"""
+        vectors = np.asarray(vectors, dtype=self.dtype)
+        with self._lock:
+            if self.dim is None:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                self.dim = vectors.shape[1]
+                self._meta_path.write_text(json.dumps({"dim": self.dim, "dtype": self.dtype.name}))
+            fresh = {}
+            for key, vector in zip(keys, vectors):
+                if key not in self._index and key not in fresh:
+                    fresh[key] = vector
+            if not fresh:
+                return
+            # Primero los vectores y después las claves: una clave nunca apunta a una fila incompleta
+            with open(self._vectors_path, "ab") as f:
+                f.write(np.stack(list(fresh.values())).astype(self.dtype).tobytes())
+            with open(self._keys_path, "a") as f:
+                f.write("".join(f"{key}\n" for key in fresh))
+            for key in fresh:
+                self._index[key] = len(self._index)
+    
+    def stats(self) -> Dict[str, float]:
+        """Contadores de la caché"""
+        with self._lock:
+            return {
+                "entries": len(self._index),
+                "hits": self.hits,
+                "misses": self.misses,
+                "dtype": self.dtype.name,
+            }
+
+class DiskCachedEmbeddings(Embeddings):
+    """
+    Envuelve un modelo de embeddings consultando la caché en disco en embed_documents
+    
+    Los vectores calculados se devuelven con la misma precisión con la que se guardan,
+    para que todos los stores reciban exactamente los mismos valores.
+    """
+    
+    def __init__(self, embeddings: Embeddings, cache: DiskEmbeddingCache):
+        self.embeddings = embeddings
+        self.cache = cache
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [text_hash(text) for text in texts]
+        vectors = self.cache.get_many(keys)
+        # Textos faltantes sin repetir: cada uno se calcula una sola vez
+        missing: Dict[str, int] = {}
+        for i, vector in enumerate(vectors):
+            if vector is None and keys[i] not in missing:
+                missing[keys[i]] = i
+        if missing:
+            computed = np.asarray(
+                self.embeddings.embed_documents([texts[i] for i in missing.values()]),
+                dtype=np.float32
+            )
+            self.cache.put_many(list(missing), computed)
+            stored = dict(zip(missing, computed.astype(self.cache.dtype).astype(np.float32)))
+            for i, vector in enumerate(vectors):
+                if vector is None:
+                    vectors[i] = stored[keys[i]]
+        return [vector.tolist() for vector in vectors]
+    
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+    
+    def __getattr__(self, name: str):
+        # Expone los atributos del modelo envuelto (model_name, client, ...)
+        if "embeddings" not in self.__dict__:
+            raise AttributeError(name)
+        return getattr(self.__dict__["embeddings"], name)
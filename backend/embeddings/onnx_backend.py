@@ -0,0 +1,131 @@
+"""
+Embeddings con onnxruntime (CPU) a partir de un modelo exportado a ONNX
+La carpeta del modelo la genera scripts/export_onnx_embeddings.py y contiene:
+- model.onnx: el transformer en float32
+- model_int8.onnx: el mismo modelo con pesos cuantizados a int8 (cuantización dinámica)
+- el tokenizer de Hugging Face
+- export.json: pooling, normalización y longitud máxima del modelo sentence-transformers
+
+El pooling y la normalización se replican en numpy, así que los vectores son los del
+modelo original dentro de la tolerancia medida por scripts/benchmark_embeddings.py.
+
+La sesión de onnxruntime se crea en el primer uso y se descarta en los procesos hijos:
+su pool de hilos no sobrevive al fork de los workers de gunicorn (preload_app).
+"""
+import json
+import os
+import threading
+import weakref
+from pathlib import Path
+from typing import List
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+FLOAT_MODEL_FILE = "model.onnx"
+INT8_MODEL_FILE = "model_int8.onnx"
+EXPORT_META_FILE = "export.json"
+
+_instances: "weakref.WeakSet[OnnxEmbeddings]" = weakref.WeakSet()
+
+class OnnxEmbeddings(Embeddings):
+    """Embeddings de LangChain sobre una sesión de onnxruntime"""
+    
+    def __init__(self, model_dir: Path, quantized: bool = False, threads: int = 0, batch_size: int = 32):
+        try:
+            import onnxruntime as ort
+            from transformers import AutoTokenizer
+        except ImportError as e:
+            raise ImportError(
+                "EMBEDDING_BACKEND=onnx requiere onnxruntime y transformers: pip install onnxruntime"
+            ) from e
+        
+        model_dir = Path(model_dir)
+        model_path = model_dir / (INT8_MODEL_FILE if quantized else FLOAT_MODEL_FILE)
+        if not model_path.exists():
+            raise FileNotFoundError(
+                f"No existe {model_path}; ejecuta scripts/export_onnx_embeddings.py primero"
+            )
+        meta = json.loads((model_dir / EXPORT_META_FILE).read_text())
+        self.model_name = meta["model"]
+        self.pooling = meta["pooling"]
+        self.normalize = meta["normalize"]
+        self.max_seq_length = meta["max_seq_length"]
+        self.quantized = quantized
+        self.batch_size = batch_size
+        
+        self.model_path = model_path
+        self.threads = threads
+        self._ort = ort
+        self._session = None
+        self.tokenizer = AutoTokenizer.from_pretrained(str(model_dir))
+        self._reset_locks()
+        _instances.add(self)
+    
+    def _reset_locks(self) -> None:
+        self._session_lock = threading.Lock()
+        # Los tokenizers rápidos no admiten llamadas concurrentes (el executor tiene varios hilos);
+        # session.run sí es thread-safe
+        self._tokenizer_lock = threading.Lock()
+    
+    @property
+    def session(self):
+        """Sesión de onnxruntime de este proceso (se crea en el primer uso)"""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    ort = self._ort
+                    options = ort.SessionOptions()
+                    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+                    if self.threads > 0:
+                        options.intra_op_num_threads = self.threads
+                        options.inter_op_num_threads = 1
+                    self._session = ort.InferenceSession(str(self.model_path), options, providers=["CPUExecutionProvider"])
+        return self._session
+    
+    def _pool(self, token_embeddings: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        if self.pooling == "cls":
+            return token_embeddings[:, 0]
+        mask = attention_mask[..., None].astype(token_embeddings.dtype)
+        if self.pooling == "max":
+            return np.where(mask > 0, token_embeddings, -1e9).max(axis=1)
+        return (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+    
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = [text.replace("\n", " ") for text in texts[start:start + self.batch_size]]
+            with self._tokenizer_lock:
+                encoded = self.tokenizer(
+                    batch,
+                    padding=True,
+                    truncation=True,
+                    max_length=self.max_seq_length,
+                    return_tensors="np"
+                )
+            session = self.session
+            feeds = {}
+            for name in (model_input.name for model_input in session.get_inputs()):
+                if name in encoded:
+                    feeds[name] = encoded[name].astype(np.int64)
+                else:
+                    feeds[name] = np.zeros_like(encoded["input_ids"], dtype=np.int64)
+            token_embeddings = session.run(None, feeds)[0]
+            pooled = self._pool(token_embeddings, encoded["attention_mask"])
+            if self.normalize:
+                pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            vectors.append(pooled.astype(np.float32))
+        return np.vstack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(list(texts)).tolist()
+    
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text])[0].tolist()
+
+def _reset_after_fork() -> None:
+    for embeddings in list(_instances):
+        embeddings._session = None
+        embeddings._reset_locks()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
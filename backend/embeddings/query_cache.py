@@ -0,0 +1,130 @@
+"""
+Caché LRU con TTL para embeddings de queries
+Evita recalcular el embedding de preguntas repetidas (el costo dominante de una búsqueda FAISS)
+"""
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from langchain_core.embeddings import Embeddings
+
+# Sobrecosto aproximado por entrada (nodo del OrderedDict, tupla, objetos array y str)
+_ENTRY_OVERHEAD_BYTES = 200
+
+def normalize_query(text: str) -> str:
+    """Normaliza una query para usarla como clave (unicode NFKC, minúsculas, espacios colapsados)"""
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+class QueryEmbeddingCache:
+    """Caché LRU thread-safe de texto normalizado -> vector, acotada por entradas, memoria y TTL"""
+    
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[array, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def get(self, key: str) -> Optional[List[float]]:
+        """Retorna el vector cacheado o None (cuenta hit/miss)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_seconds > 0 and now - entry[1] > self.ttl_seconds:
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0].tolist()
+    
+    def put(self, key: str, vector: List[float]) -> None:
+        """Guarda un vector, expulsando las entradas menos usadas si se exceden los límites"""
+        if self.max_entries <= 0:
+            return
+        values = array("f", vector)
+        size = values.itemsize * len(values) + len(key) + _ENTRY_OVERHEAD_BYTES
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (values, time.monotonic(), size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+    
+    def _remove(self, key: str) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+    
+    def clear(self) -> None:
+        """Vacía la caché (conserva los contadores)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de la caché"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "memory_mb": round(self._bytes / (1024 * 1024), 3),
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+class CachedEmbeddings(Embeddings):
+    """
+    Envuelve un modelo de embeddings cacheando embed_query
+    
+    embed_documents se delega sin caché: se usa en el ingest, donde los textos no se repiten.
+    """
+    
+    def __init__(self, embeddings: Embeddings, cache: QueryEmbeddingCache):
+        self.embeddings = embeddings
+        self.cache = cache
+    
+    def embed_query(self, text: str) -> List[float]:
+        key = normalize_query(text)
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.cache.put(key, vector)
+        return vector
+    
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embeddings de varias queries: las que no están en caché se calculan en una sola pasada del modelo"""
+        keys = [normalize_query(text) for text in texts]
+        vectors = [self.cache.get(key) for key in keys]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            computed = self.embeddings.embed_documents([texts[i] for i in missing])
+            for i, vector in zip(missing, computed):
+                vectors[i] = vector
+                self.cache.put(keys[i], vector)
+        return vectors
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+    
+    def __getattr__(self, name: str):
+        # Expone los atributos del modelo envuelto (model_name, client, ...)
+        if "embeddings" not in self.__dict__:
+            raise AttributeError(name)
+        return getattr(self.__dict__["embeddings"], name)
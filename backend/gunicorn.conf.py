@@ -0,0 +1,54 @@
+"""
+Configuración de gunicorn para servir la API con varios workers (Linux/macOS)
+
+    gunicorn -c gunicorn.conf.py main:app
+
+- preload_app: main.py (modelo de embeddings e índice FAISS) se importa una sola vez en el
+  proceso maestro y los workers lo heredan por fork; las páginas del modelo se comparten
+  copy-on-write y el índice en memory map se comparte a través de la caché del sistema operativo
+- gc.freeze() antes del fork: los objetos cargados pasan a la generación permanente y el GC de
+  cada worker no escribe en sus cabeceras (lo que copiaría esas páginas en cada proceso)
+- Hilos por worker: CPUs / WEB_WORKERS para torch, onnxruntime y FAISS (OpenMP), salvo que
+  EMBEDDING_THREADS u OMP_NUM_THREADS estén definidos; sin esto N workers sobre-suscriben los núcleos
+- Readiness: cada worker responde 503 en /ready hasta terminar su calentamiento
+"""
+import gc
+import os
+from dotenv import load_dotenv
+
+# Se lee .env antes de importar config: los hilos por worker deben fijarse antes de que
+# el preload importe torch y FAISS (OpenMP lee OMP_NUM_THREADS al cargarse)
+load_dotenv()
+
+def _cpu_count() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+workers = int(os.getenv("WEB_WORKERS", 2))
+threads_per_worker = max(1, _cpu_count() // workers)
+if int(os.getenv("EMBEDDING_THREADS", 0) or 0) <= 0:
+    os.environ["EMBEDDING_THREADS"] = str(threads_per_worker)
+for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+    os.environ.setdefault(variable, str(threads_per_worker))
+
+from config import HOST, PORT
+
+bind = f"{HOST}:{PORT}"
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+# El calentamiento corre en segundo plano, pero la carga inicial del modelo puede tardar
+timeout = 120
+graceful_timeout = 30
+
+def when_ready(server):
+    """Después del preload y antes de crear los workers"""
+    gc.collect()
+    gc.freeze()
+    server.log.info(
+        f"🚀 {workers} workers, {os.environ['EMBEDDING_THREADS']} hilos de embeddings por worker, "
+        f"{gc.get_freeze_count()} objetos congelados antes del fork"
+    )
+
+def post_fork(server, worker):
+    server.log.info(f"📦 Worker {worker.pid} creado; /ready en 503 hasta terminar el calentamiento")
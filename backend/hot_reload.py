@@ -0,0 +1,176 @@
+"""
+Recarga en caliente del vector store sin cortar el servicio
+- HotSwapStore guarda la referencia al store activo; cada consulta la toma con acquire()
+  y cuenta como "en curso" sobre esa generación hasta terminar
+- reload() carga el store nuevo en un hilo aparte, lo calienta y cambia la referencia
+  (una asignación: atómica para el event loop). Las consultas que ya habían tomado el
+  store anterior terminan sobre él; cuando sale la última (o vence drain_timeout) se
+  llama a aclose() y se suelta (índice y memory maps incluidos)
+- watch() compara periódicamente la versión publicada (CURRENT de FAISS) con la cargada
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+from vector_stores.base import VectorStoreBase
+
+class _Generation:
+    """Un store cargado y las consultas que lo están usando"""
+    
+    def __init__(self, store: VectorStoreBase):
+        self.store = store
+        self.version = store.index_version()
+        self.loaded_at = time.time()
+        self.in_flight = 0
+        self.retired = False
+        self.drained = asyncio.Event()
+    
+    def release(self) -> None:
+        self.in_flight -= 1
+        if self.retired and self.in_flight == 0:
+            self.drained.set()
+
+class HotSwapStore:
+    """Referencia intercambiable al vector store activo con conteo de consultas en curso"""
+    
+    def __init__(
+        self,
+        factory: Callable[[], VectorStoreBase],
+        store: Optional[VectorStoreBase] = None,
+        warm_up: Optional[Callable[[VectorStoreBase], Awaitable[None]]] = None,
+        drain_timeout: float = 30
+    ):
+        self._factory = factory
+        self._warm_up = warm_up
+        self.drain_timeout = drain_timeout
+        self._current = _Generation(store) if store is not None else None
+        self._reload_lock = asyncio.Lock()
+        self._tasks = set()
+        self.reloads = 0
+        self.last_reload: Optional[Dict[str, Any]] = None
+        self.retiring = 0
+    
+    @property
+    def current(self) -> Optional[VectorStoreBase]:
+        """Store activo (None si no hay ninguno cargado)"""
+        return self._current.store if self._current is not None else None
+    
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[Optional[VectorStoreBase]]:
+        """Toma el store activo durante una consulta (None si no hay ninguno)"""
+        generation = self._current
+        if generation is None:
+            yield None
+            return
+        generation.in_flight += 1
+        try:
+            yield generation.store
+        finally:
+            generation.release()
+    
+    def needs_reload(self) -> bool:
+        """True si hay una versión publicada distinta de la cargada"""
+        store = self.current
+        return store is not None and store.published_version() != store.index_version()
+    
+    async def reload(self, reason: str = "admin", force: bool = False) -> Dict[str, Any]:
+        """
+        Carga el store de nuevo en segundo plano y lo pone en servicio
+        
+        Args:
+            reason: Motivo (se informa en los logs y en stats())
+            force: Recarga aunque la versión publicada sea la misma que la cargada
+        
+        Returns:
+            Resultado: estado, versiones anterior y nueva, y tiempos de carga
+        """
+        async with self._reload_lock:
+            previous = self._current
+            if not force and previous is not None and not self.needs_reload():
+                return {"status": "unchanged", "version": previous.version}
+            
+            start = time.perf_counter()
+            # Fuera del executor de búsquedas: la carga no le quita hilos a las consultas
+            store = await asyncio.to_thread(self._factory)
+            if not store.is_available():
+                await store.aclose()
+                result = {"status": "error", "reason": reason, "detail": "El store nuevo no está disponible"}
+                self.last_reload = result
+                print(f"❌ Recarga del índice ({reason}) descartada: el store nuevo no está disponible")
+                return result
+            load_seconds = time.perf_counter() - start
+            if self._warm_up is not None:
+                try:
+                    await self._warm_up(store)
+                except Exception:
+                    await store.aclose()
+                    raise
+            
+            self._current = _Generation(store)
+            self.reloads += 1
+            result = {
+                "status": "reloaded",
+                "reason": reason,
+                "previous_version": previous.version if previous else None,
+                "version": self._current.version,
+                "load_seconds": round(load_seconds, 3),
+                "total_seconds": round(time.perf_counter() - start, 3),
+                "in_flight_on_previous": previous.in_flight if previous else 0,
+            }
+            self.last_reload = result
+            print(f"🔄 Índice recargado ({reason}): {result['previous_version']} -> {result['version']} en {result['total_seconds']:.2f}s")
+            if previous is not None:
+                self._retire(previous)
+            return result
+    
+    def _retire(self, generation: _Generation) -> None:
+        """Libera la generación anterior cuando termine su última consulta"""
+        generation.retired = True
+        if generation.in_flight == 0:
+            generation.drained.set()
+        self.retiring += 1
+        task = asyncio.ensure_future(self._release(generation))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _release(self, generation: _Generation) -> None:
+        try:
+            await asyncio.wait_for(generation.drained.wait(), timeout=self.drain_timeout)
+        except asyncio.TimeoutError:
+            print(f"⚠️  {generation.in_flight} consultas siguen sobre la versión {generation.version} tras {self.drain_timeout:.0f}s; se libera igual")
+        try:
+            await generation.store.aclose()
+        except Exception as e:
+            print(f"⚠️  Error cerrando la versión {generation.version}: {e}")
+        finally:
+            self.retiring -= 1
+    
+    async def watch(self, interval: float) -> None:
+        """Recarga el store cada vez que se publica una versión nueva (chequeo cada interval segundos)"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if self.needs_reload():
+                    await self.reload(reason="watcher")
+            except Exception as e:
+                print(f"⚠️  Error recargando el índice: {e}")
+    
+    async def aclose(self) -> None:
+        """Cierra el store activo y cancela las liberaciones pendientes"""
+        for task in list(self._tasks):
+            task.cancel()
+        if self._current is not None:
+            await self._current.store.aclose()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Versión cargada y publicada, consultas en curso y última recarga"""
+        generation = self._current
+        return {
+            "version": generation.version if generation else None,
+            "published_version": generation.store.published_version() if generation else None,
+            "loaded_at": generation.loaded_at if generation else None,
+            "in_flight": generation.in_flight if generation else 0,
+            "retiring_versions": self.retiring,
+            "reloads": self.reloads,
+            "last_reload": self.last_reload,
+        }
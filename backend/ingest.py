@@ -2,63 +2,124 @@
 Script unificado para ingerir documentos en el vector store configurado
 Soporta FAISS, Pinecone y Weaviate
 """
+import argparse
+import itertools
 from pathlib import Path
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import TextLoader
-from config import VECTOR_STORE_TYPE, EMBEDDING_MODEL
+from config import (
+    VECTOR_STORE_TYPE,
+    EMBEDDING_MODEL,
+    DATA_PATH,
+    MANIFESTS_PATH,
+    CHUNK_SIZE,
+    CHUNK_OVERLAP,
+    INGEST_BATCH_SIZE,
+    INGEST_WORKERS,
+    FAISS_INDEX_FACTORY,
+    VectorStoreType
+)
+from ingest_pipeline import IngestPipeline, discover_files
+from ingest_manifest import IngestManifest
 from vector_stores import get_vector_store
+from vector_stores.versioning import bump_index_version
+from embeddings import get_document_embeddings
 
-def main():
-    """Función principal para ingerir documentos"""
+def print_stage_report(report):
+    """Imprime el throughput por etapa del pipeline"""
+    print(f"\n⏱️  Tiempo total: {report['wall_seconds']:.2f}s")
+    print(f"   {'Etapa':<12} {'Elementos':>10} {'Ocupado (s)':>12} {'Elem/s':>10}")
+    for stage in report["stages"]:
+        print(f"   {stage['stage']:<12} {stage['items']:>10} {stage['busy_seconds']:>12.2f} {stage['items_per_second']:>10.2f}")
+
+def load_manifest() -> IngestManifest:
+    """Carga el manifest incremental del vector store configurado"""
+    settings = {
+        "embedding_model": EMBEDDING_MODEL,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+    }
+    if VECTOR_STORE_TYPE == VectorStoreType.FAISS:
+        # Cambiar el tipo de índice obliga a reconstruirlo
+        settings["faiss_index_factory"] = FAISS_INDEX_FACTORY
+    return IngestManifest.load(MANIFESTS_PATH / f"{VECTOR_STORE_TYPE.value}.json", settings)
+
+def main(full_rebuild: bool = False, data_path: Path = DATA_PATH):
+    """
+    Función principal para ingerir documentos
+    
+    Args:
+        full_rebuild: Ignora el manifest y reconstruye el vector store desde cero
+        data_path: Carpeta de documentos (por defecto DATA_PATH)
+    """
     print("="*60)
     print(f"🚀 Iniciando ingest con {VECTOR_STORE_TYPE.value.upper()}")
     print("="*60)
     
     # Carpeta de documentos
-    docs_path = Path("./data")
+    docs_path = data_path
     
     if not docs_path.exists():
         print(f"❌ Error: La carpeta {docs_path} no existe")
         return
     
-    # Cargar todos los documentos .txt
-    print("\n📄 Cargando documentos...")
-    docs = []
-    for file in docs_path.glob("*.txt"):
-        print(f"   - Cargando {file.name}")
-        loader = TextLoader(str(file))
-        docs.extend(loader.load())
-    
-    if not docs:
+    files = discover_files(docs_path)
+    first_file = next(files, None)
+    if first_file is None:
         print(f"❌ No se encontraron archivos .txt en {docs_path}")
         return
     
-    print(f"✅ {len(docs)} documento(s) cargado(s)")
-    
-    # Dividir documentos en chunks para mejorar búsqueda
-    print("\n✂️  Dividiendo documentos en chunks...")
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-    split_docs = text_splitter.split_documents(docs)
-    print(f"✅ {len(split_docs)} chunk(s) creado(s)")
-    
     # Inicializar embeddings
     print(f"\n🔧 Inicializando embeddings ({EMBEDDING_MODEL})...")
-    embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+    embeddings = get_document_embeddings()
     print("✅ Embeddings inicializados")
     
-    # Crear vectorstore según configuración
-    print(f"\n📦 Creando vectorstore en {VECTOR_STORE_TYPE.value.upper()}...")
+    # Cargar, dividir, calcular embeddings y subir por lotes (en streaming)
+    print(f"\n📦 Cargando documentos en {VECTOR_STORE_TYPE.value.upper()} (lotes de {INGEST_BATCH_SIZE}, {INGEST_WORKERS} workers)...")
     try:
         vectordb = get_vector_store()
-        vectordb.from_documents(split_docs, embeddings)
+        manifest = load_manifest()
+        if full_rebuild or not vectordb.is_available():
+            manifest.reset()
+        if manifest.compatible:
+            print("♻️  Ingest incremental: solo se procesan archivos nuevos o modificados")
+        else:
+            print("🧱 Reconstrucción completa del vector store")
+        pipeline = IngestPipeline(vectordb, embeddings, manifest=manifest, data_path=docs_path)
+        report = pipeline.run(
+            itertools.chain([first_file], files),
+            on_progress=lambda partial: print(
+                "   ... " + ", ".join(f"{stage['stage']}: {stage['items']}" for stage in partial["stages"])
+            )
+        )
+        manifest.save()
+        if pipeline.changed or not manifest.compatible:
+            version = bump_index_version(VECTOR_STORE_TYPE.value)
+        else:
+            version = "sin cambios"
         print(f"\n✅ ¡Ingest completado exitosamente!")
         print(f"   Vector Store: {VECTOR_STORE_TYPE.value.upper()}")
-        print(f"   Total de documentos procesados: {len(split_docs)}")
+        print(f"   Archivos procesados: {pipeline.stats['discover'].items} ({pipeline.skipped_files} sin cambios)")
+        print(f"   Chunks nuevos o modificados: {pipeline.stats['upsert'].items}")
+        print(f"   Chunks eliminados: {pipeline.stats['delete'].items}")
+        print(f"   Total de chunks en el índice: {manifest.chunk_count()}")
+        print(f"   Versión del índice: {version}")
+        print_stage_report(report)
     except Exception as e:
         print(f"\n❌ Error durante el ingest: {e}")
         raise
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Ingiere documentos en el vector store configurado")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Ignora el manifest incremental y reconstruye el vector store desde cero"
+    )
+    parser.add_argument(
+        "--data-dir",
+        type=Path,
+        default=DATA_PATH,
+        help="Carpeta de documentos .txt (p. ej. un corpus de scripts/generate_corpus.py)"
+    )
+    args = parser.parse_args()
+    main(full_rebuild=args.full, data_path=args.data_dir)
 
@@ -0,0 +1,134 @@
+"""
+Manifest de ingest incremental
+Guarda por store los hashes de cada archivo y de cada chunk ingerido, para que
+una nueva ejecución solo procese lo nuevo o modificado y borre lo eliminado
+"""
+import hashlib
+import json
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+from langchain_core.documents import Document
+
+MANIFEST_FORMAT = 1
+
+# Espacio de nombres fijo para que los IDs de chunk sean los mismos en todos los stores
+CHUNK_ID_NAMESPACE = uuid.UUID("6f1c2a64-8d0e-4b8e-9a57-2f5d3c1e7b90")
+
+def content_hash(text: str) -> str:
+    """Hash SHA-256 del contenido de un chunk"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def file_hash(path: Path) -> str:
+    """Hash SHA-256 del contenido de un archivo"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def chunk_id(source: str, chunk_hash: str, occurrence: int = 0) -> str:
+    """
+    ID determinista de un chunk (UUID, válido en FAISS, Pinecone y Weaviate)
+    
+    Args:
+        source: Ruta del archivo relativa a la carpeta de datos
+        chunk_hash: Hash del contenido del chunk
+        occurrence: Número de repetición del mismo contenido dentro del archivo
+    """
+    return str(uuid.uuid5(CHUNK_ID_NAMESPACE, f"{source}:{chunk_hash}:{occurrence}"))
+
+class IngestManifest:
+    """
+    Manifest persistido de un store: archivo → hash y chunks (id → hash)
+    
+    Si los parámetros de ingest (modelo, tamaño de chunk...) cambian respecto
+    al manifest guardado, el manifest se considera incompatible y se reconstruye todo.
+    """
+    
+    def __init__(self, path: Path, settings: Dict[str, Any], files: Dict[str, Dict[str, Any]] = None):
+        self.path = path
+        self.settings = settings
+        self.previous_files: Dict[str, Dict[str, Any]] = files or {}
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.compatible = files is not None
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def load(cls, path: Path, settings: Dict[str, Any]) -> "IngestManifest":
+        """Carga el manifest de disco (vacío si no existe o no es compatible)"""
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return cls(path, settings)
+        if data.get("format") != MANIFEST_FORMAT or data.get("settings") != settings:
+            return cls(path, settings)
+        return cls(path, settings, data.get("files", {}))
+    
+    def reset(self) -> None:
+        """Descarta el estado previo (reconstrucción completa)"""
+        self.previous_files = {}
+        self.compatible = False
+    
+    def is_unchanged(self, source: str, digest: str) -> bool:
+        """True si el archivo ya fue ingerido con el mismo contenido (y lo conserva en el manifest nuevo)"""
+        with self._lock:
+            previous = self.previous_files.get(source)
+            if previous is not None and previous["sha256"] == digest:
+                self.files[source] = previous
+                return True
+            return False
+    
+    def plan_file(self, source: str, digest: str, chunks: List[Document]) -> Tuple[List[Document], List[str], List[str]]:
+        """
+        Compara los chunks actuales de un archivo con los ingeridos
+        
+        Returns:
+            (chunks nuevos, sus IDs, IDs de chunks que ya no existen)
+        """
+        current: Dict[str, str] = {}
+        new_docs: List[Document] = []
+        new_ids: List[str] = []
+        occurrences: Dict[str, int] = {}
+        with self._lock:
+            previous_chunks = self.previous_files.get(source, {}).get("chunks", {})
+        for chunk in chunks:
+            digest_chunk = content_hash(chunk.page_content)
+            occurrence = occurrences.get(digest_chunk, 0)
+            occurrences[digest_chunk] = occurrence + 1
+            doc_id = chunk_id(source, digest_chunk, occurrence)
+            current[doc_id] = digest_chunk
+            if doc_id not in previous_chunks:
+                new_docs.append(chunk)
+                new_ids.append(doc_id)
+        stale_ids = [doc_id for doc_id in previous_chunks if doc_id not in current]
+        with self._lock:
+            self.files[source] = {"sha256": digest, "chunks": current}
+        return new_docs, new_ids, stale_ids
+    
+    def removed_ids(self, seen_sources: Iterable[str]) -> List[str]:
+        """IDs de los chunks de archivos que ya no existen"""
+        seen = set(seen_sources)
+        with self._lock:
+            return [
+                doc_id
+                for source, entry in self.previous_files.items()
+                if source not in seen
+                for doc_id in entry["chunks"]
+            ]
+    
+    def chunk_count(self) -> int:
+        """Chunks registrados en el manifest nuevo"""
+        with self._lock:
+            return sum(len(entry["chunks"]) for entry in self.files.values())
+    
+    def save(self) -> None:
+        """Guarda el manifest nuevo de forma atómica"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with self._lock:
+            data = {"format": MANIFEST_FORMAT, "settings": self.settings, "files": self.files}
+        tmp_path.write_text(json.dumps(data, ensure_ascii=False))
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,266 @@
+"""
+Pipeline de ingest en streaming
+descubrimiento de archivos → workers de carga/split → embeddings por lotes → upsert por lotes
+
+Cada etapa corre en su propio hilo (o pool de hilos) y se comunica con la siguiente
+mediante colas acotadas: si una etapa se atrasa, las anteriores se bloquean (back-pressure),
+por lo que la memoria pico depende del tamaño de lote y de las colas, no del tamaño del corpus.
+"""
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_community.document_loaders import TextLoader
+from config import (
+    DATA_PATH,
+    CHUNK_SIZE,
+    CHUNK_OVERLAP,
+    INGEST_BATCH_SIZE,
+    INGEST_WORKERS,
+    INGEST_QUEUE_SIZE
+)
+from ingest_manifest import IngestManifest, file_hash
+
+# Marca de fin de stream entre etapas
+_DONE = object()
+
+class StageStats:
+    """Contadores de una etapa: elementos procesados y tiempo ocupado"""
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+    
+    def record(self, items: int, seconds: float) -> None:
+        with self._lock:
+            self.items += items
+            self.busy_seconds += seconds
+    
+    def to_dict(self, wall_seconds: float) -> Dict[str, Any]:
+        return {
+            "stage": self.name,
+            "items": self.items,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "items_per_second": round(self.items / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+        }
+
+def discover_files(data_path: Path, pattern: str = "*.txt") -> Iterator[Path]:
+    """Genera los archivos a ingerir (ordenados, recursivo)"""
+    yield from sorted(data_path.rglob(pattern))
+
+class IngestPipeline:
+    """
+    Pipeline de ingest por etapas con colas acotadas
+    
+    Args:
+        vectordb: Vector store destino (usa begin_ingest/upsert_embeddings/finish_ingest)
+        embeddings: Modelo de embeddings
+        batch_size: Chunks por lote de embeddings/upsert
+        workers: Hilos de carga y split
+        queue_size: Capacidad (en lotes) de las colas entre etapas
+        manifest: Manifest incremental (opcional); si se da, solo se procesan
+            los chunks nuevos o modificados y se borran los eliminados
+        data_path: Carpeta base de los archivos (para las rutas relativas del manifest)
+    """
+    
+    def __init__(
+        self,
+        vectordb,
+        embeddings,
+        batch_size: int = INGEST_BATCH_SIZE,
+        workers: int = INGEST_WORKERS,
+        queue_size: int = INGEST_QUEUE_SIZE,
+        chunk_size: int = CHUNK_SIZE,
+        chunk_overlap: int = CHUNK_OVERLAP,
+        manifest: Optional[IngestManifest] = None,
+        data_path: Path = DATA_PATH
+    ):
+        self.vectordb = vectordb
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        self.manifest = manifest
+        self.data_path = data_path
+        self.stats = {
+            name: StageStats(name)
+            for name in ("discover", "load_split", "embed", "upsert", "delete")
+        }
+        self.skipped_files = 0
+        self._seen_sources: List[str] = []
+        self._stale_ids: List[str] = []
+        self._plan_lock = threading.Lock()
+        self._errors: List[BaseException] = []
+        self._stop = threading.Event()
+    
+    def _put(self, q: queue.Queue, item) -> bool:
+        """put bloqueante que se interrumpe si otra etapa falló"""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def _get(self, q: queue.Queue):
+        """get bloqueante que se interrumpe si otra etapa falló"""
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+    
+    def _run_stage(self, target: Callable, *args) -> None:
+        try:
+            target(*args)
+        except BaseException as e:
+            self._errors.append(e)
+            self._stop.set()
+    
+    def _discover(self, files: Iterator[Path], files_q: queue.Queue) -> None:
+        iterator = iter(files)
+        while True:
+            start = time.perf_counter()
+            path = next(iterator, None)
+            if path is None:
+                break
+            self.stats["discover"].record(1, time.perf_counter() - start)
+            if not self._put(files_q, path):
+                return
+        for _ in range(self.workers):
+            self._put(files_q, _DONE)
+    
+    def _load_split(self, files_q: queue.Queue, chunks_q: queue.Queue) -> None:
+        while True:
+            path = self._get(files_q)
+            if path is _DONE:
+                break
+            start = time.perf_counter()
+            if self.manifest is not None:
+                source = path.relative_to(self.data_path).as_posix()
+                digest = file_hash(path)
+                with self._plan_lock:
+                    self._seen_sources.append(source)
+                if self.manifest.is_unchanged(source, digest):
+                    with self._plan_lock:
+                        self.skipped_files += 1
+                    self.stats["load_split"].record(0, time.perf_counter() - start)
+                    continue
+            docs = TextLoader(str(path)).load()
+            chunks = self.splitter.split_documents(docs)
+            ids: List[Optional[str]] = [None] * len(chunks)
+            if self.manifest is not None:
+                chunks, ids, stale_ids = self.manifest.plan_file(source, digest, chunks)
+                with self._plan_lock:
+                    self._stale_ids.extend(stale_ids)
+            self.stats["load_split"].record(len(chunks), time.perf_counter() - start)
+            for chunk, doc_id in zip(chunks, ids):
+                if not self._put(chunks_q, (chunk, doc_id)):
+                    return
+        self._put(chunks_q, _DONE)
+    
+    def _embed(self, chunks_q: queue.Queue, vectors_q: queue.Queue) -> None:
+        finished_workers = 0
+        batch: List[Tuple[Document, Optional[str]]] = []
+        while finished_workers < self.workers:
+            item = self._get(chunks_q)
+            if item is _DONE:
+                if self._stop.is_set():
+                    return
+                finished_workers += 1
+            else:
+                batch.append(item)
+            if batch and (len(batch) >= self.batch_size or finished_workers == self.workers):
+                documents = [doc for doc, _ in batch]
+                ids = [doc_id for _, doc_id in batch]
+                start = time.perf_counter()
+                vectors = self.embeddings.embed_documents([doc.page_content for doc in documents])
+                self.stats["embed"].record(len(documents), time.perf_counter() - start)
+                if not self._put(vectors_q, (documents, vectors, ids if self.manifest is not None else None)):
+                    return
+                batch = []
+        self._put(vectors_q, _DONE)
+    
+    def _upsert(self, vectors_q: queue.Queue) -> None:
+        while True:
+            item = self._get(vectors_q)
+            if item is _DONE:
+                break
+            documents, vectors, ids = item
+            start = time.perf_counter()
+            self.vectordb.upsert_embeddings(documents, vectors, ids=ids)
+            self.stats["upsert"].record(len(documents), time.perf_counter() - start)
+    
+    def run(self, files: Iterator[Path], on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Ejecuta el pipeline completo sobre los archivos dados
+        
+        Args:
+            files: Iterador de rutas a ingerir
+            on_progress: Callback opcional con las estadísticas parciales (cada ~2s)
+        
+        Returns:
+            Estadísticas por etapa (elementos, tiempo ocupado, elementos/segundo)
+        """
+        files_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        chunks_q: queue.Queue = queue.Queue(maxsize=self.queue_size * self.batch_size)
+        vectors_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        
+        start = time.perf_counter()
+        self.vectordb.begin_ingest(incremental=self.manifest is not None and self.manifest.compatible)
+        threads = [threading.Thread(target=self._run_stage, args=(self._discover, files, files_q), name="ingest-discover")]
+        threads += [
+            threading.Thread(target=self._run_stage, args=(self._load_split, files_q, chunks_q), name=f"ingest-split-{i}")
+            for i in range(self.workers)
+        ]
+        threads.append(threading.Thread(target=self._run_stage, args=(self._embed, chunks_q, vectors_q), name="ingest-embed"))
+        threads.append(threading.Thread(target=self._run_stage, args=(self._upsert, vectors_q), name="ingest-upsert"))
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(timeout=2)
+                if on_progress is not None and thread.is_alive():
+                    on_progress(self.report(time.perf_counter() - start))
+        
+        if self._errors:
+            raise self._errors[0]
+        
+        # Borrar los chunks modificados o de archivos eliminados
+        if self.manifest is not None:
+            stale_ids = self._stale_ids + self.manifest.removed_ids(self._seen_sources)
+            for i in range(0, len(stale_ids), self.batch_size):
+                batch_ids = stale_ids[i:i + self.batch_size]
+                delete_start = time.perf_counter()
+                self.vectordb.delete_embeddings(batch_ids)
+                self.stats["delete"].record(len(batch_ids), time.perf_counter() - delete_start)
+        
+        finish_start = time.perf_counter()
+        self.vectordb.finish_ingest()
+        wall_seconds = time.perf_counter() - start
+        report = self.report(wall_seconds)
+        report["finish_seconds"] = round(time.perf_counter() - finish_start, 3)
+        return report
+    
+    @property
+    def changed(self) -> bool:
+        """True si el ingest agregó o borró algún chunk"""
+        return self.stats["upsert"].items > 0 or self.stats["delete"].items > 0
+    
+    def report(self, wall_seconds: float) -> Dict[str, Any]:
+        """Estadísticas por etapa hasta el momento"""
+        return {
+            "wall_seconds": round(wall_seconds, 3),
+            "skipped_files": self.skipped_files,
+            "stages": [stats.to_dict(wall_seconds) for stats in self.stats.values()],
+        }
@@ -2,11 +2,53 @@
 FastAPI application unificada para RAG con múltiples vector stores
 Soporta FAISS, Pinecone y Weaviate
 """
-from fastapi import FastAPI, Query, HTTPException
+from fastapi import FastAPI, Query, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
-from config import VECTOR_STORE_TYPE, OPENAI_API_KEY
-from vector_stores import get_vector_store
+from typing import List
+import asyncio
+import os
+import time
+from config import (
+    VECTOR_STORE_TYPE,
+    VectorStoreType,
+    OPENAI_API_KEY,
+    SEMANTIC_CACHE_ENABLED,
+    SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_SIZE,
+    SEMANTIC_CACHE_TTL,
+    BATCH_SEARCH_MAX_QUERIES,
+    BATCHING_ENABLED,
+    BATCH_WINDOW_MS,
+    BATCH_MAX_SIZE,
+    METRICS_ENABLED,
+    PROFILING_ENABLED,
+    PROFILING_TOKEN,
+    PROFILING_INTERVAL_MS,
+    PROFILING_MAX_SECONDS,
+    READY_WARMUP_QUERIES,
+    INDEX_RELOAD_INTERVAL,
+    INDEX_RELOAD_DRAIN_TIMEOUT,
+    ADMIN_TOKEN,
+    FAISS_FALLBACK_ENABLED
+)
+from vector_stores import (
+    aclose_clients,
+    client_stats,
+    get_vector_store,
+    is_fallback,
+    load_replica,
+    resilience_families,
+    resilience_stats
+)
+from vector_stores.base import run_in_executor
+from embeddings import embedding_stats
+from semantic_cache import SemanticResultCache
+from batching import QueryCoalescer
+from hot_reload import HotSwapStore
+from metrics import REGISTRY, REQUEST_SECONDS, cache_families, render_metrics, span
+from process_stats import memory_breakdown
 from openai import OpenAI
 
 app = FastAPI(title="AI Chatbot - RAG Comparison")
@@ -20,23 +62,190 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Readiness: cada worker queda fuera de rotación (/ready = 503) hasta calentar el modelo y el índice
+WARMUP_QUERIES = [
+    "¿Cuándo inicia el cuarto retiro de AFP?",
+    "¿Cuánto es el monto máximo que puedo retirar?",
+    "¿Qué es una UIT y cuánto vale?",
+]
+ready = False
+_background_tasks = []
+
+async def warm_store(vectordb):
+    """Primera inferencia del modelo y primeras búsquedas del índice"""
+    for i in range(READY_WARMUP_QUERIES):
+        await vectordb.asimilarity_search(WARMUP_QUERIES[i % len(WARMUP_QUERIES)], k=3)
+
 # Inicializar vector store según configuración
 try:
-    vectordb = get_vector_store()
+    initial_store = get_vector_store()
     print(f"✅ Vector store '{VECTOR_STORE_TYPE.value}' inicializado correctamente")
 except Exception as e:
     print(f"❌ Error inicializando vector store: {e}")
-    vectordb = None
+    initial_store = None
+
+# Referencia intercambiable: una recarga del índice no corta las consultas en curso
+active_store = HotSwapStore(
+    get_vector_store,
+    initial_store,
+    warm_up=warm_store,
+    drain_timeout=INDEX_RELOAD_DRAIN_TIMEOUT
+)
 
 # Inicializar cliente de OpenAI (opcional)
 client = None
 if OPENAI_API_KEY:
     client = OpenAI(api_key=OPENAI_API_KEY)
 
+# Caché semántica de resultados para /afp-query
+semantic_cache = None
+if SEMANTIC_CACHE_ENABLED:
+    semantic_cache = SemanticResultCache(
+        threshold=SEMANTIC_CACHE_THRESHOLD,
+        max_entries=SEMANTIC_CACHE_SIZE,
+        ttl_seconds=SEMANTIC_CACHE_TTL
+    )
+
+# Micro-batching de queries concurrentes (opcional)
+coalescer = None
+if BATCHING_ENABLED:
+    async def _batch_search(queries: List[str], k: int):
+        # Cada lote toma el store activo al ejecutarse (puede cambiar entre lotes, o
+        # aparecer después del arranque con una recarga)
+        async with active_store.acquire() as vectordb:
+            if vectordb is None:
+                raise ValueError("Vectorstore no disponible")
+            return await vectordb.abatch_similarity_search(queries, k=k)
+    
+    coalescer = QueryCoalescer(
+        _batch_search,
+        window_ms=BATCH_WINDOW_MS,
+        max_batch_size=BATCH_MAX_SIZE
+    )
+
+def _cache_metrics():
+    """Aciertos/fallos de las cachés, leídos de sus propios contadores en cada scrape"""
+    caches = {}
+    for entry in embedding_stats():
+        for name in ("query_cache", "disk_cache"):
+            if name in entry:
+                hits, misses = caches.get(name, (0, 0))
+                caches[name] = (hits + entry[name]["hits"], misses + entry[name]["misses"])
+    if semantic_cache is not None:
+        stats = semantic_cache.stats()
+        caches["semantic_cache"] = (stats["hits"], stats["misses"])
+    return cache_families(caches) if caches else []
+
+REGISTRY.register_collector(_cache_metrics)
+# Hedges, respaldos en la réplica FAISS y estado del circuito de los stores remotos
+REGISTRY.register_collector(resilience_families)
+
+if METRICS_ENABLED:
+    @app.middleware("http")
+    async def record_request_metrics(request: Request, call_next):
+        """Duración de cada petición por endpoint (ruta de FastAPI, no la URL con parámetros)"""
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            route = request.scope.get("route")
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                endpoint=route.path if route is not None else "unmatched",
+                method=request.method,
+                status=status
+            )
+
+if PROFILING_ENABLED:
+    from profiling import finish, try_start
+    
+    def _profiling_authorized(request: Request) -> bool:
+        return not PROFILING_TOKEN or request.headers.get("X-Profile-Token") == PROFILING_TOKEN
+    
+    @app.middleware("http")
+    async def profile_request(request: Request, call_next):
+        """Con el header X-Profile la respuesta es el perfil (collapsed stacks) de la petición"""
+        if not request.headers.get("X-Profile") or request.url.path == "/admin/profile":
+            return await call_next(request)
+        if not _profiling_authorized(request):
+            return PlainTextResponse("X-Profile-Token inválido", status_code=403)
+        profiler = try_start(PROFILING_INTERVAL_MS / 1000)
+        if profiler is None:
+            response = await call_next(request)
+            response.headers["X-Profile-Error"] = "otro perfil en curso"
+            return response
+        try:
+            response = await call_next(request)
+            # Consumir el cuerpo dentro del perfil: incluye la serialización de la respuesta
+            async for _ in response.body_iterator:
+                pass
+        finally:
+            collapsed, samples = finish(profiler)
+        return PlainTextResponse(
+            collapsed,
+            headers={"X-Profile-Samples": str(samples), "X-Profiled-Status": str(response.status_code)}
+        )
+    
+    @app.post("/admin/profile", response_class=PlainTextResponse)
+    async def admin_profile(
+        request: Request,
+        seconds: float = Query(10, gt=0, description="Duración de la ventana de muestreo"),
+        interval_ms: float = Query(PROFILING_INTERVAL_MS, gt=0, description="Intervalo entre muestras"),
+        include_idle: bool = Query(False, description="Incluir hilos ociosos")
+    ):
+        """Perfil de todo el proceso durante una ventana de tiempo (collapsed stacks)"""
+        if not _profiling_authorized(request):
+            raise HTTPException(status_code=403, detail="X-Profile-Token inválido")
+        profiler = try_start(interval_ms / 1000, include_idle=include_idle)
+        if profiler is None:
+            raise HTTPException(status_code=409, detail="Ya hay un perfil en curso")
+        try:
+            await asyncio.sleep(min(seconds, PROFILING_MAX_SECONDS))
+        finally:
+            collapsed, samples = finish(profiler)
+        return PlainTextResponse(collapsed, headers={"X-Profile-Samples": str(samples)})
+
+async def search_documents(vectordb, question: str, k: int):
+    """Búsqueda en el vector store, agrupada en lotes si el micro-batching está activo"""
+    with span("search", VECTOR_STORE_TYPE.value):
+        if coalescer is not None:
+            return await coalescer.search(question, k=k)
+        return await vectordb.asimilarity_search(question, k=k)
+
+async def cached_similarity_search(vectordb, question: str, k: int):
+    """
+    Búsqueda con caché semántica: reutiliza el resultado de una pregunta previa
+    suficientemente similar para el mismo vector store y versión de índice
+    """
+    if semantic_cache is None:
+        return await search_documents(vectordb, question, k)
+    
+    with span("query_embed", VECTOR_STORE_TYPE.value):
+        vector = await run_in_executor(vectordb.embeddings.embed_query, question)
+    namespace = (VECTOR_STORE_TYPE.value, vectordb.index_version(), k)
+    with span("semantic_cache_lookup", VECTOR_STORE_TYPE.value):
+        docs = semantic_cache.lookup(namespace, vector)
+    if docs is not None:
+        return docs
+    
+    start = time.perf_counter()
+    docs = await search_documents(vectordb, question, k)
+    # Lo que respondió la réplica FAISS (store remoto degradado) no se guarda con la versión del remoto
+    if not is_fallback(docs):
+        semantic_cache.store(namespace, vector, docs, time.perf_counter() - start)
+    return docs
+
 # Modelo para las consultas
 class AFPQuery(BaseModel):
     question: str
 
+class BatchSearchQuery(BaseModel):
+    queries: List[str]
+    k: int = 3
+
 @app.get("/")
 async def root():
     """Endpoint raíz para verificar que el servidor está funcionando"""
@@ -52,14 +261,14 @@ async def afp_query(query: AFPQuery):
     Endpoint para consultas sobre el cuarto retiro de AFP
     """
     try:
-        if vectordb is None:
-            raise HTTPException(
-                status_code=503,
-                detail=f"Vectorstore no disponible. Verifica tu configuración de {VECTOR_STORE_TYPE.value} y ejecuta primero 'python ingest.py'"
-            )
-        
         # Buscar información relevante en el vectorstore
-        docs = vectordb.similarity_search(query.question, k=3)
+        async with active_store.acquire() as vectordb:
+            if vectordb is None:
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"Vectorstore no disponible. Verifica tu configuración de {VECTOR_STORE_TYPE.value} y ejecuta primero 'python ingest.py'"
+                )
+            docs = await cached_similarity_search(vectordb, query.question, k=3)
         
         if not docs:
             return {
@@ -69,11 +278,12 @@ async def afp_query(query: AFPQuery):
                 "vector_store": VECTOR_STORE_TYPE.value
             }
         
-        # Combinar la información encontrada
-        context = "\n\n".join([doc.page_content for doc in docs])
-        
-        # Crear una respuesta basada en el contexto
-        answer = f"""Basándome en la información oficial disponible sobre el 4to retiro de AFP en Perú:
+        with span("response_build", VECTOR_STORE_TYPE.value):
+            # Combinar la información encontrada
+            context = "\n\n".join([doc.page_content for doc in docs])
+            
+            # Crear una respuesta basada en el contexto
+            answer = f"""Basándome en la información oficial disponible sobre el 4to retiro de AFP en Perú:
 
 {context}
 
@@ -110,14 +320,15 @@ async def search(query: str = Query(..., description="Consulta a buscar")):
     """
     Busca los documentos más relevantes para la query
     """
-    if vectordb is None:
-        raise HTTPException(
-            status_code=503,
-            detail=f"Vectorstore no disponible. Verifica tu configuración de {VECTOR_STORE_TYPE.value}"
-        )
-    
-    # Devuelve solo el top 1 documento
-    docs = vectordb.similarity_search(query, k=1)
+    async with active_store.acquire() as vectordb:
+        if vectordb is None:
+            raise HTTPException(
+                status_code=503,
+                detail=f"Vectorstore no disponible. Verifica tu configuración de {VECTOR_STORE_TYPE.value}"
+            )
+        
+        # Devuelve solo el top 1 documento
+        docs = await search_documents(vectordb, query, 1)
     
     # Extrae el contenido del documento
     results = [doc.page_content for doc in docs]
@@ -127,12 +338,133 @@ async def search(query: str = Query(..., description="Consulta a buscar")):
         "vector_store": VECTOR_STORE_TYPE.value
     }
 
+@app.post("/search/batch")
+async def search_batch(batch: BatchSearchQuery):
+    """
+    Busca varias queries en una sola petición (un paso de embeddings y búsqueda en lote)
+    """
+    if len(batch.queries) > BATCH_SEARCH_MAX_QUERIES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Demasiadas queries ({len(batch.queries)}). Máximo permitido: {BATCH_SEARCH_MAX_QUERIES}"
+        )
+    if batch.k < 1:
+        raise HTTPException(status_code=422, detail="k debe ser mayor o igual a 1")
+    
+    async with active_store.acquire() as vectordb:
+        if vectordb is None:
+            raise HTTPException(
+                status_code=503,
+                detail=f"Vectorstore no disponible. Verifica tu configuración de {VECTOR_STORE_TYPE.value}"
+            )
+        with span("search", VECTOR_STORE_TYPE.value, batch_size=len(batch.queries)):
+            docs_per_query = await vectordb.abatch_similarity_search(batch.queries, k=batch.k)
+    
+    return {
+        "results": [
+            {"query": query, "results": [doc.page_content for doc in docs]}
+            for query, docs in zip(batch.queries, docs_per_query)
+        ],
+        "vector_store": VECTOR_STORE_TYPE.value
+    }
+
 @app.get("/health")
 async def health():
     """Endpoint de health check"""
+    vectordb = active_store.current
     return {
         "status": "healthy" if vectordb is not None else "unhealthy",
+        "ready": ready,
+        "worker_pid": os.getpid(),
+        "memory": memory_breakdown(),
         "vector_store": VECTOR_STORE_TYPE.value,
-        "vector_store_available": vectordb.is_available() if vectordb else False
+        "vector_store_available": await run_in_executor(vectordb.is_available) if vectordb else False,
+        "remote_client": client_stats().get(VECTOR_STORE_TYPE.value),
+        "resilience": resilience_stats().get(VECTOR_STORE_TYPE.value),
+        "embeddings": embedding_stats(),
+        "semantic_cache": semantic_cache.stats() if semantic_cache else None,
+        "batching": coalescer.stats() if coalescer else None,
+        "index": active_store.stats()
     }
 
+@app.get("/ready")
+async def readiness():
+    """Readiness: 200 cuando este worker terminó de calentarse, 503 mientras tanto"""
+    if not ready:
+        detail = "Worker calentándose" if active_store.current is not None else "Vectorstore no disponible"
+        raise HTTPException(status_code=503, detail=detail)
+    return {"status": "ready", "worker_pid": os.getpid()}
+
+@app.post("/admin/reload")
+async def admin_reload(
+    request: Request,
+    force: bool = Query(False, description="Recargar aunque no haya una versión nueva publicada")
+):
+    """Recarga el índice en segundo plano y lo pone en servicio sin cortar las consultas en curso"""
+    if ADMIN_TOKEN and request.headers.get("X-Admin-Token") != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="X-Admin-Token inválido")
+    try:
+        result = await active_store.reload(reason="admin", force=force or active_store.current is None)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error recargando el índice: {e}")
+    if result["status"] == "error":
+        raise HTTPException(status_code=503, detail=result["detail"])
+    return result
+
+if METRICS_ENABLED:
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics():
+        """Métricas en formato de exposición de Prometheus"""
+        return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+async def warm_up():
+    """
+    Primera inferencia del modelo y primeras búsquedas del índice en este worker
+    
+    Con preload_app el modelo se carga antes del fork, pero los pools de hilos de
+    torch/FAISS y las páginas del índice se inicializan en cada worker. Si el store
+    falla (p. ej. red) se reintenta con backoff: el worker sigue fuera de rotación.
+    Si todavía no hay índice (o falla) y una recarga (watcher o /admin/reload) pone
+    otro store en servicio, se reintenta enseguida con ese.
+    """
+    global ready
+    delay = 1.0
+    while True:
+        store = active_store.current
+        start = time.perf_counter()
+        try:
+            async with active_store.acquire() as vectordb:
+                if vectordb is None:
+                    raise ValueError("Vectorstore no disponible")
+                await warm_store(vectordb)
+            break
+        except Exception as e:
+            print(f"⚠️  Error calentando el worker {os.getpid()}: {e}; reintento en {delay:.0f}s")
+            retry_at = time.monotonic() + delay
+            while time.monotonic() < retry_at and active_store.current is store:
+                await asyncio.sleep(min(1.0, delay))
+            delay = min(delay * 2, 30.0)
+    ready = True
+    print(f"✅ Worker {os.getpid()} listo ({READY_WARMUP_QUERIES} queries de calentamiento en {time.perf_counter() - start:.2f}s)")
+
+@app.on_event("startup")
+async def startup():
+    """
+    Calienta el worker en segundo plano (/health responde mientras /ready sigue en 503),
+    carga la réplica FAISS de respaldo de los stores remotos e inicia el chequeo
+    periódico de versiones nuevas del índice
+    """
+    _background_tasks.append(asyncio.create_task(warm_up()))
+    if VECTOR_STORE_TYPE != VectorStoreType.FAISS and FAISS_FALLBACK_ENABLED:
+        _background_tasks.append(asyncio.create_task(asyncio.to_thread(load_replica)))
+    if INDEX_RELOAD_INTERVAL > 0:
+        _background_tasks.append(asyncio.create_task(active_store.watch(INDEX_RELOAD_INTERVAL)))
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Cierra el vector store y los clientes compartidos de Pinecone/Weaviate"""
+    for task in _background_tasks:
+        task.cancel()
+    await active_store.aclose()
+    await aclose_clients()
+
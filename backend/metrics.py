@@ -0,0 +1,258 @@
+"""
+Métricas de latencia por etapa y contadores en formato Prometheus (sin dependencias)
+- span(etapa, store): mide un bloque y lo registra en rag_stage_duration_seconds;
+  si el bloque lanza una excepción cuenta el error en rag_errors_total
+- Histogramas y contadores con etiquetas, expuestos por render_metrics() en /metrics
+- Colectores: funciones que aportan muestras leídas en cada scrape (p. ej. hits de cachés
+  que ya llevan su propia cuenta), sin costo en el camino de las peticiones
+- Trazas OpenTelemetry opcionales (OTEL_ENABLED): cada span también es un span de OTel
+"""
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from config import METRICS_ENABLED, OTEL_ENABLED, OTEL_SERVICE_NAME
+
+# Buckets de latencia en segundos: de 0.5 ms (FAISS) a 10 s (red lenta, LLM)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+# (nombre, tipo, ayuda, [(etiquetas, valor)])
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    """Base de las métricas con etiquetas: una serie por combinación de valores"""
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+    
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+    
+    def _labels(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+class Counter(_Metric):
+    """Contador monótono"""
+    
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0.0) + amount
+    
+    def collect(self) -> Family:
+        with self._lock:
+            samples = [(self._labels(key), value) for key, value in self._series.items()]
+        return (f"{self.name}_total" if not self.name.endswith("_total") else self.name, "counter", self.documentation, samples)
+
+class Histogram(_Metric):
+    """Histograma acumulado con buckets fijos (bucket, sum y count por serie)"""
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+    
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # [conteos por bucket (+Inf al final), suma, total]
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+    
+    def collect(self) -> List[Family]:
+        with self._lock:
+            snapshot = [(key, list(series[0]), series[1], series[2]) for key, series in self._series.items()]
+        buckets, sums, counts = [], [], []
+        for key, bucket_counts, total, count in snapshot:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), bucket_counts):
+                cumulative += bucket_count
+                buckets.append(({**labels, "le": _format_value(bound) if bound != float("inf") else "+Inf"}, cumulative))
+            sums.append((labels, total))
+            counts.append((labels, count))
+        return [
+            (f"{self.name}_bucket", "histogram", self.documentation, buckets),
+            (f"{self.name}_sum", "", "", sums),
+            (f"{self.name}_count", "", "", counts),
+        ]
+
+class Registry:
+    """Conjunto de métricas y colectores que se exponen juntos"""
+    
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], List[Family]]] = []
+        self._lock = threading.Lock()
+    
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+    
+    def register_collector(self, collector: Callable[[], List[Family]]) -> None:
+        """Agrega una función que retorna familias de muestras en cada scrape"""
+        with self._lock:
+            self._collectors.append(collector)
+    
+    def render(self) -> str:
+        """Texto en el formato de exposición de Prometheus (versión 0.0.4)"""
+        lines = []
+        
+        def emit(family: Family, base_name: str) -> None:
+            name, metric_type, documentation, samples = family
+            if metric_type:
+                lines.append(f"# HELP {base_name} {documentation}")
+                lines.append(f"# TYPE {base_name} {metric_type}")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        
+        for metric in list(self._metrics):
+            if isinstance(metric, Histogram):
+                for family in metric.collect():
+                    emit(family, metric.name)
+            else:
+                family = metric.collect()
+                emit(family, family[0])
+        for collector in list(self._collectors):
+            try:
+                families = collector()
+            except Exception as e:
+                print(f"⚠️  Error en colector de métricas: {e}")
+                continue
+            for family in families:
+                emit(family, family[0])
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "rag_stage_duration_seconds",
+    "Duración de cada etapa (embedding, búsqueda ANN, red al store, armado de respuesta)",
+    ["stage", "store"]
+))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "rag_request_duration_seconds",
+    "Duración de las peticiones HTTP por endpoint",
+    ["endpoint", "method", "status"]
+))
+ERRORS = REGISTRY.register(Counter(
+    "rag_errors",
+    "Errores por etapa, store y tipo de excepción",
+    ["stage", "store", "error"]
+))
+BATCH_SIZE = REGISTRY.register(Histogram(
+    "rag_batch_size",
+    "Queries por lote de búsqueda",
+    ["store"],
+    buckets=BATCH_SIZE_BUCKETS
+))
+
+def cache_families(caches: Dict[str, Tuple[int, int]]) -> List[Family]:
+    """Familias de aciertos/fallos de cachés que llevan su propia cuenta: {caché: (hits, misses)}"""
+    return [
+        ("rag_cache_hits_total", "counter", "Aciertos por caché", [({"cache": cache}, hits) for cache, (hits, _) in caches.items()]),
+        ("rag_cache_misses_total", "counter", "Fallos por caché", [({"cache": cache}, misses) for cache, (_, misses) in caches.items()]),
+    ]
+
+_tracer = None
+
+def setup_tracing(service_name: str = OTEL_SERVICE_NAME) -> bool:
+    """
+    Activa las trazas OpenTelemetry de span()
+    
+    Usa el TracerProvider global (p. ej. el de opentelemetry-instrument); si no hay uno
+    y OTEL_EXPORTER_OTLP_ENDPOINT está definido, configura uno con exportador OTLP.
+    
+    Returns:
+        True si las trazas quedaron activas
+    """
+    global _tracer
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        print("⚠️  OTEL_ENABLED=true pero opentelemetry-api no está instalado; trazas desactivadas")
+        return False
+    
+    if os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT") and type(trace.get_tracer_provider()).__name__ == "ProxyTracerProvider":
+        try:
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor
+            try:
+                from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            except ImportError:
+                from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+            provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+            provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+            trace.set_tracer_provider(provider)
+        except ImportError:
+            print("⚠️  Falta opentelemetry-sdk o el exportador OTLP; se usa el TracerProvider global")
+    _tracer = trace.get_tracer(service_name)
+    print(f"✅ Trazas OpenTelemetry activas ({service_name})")
+    return True
+
+@contextmanager
+def span(stage: str, store: str = "", **attributes) -> Iterator[None]:
+    """
+    Mide el bloque como la etapa stage del store dado
+    
+    Con METRICS_ENABLED=false y sin trazas no hace nada.
+    """
+    if not METRICS_ENABLED and _tracer is None:
+        yield
+        return
+    otel_span = _tracer.start_as_current_span(stage, attributes={"rag.store": store, **attributes}) if _tracer else None
+    if otel_span is not None:
+        otel_span.__enter__()
+    start = time.perf_counter()
+    error: Optional[BaseException] = None
+    try:
+        yield
+    except BaseException as e:
+        error = e
+        if METRICS_ENABLED:
+            ERRORS.inc(stage=stage, store=store, error=type(e).__name__)
+        raise
+    finally:
+        if METRICS_ENABLED:
+            STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage, store=store)
+        if otel_span is not None:
+            otel_span.__exit__(type(error) if error else None, error, error.__traceback__ if error else None)
+
+def observe_batch(store: str, size: int) -> None:
+    """Registra el tamaño de un lote de búsqueda"""
+    if METRICS_ENABLED:
+        BATCH_SIZE.observe(size, store=store)
+
+def render_metrics() -> str:
+    """Todas las métricas registradas en formato Prometheus"""
+    return REGISTRY.render()
+
+if OTEL_ENABLED:
+    setup_tracing()
+
@@ -0,0 +1,54 @@
+"""
+Utilidades para medir el uso de memoria del proceso
+Sin dependencias obligatorias: usa /proc, psutil o resource según disponibilidad
+"""
+import os
+import sys
+from typing import Dict, Optional
+
+def rss_mb() -> Optional[float]:
+    """Memoria residente (RSS) actual del proceso en MB, o None si no se puede medir"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        return None
+
+def memory_breakdown() -> Dict[str, Optional[float]]:
+    """
+    Memoria del proceso en MB separando la compartida de la propia (Linux)
+    
+    Con varios workers el RSS cuenta en cada uno las páginas compartidas (modelo heredado
+    por fork, índice en memory map); PSS las reparte entre los procesos que las usan y
+    private es lo que cada worker agrega de verdad.
+    """
+    breakdown = {"rss_mb": rss_mb()}
+    fields = {"Pss": "pss_mb", "Shared_Clean": "shared_clean_mb", "Shared_Dirty": "shared_dirty_mb",
+              "Private_Clean": "private_clean_mb", "Private_Dirty": "private_dirty_mb"}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if name in fields:
+                    breakdown[fields[name]] = int(value.split()[0]) / 1024
+    except (OSError, ValueError):
+        pass
+    return {key: round(value, 1) if value is not None else None for key, value in breakdown.items()}
+
+def peak_rss_mb() -> Optional[float]:
+    """Pico de memoria residente del proceso en MB, o None si no se puede medir"""
+    try:
+        import resource
+    except ImportError:
+        return rss_mb()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KB, macOS reporta bytes
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
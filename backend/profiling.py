@@ -0,0 +1,110 @@
+"""
+Profiler de muestreo para la API (opt-in con PROFILING_ENABLED)
+Un hilo toma cada intervalo la pila de todos los hilos del proceso (sys._current_frames),
+así que ve también el trabajo que corre fuera del event loop: tokenización y forward del
+modelo, búsqueda FAISS y llamadas a clientes remotos en el executor, además de la
+serialización de la respuesta en el hilo principal. La salida es "collapsed stacks"
+(una pila por línea con su número de muestras), el formato que leen flamegraph.pl,
+speedscope e inferno. Con PROFILING_ENABLED=false main.py no registra nada: costo cero.
+"""
+import os
+import sys
+import threading
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+# Hojas de pila de hilos ociosos (executor esperando trabajo, event loop en select)
+IDLE_LEAVES = {
+    ("thread.py", "_worker"),
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+}
+
+_active_lock = threading.Lock()
+
+def _frame_label(code) -> str:
+    """función (carpeta/archivo.py): sin número de línea, para agregar por función"""
+    directory, filename = os.path.split(code.co_filename)
+    return f"{code.co_name} ({os.path.basename(directory)}/{filename})"
+
+class SamplingProfiler:
+    """
+    Muestrea las pilas de todos los hilos cada interval_s segundos
+    
+    Uso:
+        profiler = SamplingProfiler(interval_s=0.005)
+        profiler.start()
+        ...
+        profiler.stop()
+        texto = profiler.collapsed()
+    """
+    
+    def __init__(self, interval_s: float = 0.005, include_idle: bool = False, max_depth: int = 256):
+        self.interval_s = interval_s
+        self.include_idle = include_idle
+        self.max_depth = max_depth
+        self.samples = 0
+        self._stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def _is_idle(self, code) -> bool:
+        return (os.path.basename(code.co_filename), code.co_name) in IDLE_LEAVES
+    
+    def _sample(self, own_ident: int, thread_names: Dict[int, str]) -> None:
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            if not self.include_idle and self._is_idle(frame.f_code):
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            stack.append(thread_names.get(ident, f"thread-{ident}"))
+            stack.reverse()
+            self._stacks[tuple(stack)] += 1
+        self.samples += 1
+    
+    def _run(self) -> None:
+        own_ident = threading.get_ident()
+        thread_names: Dict[int, str] = {}
+        while not self._stop.wait(self.interval_s):
+            if len(thread_names) != threading.active_count():
+                thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            self._sample(own_ident, thread_names)
+    
+    def start(self) -> "SamplingProfiler":
+        self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self) -> "SamplingProfiler":
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+    
+    def collapsed(self) -> str:
+        """Pilas en formato collapsed: "hilo;marco;...;hoja N" (de más a menos muestras)"""
+        lines = [";".join(stack) + f" {count}" for stack, count in self._stacks.most_common()]
+        return "\n".join(lines) + "\n" if lines else ""
+
+def try_start(interval_s: float, include_idle: bool = False) -> Optional[SamplingProfiler]:
+    """Inicia un profiler si no hay otro activo (uno a la vez); None si está ocupado"""
+    if not _active_lock.acquire(blocking=False):
+        return None
+    try:
+        return SamplingProfiler(interval_s=interval_s, include_idle=include_idle).start()
+    except Exception:
+        _active_lock.release()
+        raise
+
+def finish(profiler: SamplingProfiler) -> Tuple[str, int]:
+    """Detiene el profiler iniciado con try_start y retorna (collapsed, muestras)"""
+    try:
+        profiler.stop()
+    finally:
+        _active_lock.release()
+    return profiler.collapsed(), profiler.samples
@@ -0,0 +1,133 @@
+"""
+Caché semántica de resultados de búsqueda
+Reutiliza el resultado de una pregunta anterior cuando el embedding de la nueva
+pregunta supera un umbral de similitud coseno con el de la anterior
+"""
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+
+class _Namespace:
+    """Entradas de un (vector store, versión de índice, k): matriz de vectores normalizados en anillo"""
+    
+    def __init__(self, dim: int, capacity: int):
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.values = [None] * capacity
+        self.created = np.full(capacity, -np.inf)
+        self.latencies = np.zeros(capacity)
+        self.size = 0
+        self.next_slot = 0
+
+class SemanticResultCache:
+    """
+    Caché de resultados indexada por similitud de embeddings
+    
+    La búsqueda es un producto punto exacto sobre una matriz acotada (SEMANTIC_CACHE_SIZE filas),
+    que con unos pocos miles de entradas cuesta microsegundos: bastante menos que la búsqueda que evita.
+    Las entradas se reemplazan en anillo (la más antigua primero) y expiran tras el TTL.
+    """
+    
+    def __init__(self, threshold: float = 0.95, max_entries: int = 1024, ttl_seconds: float = 3600):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._namespaces: Dict[Tuple, _Namespace] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self.lookup_seconds = 0.0
+    
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm > 0 else array
+    
+    def lookup(self, namespace: Tuple, vector) -> Optional[Any]:
+        """
+        Busca un resultado cacheado para un embedding
+        
+        Args:
+            namespace: Clave (vector store, versión de índice, k)
+            vector: Embedding de la pregunta
+        
+        Returns:
+            El resultado cacheado más similar sobre el umbral, o None
+        """
+        start = time.perf_counter()
+        query = self._normalize(vector)
+        with self._lock:
+            entries = self._namespaces.get(namespace)
+            value = None
+            if entries is not None and entries.size:
+                scores = entries.vectors[:entries.size] @ query
+                if self.ttl_seconds > 0:
+                    expired = time.monotonic() - entries.created[:entries.size] > self.ttl_seconds
+                    scores[expired] = -np.inf
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    value = entries.values[best]
+            elapsed = time.perf_counter() - start
+            self.lookup_seconds += elapsed
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.saved_seconds += max(entries.latencies[best] - elapsed, 0.0)
+            return value
+    
+    def store(self, namespace: Tuple, vector, value: Any, latency_seconds: float) -> None:
+        """
+        Guarda un resultado
+        
+        Args:
+            namespace: Clave (vector store, versión de índice, k)
+            vector: Embedding de la pregunta
+            value: Resultado a reutilizar
+            latency_seconds: Lo que costó obtenerlo (para estimar la latencia ahorrada)
+        """
+        if self.max_entries <= 0:
+            return
+        query = self._normalize(vector)
+        with self._lock:
+            entries = self._namespaces.get(namespace)
+            if entries is None:
+                # Una versión nueva del índice invalida solo las anteriores del mismo store (las
+                # versiones se ordenan por fecha). Durante una recarga en caliente la generación
+                # saliente aún termina búsquedas: las suyas no se guardan ni borran las de la nueva
+                store_type, version = namespace[0], namespace[1]
+                same_store = [key for key in self._namespaces if key[0] == store_type]
+                if any(key[1] > version for key in same_store):
+                    return
+                for key in same_store:
+                    if key[1] < version:
+                        del self._namespaces[key]
+                entries = self._namespaces[namespace] = _Namespace(len(query), self.max_entries)
+            slot = entries.next_slot
+            entries.vectors[slot] = query
+            entries.values[slot] = value
+            entries.created[slot] = time.monotonic()
+            entries.latencies[slot] = latency_seconds
+            entries.next_slot = (slot + 1) % self.max_entries
+            entries.size = min(entries.size + 1, self.max_entries)
+    
+    def clear(self) -> None:
+        """Vacía la caché (conserva los contadores)"""
+        with self._lock:
+            self._namespaces.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Métricas de la caché: hit ratio y latencia ahorrada"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "saved_latency_ms": round(self.saved_seconds * 1000, 2),
+                "avg_lookup_ms": round(self.lookup_seconds / lookups * 1000, 4) if lookups else 0.0,
+                "entries": sum(entries.size for entries in self._namespaces.values()),
+                "threshold": self.threshold,
+            }
@@ -6,26 +6,41 @@ from .base import VectorStoreBase
 from .faiss_store import FAISSVectorStore
 from .pinecone_store import PineconeVectorStore
 from .weaviate_store import WeaviateVectorStore
-from config import VECTOR_STORE_TYPE, VectorStoreType
+from .clients import aclose_clients, client_stats
+from .resilience import is_fallback, load_replica, resilience_families, resilience_stats
+from typing import Optional, Union
+import config
+from config import VectorStoreType
 
-def get_vector_store():
+def get_vector_store(store_type: Optional[Union[VectorStoreType, str]] = None):
     """
     Factory function para obtener el vector store configurado
     
+    Args:
+        store_type: Tipo de vector store; por defecto el VECTOR_STORE_TYPE de config, leído
+            en cada llamada (no al importar este módulo). La configuración de Pinecone y
+            Weaviate solo se carga cuando VECTOR_STORE_TYPE los selecciona, así que para
+            comparar stores conviene un proceso por store (ver scripts/benchmark.py)
+    
     Returns:
         VectorStoreBase: Instancia del vector store configurado
         
     Raises:
         ValueError: Si el tipo de vector store no es soportado
     """
-    if VECTOR_STORE_TYPE == VectorStoreType.FAISS:
+    if store_type is None:
+        store_type = config.VECTOR_STORE_TYPE
+    try:
+        store_type = VectorStoreType(store_type)
+    except ValueError:
+        raise ValueError(f"Vector store type '{store_type}' no soportado")
+    
+    if store_type == VectorStoreType.FAISS:
         return FAISSVectorStore()
-    elif VECTOR_STORE_TYPE == VectorStoreType.PINECONE:
+    elif store_type == VectorStoreType.PINECONE:
         return PineconeVectorStore()
-    elif VECTOR_STORE_TYPE == VectorStoreType.WEAVIATE:
-        return WeaviateVectorStore()
     else:
-        raise ValueError(f"Vector store type '{VECTOR_STORE_TYPE}' no soportado")
+        return WeaviateVectorStore()
 
 __all__ = [
     "VectorStoreBase",
@@ -33,5 +48,11 @@ __all__ = [
     "PineconeVectorStore",
     "WeaviateVectorStore",
     "get_vector_store",
+    "aclose_clients",
+    "client_stats",
+    "is_fallback",
+    "load_replica",
+    "resilience_families",
+    "resilience_stats",
 ]
 
@@ -2,13 +2,70 @@
 Clase base abstracta para vector stores
 Define la interfaz común que todos los vector stores deben implementar
 """
+import asyncio
+import contextvars
+import functools
+import os
+import threading
 from abc import ABC, abstractmethod
-from typing import List, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Any, Callable, Dict, Optional
 from langchain_core.documents import Document
+from config import SEARCH_EXECUTOR_WORKERS, VectorStoreType
+from .versioning import read_index_version
+from embeddings import embed_queries
+from metrics import observe_batch, span
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Retorna el executor acotado compartido para trabajo bloqueante
+    (embeddings, búsquedas FAISS, llamadas síncronas a clientes remotos)
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=SEARCH_EXECUTOR_WORKERS,
+                    thread_name_prefix="vector-search"
+                )
+    return _executor
+
+def _reset_executor() -> None:
+    """
+    Descarta el executor heredado en un proceso hijo: sus hilos no sobreviven al fork
+    (workers de gunicorn con preload_app); el hijo crea el suyo al primer uso
+    """
+    global _executor, _executor_lock
+    _executor = None
+    _executor_lock = threading.Lock()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_executor)
+
+async def run_in_executor(func: Callable, *args, **kwargs) -> Any:
+    """
+    Ejecuta una función bloqueante en el executor acotado sin bloquear el event loop
+    
+    Copia el contexto actual al hilo (como asyncio.to_thread) para que los spans de
+    trazas abiertos dentro de la función cuelguen del span de la petición
+    """
+    return await run_on_executor(get_executor(), func, *args, **kwargs)
+
+async def run_on_executor(executor: ThreadPoolExecutor, func: Callable, *args, **kwargs) -> Any:
+    """Como run_in_executor, pero en un executor propio (trabajo que no debe esperar al acotado)"""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(executor, functools.partial(context.run, func, *args, **kwargs))
 
 class VectorStoreBase(ABC):
     """Clase base abstracta para vector stores"""
     
+    store_type: VectorStoreType = None
+    
     @abstractmethod
     def similarity_search(self, query: str, k: int = 3) -> List[Document]:
         """
@@ -23,6 +80,80 @@ class VectorStoreBase(ABC):
         """
         pass
     
+    async def asimilarity_search(self, query: str, k: int = 3) -> List[Document]:
+        """
+        Versión asíncrona de similarity_search
+        
+        Por defecto ejecuta la búsqueda síncrona en el executor acotado.
+        Los stores remotos la sobrescriben usando sus clientes asíncronos nativos.
+        
+        Args:
+            query: Texto de búsqueda
+            k: Número de resultados a retornar
+            
+        Returns:
+            Lista de documentos similares
+        """
+        return await run_in_executor(self.similarity_search, query, k=k)
+    
+    def index_version(self) -> str:
+        """
+        Versión del índice que sirve este store
+        
+        Cambia cada vez que ingest.py publica datos nuevos; se usa para invalidar cachés.
+        """
+        return read_index_version(self.store_type.value)
+    
+    def published_version(self) -> str:
+        """
+        Versión publicada más reciente del índice
+        
+        Si difiere de index_version() la API recarga el store en caliente. Los stores
+        remotos siempre sirven la versión publicada, así que por defecto son iguales.
+        """
+        return self.index_version()
+    
+    async def aclose(self) -> None:
+        """Libera los clientes asíncronos (se llama al apagar la API)"""
+        pass
+    
+    @abstractmethod
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 3) -> List[Document]:
+        """
+        Busca documentos similares a un embedding ya calculado
+        
+        Args:
+            embedding: Vector de la query
+            k: Número de resultados a retornar
+            
+        Returns:
+            Lista de documentos similares
+        """
+        pass
+    
+    def batch_similarity_search(self, queries: List[str], k: int = 3) -> List[List[Document]]:
+        """
+        Busca varias queries a la vez
+        
+        Los embeddings se calculan en una sola pasada del modelo; cada store
+        puede sobrescribirlo para buscar también en lote.
+        
+        Args:
+            queries: Textos de búsqueda
+            k: Número de resultados por query
+            
+        Returns:
+            Una lista de documentos similares por cada query, en el mismo orden
+        """
+        observe_batch(self.store_type.value, len(queries))
+        with span("embed", self.store_type.value, batch_size=len(queries)):
+            vectors = embed_queries(self.embeddings, queries)
+        return [self.similarity_search_by_vector(vector, k=k) for vector in vectors]
+    
+    async def abatch_similarity_search(self, queries: List[str], k: int = 3) -> List[List[Document]]:
+        """Versión asíncrona de batch_similarity_search (por defecto en el executor acotado)"""
+        return await run_in_executor(self.batch_similarity_search, queries, k=k)
+    
     @abstractmethod
     def from_documents(self, documents: List[Document], embeddings) -> None:
         """
@@ -34,6 +165,49 @@ class VectorStoreBase(ABC):
         """
         pass
     
+    def begin_ingest(self, incremental: bool = False) -> None:
+        """
+        Prepara el store para recibir lotes de upsert_embeddings
+        
+        Args:
+            incremental: Si es False se descarta el contenido actual (reconstrucción completa);
+                si es True se conservan los datos y solo se agregan o borran chunks
+        """
+        pass
+    
+    @abstractmethod
+    def upsert_embeddings(self, documents: List[Document], vectors: List[List[float]], ids: List[str] = None) -> None:
+        """
+        Inserta (o reemplaza) un lote de documentos con sus embeddings ya calculados
+        
+        Args:
+            documents: Documentos del lote
+            vectors: Embeddings de cada documento, en el mismo orden
+            ids: IDs de los documentos (opcional)
+        """
+        pass
+    
+    @abstractmethod
+    def delete_embeddings(self, ids: List[str]) -> None:
+        """
+        Borra documentos por ID (los IDs inexistentes se ignoran)
+        
+        Args:
+            ids: IDs de los documentos a borrar
+        """
+        pass
+    
+    def finish_ingest(self) -> None:
+        """Cierra la carga por lotes (persistir, reconectar, etc.)"""
+        pass
+    
+    def upload_stats(self) -> Optional[Dict[str, Any]]:
+        """
+        Estadísticas de la última subida masiva a un store remoto (vectores, reintentos,
+        vectores/s; ver bulk_upload.BulkUploader), o None si el store no sube por red
+        """
+        return None
+    
     @abstractmethod
     def is_available(self) -> bool:
         """
@@ -0,0 +1,173 @@
+"""
+Subida masiva de vectores a los stores remotos (Pinecone, Weaviate)
+- BulkUploader parte cada lote del pipeline en sublotes de REMOTE_UPSERT_BATCH_SIZE y los
+  sube con REMOTE_UPSERT_CONCURRENCY hilos; el hilo que llama a submit() sigue calculando
+  embeddings mientras tanto (a lo sumo 2 x concurrencia sublotes en vuelo: back-pressure)
+- Un sublote que falla por un error transitorio (red, timeout, 429, 5xx) se reintenta con
+  backoff exponencial y jitter; los IDs se fijan antes de subir, así que reintentar no duplica
+- Un error definitivo detiene la subida: el siguiente submit() o flush() lo propaga
+"""
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from langchain_core.documents import Document
+from config import (
+    INGEST_BATCH_SIZE,
+    REMOTE_UPSERT_BACKOFF,
+    REMOTE_UPSERT_BATCH_SIZE,
+    REMOTE_UPSERT_CONCURRENCY,
+    REMOTE_UPSERT_MAX_RETRIES
+)
+
+# Tope de la espera entre reintentos (segundos)
+MAX_BACKOFF_SECONDS = 30.0
+
+UploadFn = Callable[..., None]
+
+def is_transient(error: BaseException) -> bool:
+    """True si vale la pena reintentar: errores de red o HTTP 408/429/5xx"""
+    status = getattr(error, "status", None) or getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status in (408, 429) or status >= 500
+    # Errores de validación del propio cliente no mejoran reintentando
+    return not isinstance(error, (ValueError, TypeError, KeyError))
+
+class BulkUploader:
+    """
+    Sube lotes (documentos, vectores, IDs) en paralelo con reintentos
+    
+    Args:
+        upload: Función que sube un sublote (documentos, vectores, IDs, **options); debe
+            ser idempotente
+        name: Nombre del store (para los logs)
+        batch_size: Vectores por petición
+        concurrency: Peticiones simultáneas
+        max_retries: Reintentos por sublote ante errores transitorios
+        backoff: Espera base en segundos (se duplica en cada reintento)
+    """
+    
+    def __init__(
+        self,
+        upload: UploadFn,
+        name: str,
+        batch_size: int = REMOTE_UPSERT_BATCH_SIZE,
+        concurrency: int = REMOTE_UPSERT_CONCURRENCY,
+        max_retries: int = REMOTE_UPSERT_MAX_RETRIES,
+        backoff: float = REMOTE_UPSERT_BACKOFF
+    ):
+        self._upload = upload
+        self.name = name
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max(0, max_retries)
+        self.backoff = backoff
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix=f"{name}-upload")
+        self._slots = threading.BoundedSemaphore(self.concurrency * 2)
+        self._futures: List[Future] = []
+        self._lock = threading.Lock()
+        self._error: Optional[BaseException] = None
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+        self.vectors = 0
+        self.batches = 0
+        self.retries = 0
+    
+    def submit(self, documents: List[Document], vectors: List[List[float]], ids: List[str], **options) -> None:
+        """Encola un lote (bloquea si hay demasiados sublotes en vuelo); options se pasan a upload"""
+        if self._started is None:
+            self._started = time.perf_counter()
+        for i in range(0, len(documents), self.batch_size):
+            self._raise_error()
+            self._slots.acquire()
+            future = self._executor.submit(
+                self._upload_with_retry,
+                documents[i:i + self.batch_size],
+                vectors[i:i + self.batch_size],
+                ids[i:i + self.batch_size],
+                options
+            )
+            future.add_done_callback(lambda _: self._slots.release())
+            self._futures.append(future)
+        self._futures = [future for future in self._futures if not future.done()]
+    
+    def _upload_with_retry(self, documents: List[Document], vectors: List[List[float]], ids: List[str], options: Dict[str, Any]) -> None:
+        if self._error is not None:
+            return
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._upload(documents, vectors, ids, **options)
+            except Exception as e:
+                if attempt == self.max_retries or not is_transient(e):
+                    with self._lock:
+                        if self._error is None:
+                            self._error = e
+                    return
+                delay = min(MAX_BACKOFF_SECONDS, self.backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+                reason = (str(e).strip().splitlines() or [type(e).__name__])[0]
+                print(f"⚠️  {self.name}: sublote de {len(documents)} falló: {reason}; reintento {attempt + 1}/{self.max_retries} en {delay:.1f}s")
+                with self._lock:
+                    self.retries += 1
+                time.sleep(delay)
+                continue
+            with self._lock:
+                self.vectors += len(documents)
+                self.batches += 1
+            return
+    
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise RuntimeError(f"Subida a {self.name} interrumpida: {self._error}") from self._error
+    
+    def flush(self) -> None:
+        """Espera a que terminen los sublotes en vuelo y propaga el primer error"""
+        for future in list(self._futures):
+            future.result()
+        self._futures = []
+        self._finished = time.perf_counter()
+        self._raise_error()
+    
+    def close(self) -> None:
+        """Espera los sublotes en vuelo y libera los hilos"""
+        self._executor.shutdown(wait=True)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Vectores subidos, reintentos y throughput (vectores/s de pared desde el primer lote)"""
+        end = self._finished or time.perf_counter()
+        wall = end - self._started if self._started is not None else 0.0
+        return {
+            "vectors": self.vectors,
+            "batches": self.batches,
+            "retries": self.retries,
+            "batch_size": self.batch_size,
+            "concurrency": self.concurrency,
+            "wall_seconds": round(wall, 3),
+            "vectors_per_second": round(self.vectors / wall, 2) if wall > 0 else 0.0,
+        }
+
+def assign_ids(documents: List[Document], ids: Optional[List[str]]) -> List[str]:
+    """IDs del lote (UUID nuevos si no vienen): fijarlos antes de subir hace idempotentes los reintentos"""
+    return list(ids) if ids else [str(uuid.uuid4()) for _ in documents]
+
+def upload_documents(vectordb, documents: List[Document], embeddings, batch_size: int = INGEST_BATCH_SIZE) -> None:
+    """
+    Agrega documentos a un store remoto por el camino de subida masiva
+    
+    Calcula los embeddings por lotes en este hilo mientras el BulkUploader del store
+    sube los lotes anteriores.
+    """
+    vectordb.begin_ingest(incremental=True)
+    for i in range(0, len(documents), batch_size):
+        batch = documents[i:i + batch_size]
+        vectordb.upsert_embeddings(batch, embeddings.embed_documents([doc.page_content for doc in batch]))
+    vectordb.finish_ingest()
+
+def print_upload_stats(stats: Dict[str, Any], name: str) -> None:
+    """Resumen de la subida masiva"""
+    print(
+        f"📤 {name}: {stats['vectors']} vectores en {stats['batches']} peticiones "
+        f"({stats['batch_size']} por petición, {stats['concurrency']} en paralelo) en {stats['wall_seconds']:.2f}s: "
+        f"{stats['vectors_per_second']:.1f} vectores/s, {stats['retries']} reintentos"
+    )
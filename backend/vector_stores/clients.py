@@ -0,0 +1,314 @@
+"""
+Clientes compartidos de Pinecone y Weaviate (uno por proceso)
+- Cada store remoto usaba su propio cliente: crear uno nuevo (y listar los índices) en cada
+  construcción, en cada recarga en caliente y en cada ingest costaba handshakes TLS y
+  llamadas al plano de control. Aquí se crean una sola vez, con pool de conexiones
+  keep-alive, tamaño de pool y timeouts configurables
+- Los metadatos del índice de Pinecone (host, dimensión, métrica) se cachean; solo se vuelven
+  a pedir al crear el índice en el ingest
+- StoreHealth: el estado de salud se cachea STORE_HEALTH_TTL segundos; cuando vence se
+  devuelve el último valor conocido y se refresca en un hilo aparte, así /health y las
+  consultas no esperan una llamada de red
+- Después del fork (workers de gunicorn con preload_app) los clientes heredados se descartan
+  sin cerrarlos (sus sockets son del proceso maestro) y cada worker crea los suyos
+- Los stores no cierran estos clientes; se cierran con aclose_clients() al apagar la API
+"""
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+import config
+from config import (
+    PINECONE_POOL_MAXSIZE,
+    PINECONE_POOL_THREADS,
+    STORE_HEALTH_TTL,
+    WEAVIATE_INIT_TIMEOUT,
+    WEAVIATE_INSERT_TIMEOUT,
+    WEAVIATE_POOL_CONNECTIONS,
+    WEAVIATE_POOL_MAXSIZE,
+    WEAVIATE_QUERY_TIMEOUT,
+)
+
+_lock = threading.RLock()
+_pinecone = None
+_pinecone_indexes: Dict[str, Any] = {}
+_pinecone_descriptions: Dict[str, Any] = {}
+_pinecone_async = None
+_weaviate = None
+_weaviate_async = None
+_async_loop = None
+_async_lock: Optional[asyncio.Lock] = None
+
+class StoreHealth:
+    """Estado de salud de un store remoto, cacheado con TTL y refrescado en segundo plano"""
+    
+    def __init__(self, name: str, check: Callable[[], bool], ttl: float = STORE_HEALTH_TTL):
+        self.name = name
+        self.ttl = ttl
+        self._check = check
+        self._healthy: Optional[bool] = None
+        self._checked_at = 0.0
+        self._last_error: Optional[str] = None
+        self._refreshing = False
+        self._lock = threading.Lock()
+    
+    def set(self, healthy: bool, error: Optional[str] = None) -> None:
+        """Registra un resultado obtenido por otra vía (p. ej. al conectar)"""
+        self._healthy = healthy
+        self._last_error = error
+        self._checked_at = time.monotonic()
+    
+    def refresh(self) -> bool:
+        """Ejecuta el chequeo ahora (bloqueante)"""
+        try:
+            self.set(bool(self._check()))
+        except Exception as e:
+            self.set(False, str(e))
+        finally:
+            self._refreshing = False
+        return self._healthy
+    
+    def is_healthy(self) -> bool:
+        """
+        Último estado conocido; si venció el TTL lanza un refresco en segundo plano
+        
+        Solo el primer chequeo (nunca se conectó) es síncrono.
+        """
+        if self._healthy is None:
+            return self.refresh()
+        if time.monotonic() - self._checked_at >= self.ttl:
+            with self._lock:
+                if not self._refreshing:
+                    self._refreshing = True
+                    threading.Thread(target=self.refresh, name=f"{self.name}-health", daemon=True).start()
+        return self._healthy
+    
+    def _reset_after_fork(self) -> None:
+        self._refreshing = False
+        self._lock = threading.Lock()
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "healthy": self._healthy,
+            "age_seconds": round(time.monotonic() - self._checked_at, 1) if self._healthy is not None else None,
+            "ttl_seconds": self.ttl,
+            "last_error": self._last_error,
+        }
+
+# ---------------------------------------------------------------- Pinecone
+
+def get_pinecone_client():
+    """Cliente de Pinecone (plano de control) compartido"""
+    global _pinecone
+    if _pinecone is None:
+        with _lock:
+            if _pinecone is None:
+                from pinecone import Pinecone
+                _pinecone = Pinecone(
+                    api_key=config.PINECONE_API_KEY,
+                    host=config.PINECONE_HOST,
+                    pool_threads=PINECONE_POOL_THREADS
+                )
+    return _pinecone
+
+def describe_pinecone_index(name: str, refresh: bool = False):
+    """
+    Descripción del índice (host, dimensión, métrica), cacheada
+    
+    Returns:
+        La descripción, o None si el índice no existe
+    """
+    if refresh or name not in _pinecone_descriptions:
+        pc = get_pinecone_client()
+        if name not in [index.name for index in pc.list_indexes()]:
+            _pinecone_descriptions.pop(name, None)
+            return None
+        _pinecone_descriptions[name] = pc.describe_index(name)
+    return _pinecone_descriptions[name]
+
+def forget_pinecone_index(name: str) -> None:
+    """Invalida la descripción cacheada (tras crear o borrar el índice)"""
+    _pinecone_descriptions.pop(name, None)
+
+def _data_plane_url(host: str) -> str:
+    """Con un emulador en http:// (PINECONE_HOST) el host del índice también va sin TLS"""
+    if "://" not in host and (config.PINECONE_HOST or "").startswith("http://"):
+        return f"http://{host}"
+    return host
+
+def get_pinecone_index(host: str):
+    """Índice de Pinecone (plano de datos) compartido, con pool de conexiones keep-alive"""
+    host = _data_plane_url(host)
+    if host not in _pinecone_indexes:
+        with _lock:
+            if host not in _pinecone_indexes:
+                _pinecone_indexes[host] = get_pinecone_client().Index(
+                    host=host,
+                    pool_threads=PINECONE_POOL_THREADS,
+                    connection_pool_maxsize=PINECONE_POOL_MAXSIZE
+                )
+    return _pinecone_indexes[host]
+
+async def get_pinecone_async_index(host: str):
+    """Índice asíncrono nativo de Pinecone compartido (uno por event loop)"""
+    global _pinecone_async
+    _check_loop()
+    host = _data_plane_url(host)
+    if _pinecone_async is None or host not in _pinecone_async[1]:
+        # Consultas concurrentes (un hedge, la ráfaga tras el arranque): una sola crea el cliente
+        async with _async_lock:
+            if _pinecone_async is None:
+                from pinecone import PineconeAsyncio
+                _pinecone_async = (PineconeAsyncio(api_key=config.PINECONE_API_KEY, host=config.PINECONE_HOST), {})
+            client, indexes = _pinecone_async
+            if host not in indexes:
+                indexes[host] = client.IndexAsyncio(host=host)
+    return _pinecone_async[1][host]
+
+def _check_pinecone() -> bool:
+    # Plano de datos con el pool compartido: mantiene viva la conexión keep-alive
+    description = describe_pinecone_index(config.PINECONE_INDEX_NAME)
+    if description is None:
+        return False
+    get_pinecone_index(description.host).describe_index_stats()
+    return True
+
+pinecone_health = StoreHealth("pinecone", _check_pinecone)
+
+# ---------------------------------------------------------------- Weaviate
+
+def _weaviate_additional_config():
+    from weaviate.classes.init import AdditionalConfig, Timeout
+    from weaviate.config import ConnectionConfig
+    return AdditionalConfig(
+        timeout=Timeout(init=WEAVIATE_INIT_TIMEOUT, query=WEAVIATE_QUERY_TIMEOUT, insert=WEAVIATE_INSERT_TIMEOUT),
+        connection=ConnectionConfig(
+            session_pool_connections=WEAVIATE_POOL_CONNECTIONS,
+            session_pool_maxsize=WEAVIATE_POOL_MAXSIZE
+        )
+    )
+
+def get_weaviate_client():
+    """Cliente síncrono de Weaviate compartido (REST con pool keep-alive + canal gRPC)"""
+    global _weaviate
+    if _weaviate is None:
+        with _lock:
+            if _weaviate is None:
+                import weaviate
+                from weaviate.classes.init import Auth
+                if config.WEAVIATE_API_KEY:
+                    # Para Weaviate Cloud
+                    _weaviate = weaviate.connect_to_weaviate_cloud(
+                        cluster_url=config.WEAVIATE_URL.replace("https://", "").replace("http://", ""),
+                        auth_credentials=Auth.api_key(config.WEAVIATE_API_KEY),
+                        additional_config=_weaviate_additional_config()
+                    )
+                else:
+                    # Para Weaviate local
+                    _weaviate = weaviate.connect_to_local(
+                        host=config.WEAVIATE_URL.replace("http://", "").replace("https://", "").split(":")[0],
+                        additional_config=_weaviate_additional_config()
+                    )
+    return _weaviate
+
+async def get_weaviate_async_client():
+    """Cliente asíncrono nativo de Weaviate compartido (uno por event loop)"""
+    global _weaviate_async
+    _check_loop()
+    if _weaviate_async is None:
+        # Sin el lock, cada consulta concurrente que llega durante connect() abriría su cliente
+        async with _async_lock:
+            if _weaviate_async is None:
+                import weaviate
+                from weaviate.classes.init import Auth
+                if config.WEAVIATE_API_KEY:
+                    client = weaviate.use_async_with_weaviate_cloud(
+                        cluster_url=config.WEAVIATE_URL.replace("https://", "").replace("http://", ""),
+                        auth_credentials=Auth.api_key(config.WEAVIATE_API_KEY),
+                        additional_config=_weaviate_additional_config()
+                    )
+                else:
+                    client = weaviate.use_async_with_local(
+                        host=config.WEAVIATE_URL.replace("http://", "").replace("https://", "").split(":")[0],
+                        additional_config=_weaviate_additional_config()
+                    )
+                await client.connect()
+                _weaviate_async = client
+    return _weaviate_async
+
+def _check_weaviate() -> bool:
+    return get_weaviate_client().is_ready()
+
+weaviate_health = StoreHealth("weaviate", _check_weaviate)
+
+# ---------------------------------------------------------------- Ciclo de vida
+
+def _check_loop() -> None:
+    """Los clientes asíncronos y el lock que serializa su creación quedan ligados al event loop"""
+    global _async_loop, _async_lock, _pinecone_async, _weaviate_async
+    loop = asyncio.get_running_loop()
+    if _async_loop is not loop:
+        _async_loop = loop
+        _async_lock = asyncio.Lock()
+        _pinecone_async = None
+        _weaviate_async = None
+
+async def aclose_clients() -> None:
+    """Cierra los clientes compartidos (al apagar la API o al final de un script)"""
+    global _pinecone_async, _weaviate_async, _weaviate
+    if _pinecone_async is not None:
+        client, indexes = _pinecone_async
+        _pinecone_async = None
+        for index in indexes.values():
+            await index.close()
+        await client.close()
+    if _weaviate_async is not None:
+        client, _weaviate_async = _weaviate_async, None
+        await client.close()
+    close_clients()
+
+def close_clients() -> None:
+    """Cierra los clientes síncronos compartidos"""
+    global _pinecone, _weaviate
+    if _weaviate is not None:
+        client, _weaviate = _weaviate, None
+        client.close()
+    _pinecone_indexes.clear()
+    _pinecone = None
+
+def client_stats() -> Dict[str, Any]:
+    """Clientes abiertos en este proceso y estado de salud cacheado de los stores remotos"""
+    return {
+        "pinecone": {
+            "client": _pinecone is not None,
+            "indexes": len(_pinecone_indexes),
+            "async_client": _pinecone_async is not None,
+            "pool_threads": PINECONE_POOL_THREADS,
+            "pool_maxsize": PINECONE_POOL_MAXSIZE,
+            "health": pinecone_health.stats(),
+        },
+        "weaviate": {
+            "client": _weaviate is not None,
+            "async_client": _weaviate_async is not None,
+            "pool_maxsize": WEAVIATE_POOL_MAXSIZE,
+            "health": weaviate_health.stats(),
+        },
+    }
+
+def _reset_after_fork() -> None:
+    """Descarta los clientes heredados sin cerrarlos: sus conexiones son del proceso padre"""
+    global _lock, _pinecone, _pinecone_async, _weaviate, _weaviate_async, _async_loop, _async_lock
+    _lock = threading.RLock()
+    _pinecone = None
+    _pinecone_indexes.clear()
+    _pinecone_async = None
+    _weaviate = None
+    _weaviate_async = None
+    _async_loop = None
+    _async_lock = None
+    pinecone_health._reset_after_fork()
+    weaviate_health._reset_after_fork()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,100 @@
+"""
+Construcción y parámetros de búsqueda de índices FAISS a partir de factory strings
+Ejemplos: "Flat" (búsqueda exacta), "IVF1024,Flat", "HNSW32", "IVF1024,PQ16", "SQ8"
+"""
+from typing import Any, Dict, List, Optional
+import numpy as np
+import faiss
+
+def build_index(factory: str, vectors: np.ndarray):
+    """
+    Crea un índice vacío con la factory string dada, entrenándolo si hace falta
+    
+    Si no hay suficientes vectores para entrenar (p. ej. IVF4096 con un corpus chico)
+    se usa un índice plano exacto y se avisa.
+    
+    Args:
+        factory: Factory string de FAISS
+        vectors: Muestra de entrenamiento (n, dim) en float32
+    
+    Returns:
+        Índice FAISS entrenado y sin vectores
+    """
+    dim = vectors.shape[1]
+    index = faiss.index_factory(dim, factory)
+    if not index.is_trained:
+        try:
+            index.train(vectors)
+        except RuntimeError as e:
+            print(f"⚠️  No se pudo entrenar el índice FAISS '{factory}' con {len(vectors)} vectores; se usa Flat")
+            print(f"   {str(e).splitlines()[-1]}")
+            index = faiss.IndexFlatL2(dim)
+    return index
+
+def needs_training(factory: str) -> bool:
+    """True si el tipo de índice requiere entrenamiento antes de agregar vectores"""
+    # La dimensión no afecta a si el índice se entrena; 64 es divisible por los PQ habituales
+    try:
+        return not faiss.index_factory(64, factory).is_trained
+    except RuntimeError:
+        return True
+
+def removes_in_place(index) -> bool:
+    """
+    True si index.remove_ids compacta las posiciones (lo que asume el FAISS de LangChain)
+    
+    Los índices planos (Flat, SQ, PQ) las compactan; IVF conserva las etiquetas originales
+    y HNSW no admite borrados, así que en esos casos hay que reconstruir el índice.
+    """
+    return isinstance(index, faiss.IndexFlatCodes)
+
+def empty_copy(index):
+    """Copia entrenada y vacía del índice (para reconstruirlo sin volver a entrenar)"""
+    copy = faiss.clone_index(index)
+    copy.reset()
+    return copy
+
+def reconstruct_vectors(index, positions: List[int]) -> Optional[np.ndarray]:
+    """
+    Vectores guardados en las posiciones dadas (para reconstruir el índice sin recalcular embeddings)
+    
+    IVF necesita un direct map (se crea la primera vez). Flat, HNSW e IVF,Flat devuelven el
+    vector exacto; los índices comprimidos (PQ, SQ) su versión decodificada.
+    
+    Returns:
+        Matriz (n, dim) en float32, o None si el índice no permite reconstruir vectores
+    """
+    try:
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None and ivf.direct_map.type == faiss.DirectMap.NoMap:
+            ivf.make_direct_map()
+        return index.reconstruct_batch(np.asarray(positions, dtype=np.int64))
+    except RuntimeError:
+        return None
+
+def apply_search_params(index, nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> None:
+    """Ajusta nprobe (IVF) y efSearch (HNSW); los parámetros que no aplican al índice se ignoran"""
+    space = faiss.ParameterSpace()
+    for name, value in (("nprobe", nprobe), ("efSearch", ef_search)):
+        if value:
+            try:
+                space.set_index_parameter(index, name, value)
+            except RuntimeError:
+                # El índice no tiene ese parámetro (p. ej. nprobe en HNSW)
+                pass
+
+def describe_index(index) -> Dict[str, Any]:
+    """Tipo, tamaño y parámetros de búsqueda de un índice"""
+    info: Dict[str, Any] = {
+        "type": type(index).__name__,
+        "ntotal": index.ntotal,
+        "dim": index.d,
+    }
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        info["nlist"] = ivf.nlist
+        info["nprobe"] = ivf.nprobe
+    hnsw = getattr(index, "hnsw", None)
+    if hnsw is not None:
+        info["efSearch"] = hnsw.efSearch
+    return info
@@ -0,0 +1,262 @@
+"""
+Formato de persistencia de FAISS apto para memory map
+- index.faiss: índice FAISS nativo, leído con IO_FLAG_MMAP (sin copiar al heap)
+- texts.bin / ids.bin / metadata.bin: cadenas UTF-8 concatenadas, una por fila del índice
+- *.offsets.npy: posiciones de inicio de cada cadena (int64, n + 1 valores)
+- meta.json: formato, cantidad de vectores y estrategia de distancia (se escribe al final)
+
+A diferencia de FAISS.save_local/load_local no hay pickle: varios workers de uvicorn
+comparten las mismas páginas a través de la caché del sistema operativo y el
+arranque no depende del tamaño del índice.
+
+Versiones publicadas: cada ingest escribe el índice completo en releases/.staging-<versión>,
+lo renombra a releases/<versión> y recién entonces apunta CURRENT a esa versión (rename
+atómico). La API nunca ve un índice a medio escribir y puede recargarlo en caliente.
+Sin CURRENT se usa el formato anterior (archivos directamente en la carpeta).
+"""
+import json
+import os
+import shutil
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Iterator, List, Optional
+import numpy as np
+import faiss
+from langchain_community.docstore.base import Docstore
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores.faiss import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_core.documents import Document
+
+MMAP_FORMAT = 1
+INDEX_FILE = "index.faiss"
+META_FILE = "meta.json"
+LEGACY_DOCSTORE_FILE = "index.pkl"
+RELEASES_DIR = "releases"
+CURRENT_FILE = "CURRENT"
+STAGING_PREFIX = ".staging-"
+TABLES = ("texts", "ids", "metadata")
+
+# IO_FLAG_MMAP_IFC (faiss >= 1.9) mapea índices planos, IVF y HNSW; las versiones anteriores
+# solo tienen IO_FLAG_MMAP (listas invertidas). No se pueden combinar.
+MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+def _replace(tmp_path: Path, path: Path) -> None:
+    # os.replace no invalida los mapeos abiertos: los lectores siguen viendo el archivo anterior
+    os.replace(tmp_path, path)
+
+def _write_table(path: Path, name: str, values: List[str]) -> None:
+    """Escribe una tabla de cadenas (bytes concatenados + offsets)"""
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    data_tmp = path / f"{name}.bin.tmp"
+    data_tmp.write_bytes(b"".join(encoded))
+    offsets_tmp = path / f"{name}.offsets.tmp.npy"
+    np.save(offsets_tmp, offsets)
+    _replace(data_tmp, path / f"{name}.bin")
+    _replace(offsets_tmp, path / f"{name}.offsets.npy")
+
+class StringTable:
+    """Tabla de cadenas de solo lectura sobre un memory map"""
+    
+    def __init__(self, path: Path, name: str):
+        self.offsets = np.load(path / f"{name}.offsets.npy", mmap_mode="r")
+        data_path = path / f"{name}.bin"
+        # np.memmap no acepta archivos vacíos
+        if data_path.stat().st_size > 0:
+            self.data = np.memmap(data_path, dtype=np.uint8, mode="r")
+        else:
+            self.data = np.zeros(0, dtype=np.uint8)
+    
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+    
+    def __getitem__(self, row: int) -> str:
+        start, end = self.offsets[row], self.offsets[row + 1]
+        return self.data[start:end].tobytes().decode("utf-8")
+
+class MmapDocstore(Docstore):
+    """Docstore de solo lectura: la clave de búsqueda es la fila del índice FAISS"""
+    
+    def __init__(self, path: Path):
+        self.texts = StringTable(path, "texts")
+        self.ids = StringTable(path, "ids")
+        self.metadata = StringTable(path, "metadata")
+    
+    def search(self, search: int) -> Document:
+        row = int(search)
+        return Document(
+            id=self.ids[row],
+            page_content=self.texts[row],
+            metadata=json.loads(self.metadata[row])
+        )
+
+class _RowIds(Mapping):
+    """index_to_docstore_id sin diccionario: cada posición del índice se resuelve a sí misma"""
+    
+    def __init__(self, size: int):
+        self._size = size
+    
+    def __getitem__(self, i: int) -> int:
+        if not 0 <= i < self._size:
+            raise KeyError(i)
+        return int(i)
+    
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(self._size))
+    
+    def __len__(self) -> int:
+        return self._size
+
+def is_mmap_format(path: Path) -> bool:
+    """True si la carpeta contiene un índice en formato mmap"""
+    return (path / META_FILE).exists()
+
+def is_legacy_format(path: Path) -> bool:
+    """True si la carpeta contiene un índice guardado con FAISS.save_local (pickle)"""
+    return (path / LEGACY_DOCSTORE_FILE).exists() and not is_mmap_format(path)
+
+def current_release(path: Path) -> Optional[str]:
+    """Versión publicada (puntero CURRENT) o None si la carpeta no usa versiones"""
+    try:
+        return (path / CURRENT_FILE).read_text().strip() or None
+    except OSError:
+        return None
+
+def index_dir(path: Path) -> Path:
+    """Carpeta del índice a cargar: la versión publicada o la propia carpeta (formato anterior)"""
+    release = current_release(path)
+    return path / RELEASES_DIR / release if release else path
+
+def publish_faiss(vectordb: FAISS, path: Path, release: str, factory: str = "Flat", keep: int = 3) -> Path:
+    """
+    Guarda el vectorstore como una versión nueva y la publica de forma atómica
+    
+    Args:
+        vectordb: Vectorstore de LangChain (con docstore en memoria)
+        path: Carpeta raíz del store (FAISS_VECTORSTORE_PATH)
+        release: Nombre de la versión (ordenable: se conservan las keep más recientes)
+        factory: Factory string con la que se construyó el índice (informativa)
+        keep: Versiones a conservar (la publicada nunca se borra)
+    
+    Returns:
+        Carpeta de la versión publicada
+    """
+    releases = path / RELEASES_DIR
+    staging = releases / f"{STAGING_PREFIX}{release}"
+    if staging.exists():
+        shutil.rmtree(staging)
+    save_faiss(vectordb, staging, factory=factory)
+    target = releases / release
+    os.rename(staging, target)
+    pointer_tmp = path / f"{CURRENT_FILE}.tmp"
+    pointer_tmp.write_text(release)
+    _replace(pointer_tmp, path / CURRENT_FILE)
+    _remove_flat_layout(path)
+    prune_releases(path, keep)
+    return target
+
+def _remove_flat_layout(path: Path) -> None:
+    """Borra los archivos del formato sin versiones (ya no se leen una vez publicado CURRENT)"""
+    names = [INDEX_FILE, META_FILE, LEGACY_DOCSTORE_FILE]
+    names += [f"{table}.bin" for table in TABLES] + [f"{table}.offsets.npy" for table in TABLES]
+    for name in names:
+        (path / name).unlink(missing_ok=True)
+
+def prune_releases(path: Path, keep: int) -> None:
+    """
+    Borra las versiones más antiguas dejando las keep más recientes y la publicada
+    
+    En Linux un proceso que todavía tenga mapeada una versión borrada sigue leyéndola
+    hasta liberarla (el espacio se recupera al cerrar el último mapeo).
+    """
+    releases = path / RELEASES_DIR
+    if keep <= 0 or not releases.exists():
+        return
+    current = current_release(path)
+    published = sorted(p for p in releases.iterdir() if p.is_dir() and not p.name.startswith(STAGING_PREFIX))
+    for old in published[:-keep]:
+        if old.name != current:
+            shutil.rmtree(old, ignore_errors=True)
+
+def save_faiss(vectordb: FAISS, path: Path, factory: str = "Flat") -> None:
+    """
+    Guarda un vectorstore FAISS en formato mmap
+    
+    Args:
+        vectordb: Vectorstore de LangChain (con docstore en memoria)
+        path: Carpeta destino
+        factory: Factory string con la que se construyó el índice (informativa)
+    """
+    path.mkdir(parents=True, exist_ok=True)
+    count = vectordb.index.ntotal
+    ids = [vectordb.index_to_docstore_id[i] for i in range(count)]
+    docs = [vectordb.docstore.search(doc_id) for doc_id in ids]
+    
+    # meta.json se escribe al final y se borra primero: sin él la carpeta no se considera válida
+    (path / META_FILE).unlink(missing_ok=True)
+    _write_table(path, "texts", [doc.page_content for doc in docs])
+    _write_table(path, "ids", [str(doc_id) for doc_id in ids])
+    _write_table(path, "metadata", [json.dumps(doc.metadata, ensure_ascii=False, default=str) for doc in docs])
+    index_tmp = path / f"{INDEX_FILE}.tmp"
+    faiss.write_index(vectordb.index, str(index_tmp))
+    _replace(index_tmp, path / INDEX_FILE)
+    
+    meta = {
+        "format": MMAP_FORMAT,
+        "count": count,
+        "factory": factory,
+        "normalize_L2": vectordb._normalize_L2,
+        "distance_strategy": vectordb.distance_strategy.value,
+    }
+    meta_tmp = path / f"{META_FILE}.tmp"
+    meta_tmp.write_text(json.dumps(meta))
+    _replace(meta_tmp, path / META_FILE)
+    # El pickle del formato anterior ya no corresponde al índice guardado
+    (path / LEGACY_DOCSTORE_FILE).unlink(missing_ok=True)
+
+def load_faiss(path: Path, embeddings, mmap: bool = True) -> FAISS:
+    """
+    Carga un vectorstore FAISS guardado con save_faiss
+    
+    Args:
+        path: Carpeta del índice
+        embeddings: Modelo de embeddings para las queries
+        mmap: Si es True el índice y los textos se leen con memory map (solo lectura);
+            si es False se cargan en memoria y el vectorstore admite add/delete
+    
+    Returns:
+        Instancia de FAISS de LangChain
+    """
+    meta = json.loads((path / META_FILE).read_text())
+    if meta.get("format") != MMAP_FORMAT:
+        raise ValueError(f"Formato de índice FAISS no soportado: {meta.get('format')}")
+    
+    if mmap:
+        index = faiss.read_index(str(path / INDEX_FILE), MMAP_FLAGS)
+    else:
+        index = faiss.read_index(str(path / INDEX_FILE))
+    if index.ntotal != meta["count"]:
+        raise ValueError(f"Índice FAISS incompleto ({index.ntotal} vectores, se esperaban {meta['count']})")
+    
+    mmap_docstore = MmapDocstore(path)
+    if len(mmap_docstore.texts) != meta["count"]:
+        raise ValueError("Los textos del índice FAISS no coinciden con el número de vectores")
+    
+    if mmap:
+        docstore = mmap_docstore
+        index_to_docstore_id = _RowIds(meta["count"])
+    else:
+        ids = [mmap_docstore.ids[row] for row in range(meta["count"])]
+        docstore = InMemoryDocstore({doc_id: mmap_docstore.search(row) for row, doc_id in enumerate(ids)})
+        index_to_docstore_id = dict(enumerate(ids))
+    
+    return FAISS(
+        embeddings,
+        index,
+        docstore,
+        index_to_docstore_id,
+        normalize_L2=meta["normalize_L2"],
+        distance_strategy=DistanceStrategy(meta["distance_strategy"])
+    )
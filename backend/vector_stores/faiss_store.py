@@ -1,58 +1,286 @@
 """
 Implementación de FAISS vector store
 """
-from pathlib import Path
-from typing import List
+from typing import Any, Dict, List, Optional, Set, Tuple
+import numpy as np
+import faiss
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores.faiss import FAISS
 from langchain_core.documents import Document
 from .base import VectorStoreBase
-from config import FAISS_VECTORSTORE_PATH, EMBEDDING_MODEL
-from langchain_huggingface import HuggingFaceEmbeddings
+from .versioning import new_version, read_index_version
+from .faiss_mmap import (
+    RELEASES_DIR,
+    MmapDocstore,
+    current_release,
+    index_dir,
+    is_legacy_format,
+    is_mmap_format,
+    load_faiss,
+    publish_faiss
+)
+from .faiss_index import (
+    apply_search_params,
+    build_index,
+    describe_index,
+    empty_copy,
+    needs_training,
+    reconstruct_vectors,
+    removes_in_place
+)
+from config import (
+    FAISS_VECTORSTORE_PATH,
+    FAISS_MMAP,
+    FAISS_INDEX_FACTORY,
+    FAISS_TRAIN_SIZE,
+    FAISS_NPROBE,
+    FAISS_EF_SEARCH,
+    FAISS_KEEP_RELEASES,
+    INGEST_BATCH_SIZE,
+    VectorStoreType
+)
+from embeddings import get_embeddings, get_document_embeddings, embed_queries
+from metrics import observe_batch, span
 
 class FAISSVectorStore(VectorStoreBase):
     """Implementación de vector store usando FAISS (local)"""
     
+    store_type = VectorStoreType.FAISS
+    
     def __init__(self):
-        self.embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+        self.embeddings = get_embeddings()
         self.vectordb = None
+        self._version = "0"
+        self._ingest_db = None
+        self._train_buffer: List[Tuple[List[Document], List[List[float]], Optional[List[str]]]] = []
+        self._train_count = 0
+        self._deleted_ids: Set[str] = set()
+        self._modified = False
         self._load()
     
     def _load(self):
-        """Carga el vectorstore desde disco"""
+        """Carga el vectorstore desde disco (con memory map si está en el formato nuevo)"""
         try:
-            if FAISS_VECTORSTORE_PATH.exists():
+            release = current_release(FAISS_VECTORSTORE_PATH)
+            if release is not None:
+                # Versión publicada por ingest.py: su nombre es la versión del índice. Se carga
+                # esa misma carpeta (no se relee CURRENT) para no mezclar versión e índice
+                self._version = release
+                self.vectordb = load_faiss(FAISS_VECTORSTORE_PATH / RELEASES_DIR / release, self.embeddings, mmap=FAISS_MMAP)
+            elif is_mmap_format(FAISS_VECTORSTORE_PATH):
+                self._version = read_index_version(self.store_type.value)
+                self.vectordb = load_faiss(FAISS_VECTORSTORE_PATH, self.embeddings, mmap=FAISS_MMAP)
+            elif is_legacy_format(FAISS_VECTORSTORE_PATH):
+                # Índice guardado con save_local por versiones anteriores
+                self._version = read_index_version(self.store_type.value)
                 self.vectordb = FAISS.load_local(
                     str(FAISS_VECTORSTORE_PATH),
                     embeddings=self.embeddings,
                     allow_dangerous_deserialization=True
                 )
+                print("⚠️  Índice FAISS en formato pickle; ejecuta 'python ingest.py --full' para usar memory map")
             else:
                 print(f"⚠️  Vectorstore no encontrado en {FAISS_VECTORSTORE_PATH}")
                 print("   Ejecuta 'python ingest.py' para crear el vectorstore")
+            if self.vectordb is not None:
+                self.set_search_params(FAISS_NPROBE, FAISS_EF_SEARCH)
         except Exception as e:
             print(f"⚠️  Error cargando vectorstore FAISS: {e}")
             self.vectordb = None
     
+    def set_search_params(self, nprobe: int = None, ef_search: int = None) -> None:
+        """
+        Ajusta los parámetros de búsqueda del índice cargado
+        
+        Args:
+            nprobe: Listas visitadas en índices IVF
+            ef_search: Tamaño de la lista de candidatos en índices HNSW
+        """
+        if self.vectordb is not None:
+            apply_search_params(self.vectordb.index, nprobe=nprobe, ef_search=ef_search)
+    
+    def index_info(self) -> Dict[str, Any]:
+        """Tipo, tamaño y parámetros de búsqueda del índice cargado"""
+        if self.vectordb is None:
+            return {}
+        return describe_index(self.vectordb.index)
+    
     def similarity_search(self, query: str, k: int = 3) -> List[Document]:
         """Busca documentos similares"""
         if self.vectordb is None:
             raise ValueError("Vectorstore no disponible. Ejecuta 'python ingest.py' primero.")
-        return self.vectordb.similarity_search(query, k=k)
+        with span("embed", self.store_type.value):
+            vector = self.embeddings.embed_query(query)
+        return self.similarity_search_by_vector(vector, k=k)
+    
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 3) -> List[Document]:
+        """Busca documentos similares a un embedding"""
+        if self.vectordb is None:
+            raise ValueError("Vectorstore no disponible. Ejecuta 'python ingest.py' primero.")
+        with span("ann_search", self.store_type.value):
+            return self.vectordb.similarity_search_by_vector(embedding, k=k)
+    
+    def batch_similarity_search(self, queries: List[str], k: int = 3) -> List[List[Document]]:
+        """Busca varias queries con una sola llamada a index.search sobre la matriz apilada"""
+        if self.vectordb is None:
+            raise ValueError("Vectorstore no disponible. Ejecuta 'python ingest.py' primero.")
+        if not queries:
+            return []
+        store = self.store_type.value
+        observe_batch(store, len(queries))
+        with span("embed", store, batch_size=len(queries)):
+            vectors = np.asarray(embed_queries(self.embeddings, queries), dtype=np.float32)
+        with span("ann_search", store, batch_size=len(queries)):
+            if self.vectordb._normalize_L2:
+                faiss.normalize_L2(vectors)
+            _, indices = self.vectordb.index.search(vectors, k)
+        with span("docstore_fetch", store, batch_size=len(queries)):
+            results = []
+            for row in indices:
+                docs = []
+                for i in row:
+                    if i == -1:
+                        continue
+                    doc = self.vectordb.docstore.search(self.vectordb.index_to_docstore_id[i])
+                    if isinstance(doc, Document):
+                        docs.append(doc)
+                results.append(docs)
+        return results
     
     def from_documents(self, documents: List[Document], embeddings=None) -> None:
         """Crea el vectorstore a partir de documentos"""
         if embeddings is None:
-            embeddings = self.embeddings
+            embeddings = get_document_embeddings()
         
-        # Crear directorio si no existe
-        FAISS_VECTORSTORE_PATH.mkdir(parents=True, exist_ok=True)
+        # Crear vectorstore con el tipo de índice configurado y guardarlo (formato mmap)
+        vectors = embeddings.embed_documents([doc.page_content for doc in documents])
+        self.begin_ingest()
+        self.upsert_embeddings(documents, vectors)
+        self.finish_ingest()
+    
+    def begin_ingest(self, incremental: bool = False) -> None:
+        """
+        Inicia una carga por lotes: el índice se arma en memoria y se persiste al final
+        (partiendo del índice actual si es incremental)
+        """
+        self._ingest_db = None
+        self._train_buffer = []
+        self._train_count = 0
+        self._deleted_ids = set()
+        self._modified = not incremental
+        if incremental and self.vectordb is not None:
+            if isinstance(self.vectordb.docstore, MmapDocstore):
+                # El índice mapeado es de solo lectura: se carga una copia editable
+                self._ingest_db = load_faiss(index_dir(FAISS_VECTORSTORE_PATH), self.embeddings, mmap=False)
+            else:
+                self._ingest_db = self.vectordb
+    
+    def _add(self, documents: List[Document], vectors: List[List[float]], ids: Optional[List[str]]) -> None:
+        text_embeddings = [(doc.page_content, vector) for doc, vector in zip(documents, vectors)]
+        metadatas = [doc.metadata for doc in documents]
+        self._ingest_db.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+    
+    def _create_ingest_db(self) -> None:
+        """Crea el índice vacío (entrenado con los lotes acumulados) y les agrega esos lotes"""
+        sample = np.asarray([vector for _, vectors, _ in self._train_buffer for vector in vectors], dtype=np.float32)
+        index = build_index(FAISS_INDEX_FACTORY, sample)
+        self._ingest_db = FAISS(self.embeddings, index, InMemoryDocstore(), {})
+        for documents, vectors, ids in self._train_buffer:
+            self._add(documents, vectors, ids)
+        self._train_buffer = []
+        self._train_count = 0
+    
+    def upsert_embeddings(self, documents: List[Document], vectors: List[List[float]], ids: List[str] = None) -> None:
+        """
+        Agrega un lote de documentos con embeddings ya calculados al índice en construcción
         
-        # Crear vectorstore
-        self.vectordb = FAISS.from_documents(documents, embeddings)
+        Los índices que requieren entrenamiento (IVF, PQ...) acumulan hasta FAISS_TRAIN_SIZE
+        vectores antes de crearse; después los lotes se agregan directamente.
+        """
+        self._modified = True
+        if self._ingest_db is not None:
+            self._add(documents, vectors, ids)
+            return
+        self._train_buffer.append((documents, vectors, ids))
+        self._train_count += len(documents)
+        if self._train_count >= FAISS_TRAIN_SIZE or not needs_training(FAISS_INDEX_FACTORY):
+            self._create_ingest_db()
+    
+    def delete_embeddings(self, ids: List[str]) -> None:
+        """Borra documentos del índice en construcción"""
+        if self._train_buffer:
+            self._create_ingest_db()
+        if self._ingest_db is None:
+            return
+        existing = set(self._ingest_db.index_to_docstore_id.values())
+        ids = [doc_id for doc_id in ids if doc_id in existing]
+        if not ids:
+            return
+        self._modified = True
+        if removes_in_place(self._ingest_db.index):
+            self._ingest_db.delete(ids)
+        else:
+            # IVF y HNSW no compactan las posiciones al borrar: se reconstruye en finish_ingest
+            self._deleted_ids.update(ids)
+    
+    def _rebuild_without_deleted(self) -> None:
+        """
+        Reconstruye el índice (sin reentrenar) omitiendo los documentos borrados
         
-        # Guardar localmente
-        self.vectordb.save_local(str(FAISS_VECTORSTORE_PATH))
-        print(f"✅ Vectorstore FAISS guardado en {FAISS_VECTORSTORE_PATH}")
+        Los vectores se leen del índice anterior (reconstruct); solo si el índice no lo
+        permite se recalculan los embeddings (de la caché en disco si está activa).
+        """
+        old_db = self._ingest_db
+        kept = [
+            (position, doc_id)
+            for position, doc_id in sorted(old_db.index_to_docstore_id.items())
+            if doc_id not in self._deleted_ids
+        ]
+        self._ingest_db = FAISS(self.embeddings, empty_copy(old_db.index), InMemoryDocstore(), {})
+        document_embeddings = None
+        for i in range(0, len(kept), INGEST_BATCH_SIZE):
+            positions, batch_ids = zip(*kept[i:i + INGEST_BATCH_SIZE])
+            documents = [old_db.docstore.search(doc_id) for doc_id in batch_ids]
+            vectors = reconstruct_vectors(old_db.index, list(positions)) if document_embeddings is None else None
+            if vectors is None:
+                if document_embeddings is None:
+                    print(f"⚠️  El índice {type(old_db.index).__name__} no permite leer sus vectores; se recalculan los embeddings")
+                    document_embeddings = get_document_embeddings()
+                vectors = document_embeddings.embed_documents([doc.page_content for doc in documents])
+            self._add(documents, vectors, list(batch_ids))
+        self._deleted_ids = set()
+    
+    def finish_ingest(self) -> None:
+        """Publica el índice construido por lotes como una versión nueva (staging + rename atómico)"""
+        if self._train_buffer:
+            self._create_ingest_db()
+        if self._deleted_ids:
+            self._rebuild_without_deleted()
+        if self._ingest_db is None:
+            print("⚠️  No se recibieron documentos; el vectorstore FAISS no se modificó")
+            return
+        if not self._modified:
+            self._ingest_db = None
+            print("♻️  Sin cambios en el índice FAISS; no se publica una versión nueva")
+            return
+        self.vectordb, self._ingest_db = self._ingest_db, None
+        release = new_version()
+        path = publish_faiss(self.vectordb, FAISS_VECTORSTORE_PATH, release, factory=FAISS_INDEX_FACTORY, keep=FAISS_KEEP_RELEASES)
+        self._version = release
+        self.set_search_params(FAISS_NPROBE, FAISS_EF_SEARCH)
+        print(f"✅ Vectorstore FAISS publicado en {path}")
+    
+    def index_version(self) -> str:
+        """Versión cargada en memoria (la API la cambia con una recarga en caliente)"""
+        return self._version
+    
+    def published_version(self) -> str:
+        """Versión publicada en disco por el último ingest (CURRENT)"""
+        return current_release(FAISS_VECTORSTORE_PATH) or self._version
+    
+    async def aclose(self) -> None:
+        """Suelta el índice (y sus memory maps) cuando ya no lo usa ninguna consulta"""
+        self.vectordb = None
     
     def is_available(self) -> bool:
         """Verifica si el vectorstore está disponible"""
@@ -1,89 +1,180 @@
 """
 Implementación de Pinecone vector store
 """
+import asyncio
 import os
 from typing import List
 from langchain_pinecone import PineconeVectorStore as LangChainPineconeVectorStore
 from langchain_core.documents import Document
-from .base import VectorStoreBase
+from .base import VectorStoreBase, run_in_executor
+from .bulk_upload import BulkUploader, assign_ids, print_upload_stats, upload_documents
+from .clients import (
+    describe_pinecone_index,
+    forget_pinecone_index,
+    get_pinecone_async_index,
+    get_pinecone_client,
+    get_pinecone_index,
+    pinecone_health
+)
+from .resilience import get_guard
 from config import (
+    VectorStoreType,
     PINECONE_API_KEY,
     PINECONE_INDEX_NAME,
-    EMBEDDING_MODEL
+    PINECONE_TIMEOUT
 )
-from langchain_huggingface import HuggingFaceEmbeddings
+from embeddings import get_embeddings, get_document_embeddings, embed_queries
+from metrics import observe_batch, span
 from pinecone import Pinecone, ServerlessSpec
 
+try:
+    from pinecone import PineconeAsyncio
+except ImportError:  # pinecone < 6 no incluye cliente asíncrono
+    PineconeAsyncio = None
+
 class PineconeVectorStore(VectorStoreBase):
     """Implementación de vector store usando Pinecone (cloud)"""
     
+    store_type = VectorStoreType.PINECONE
+    
     def __init__(self):
         # Configurar API key como variable de entorno
         os.environ["PINECONE_API_KEY"] = PINECONE_API_KEY
         
-        self.embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+        self.embeddings = get_embeddings()
         self.vectordb = None
+        self._index_host = None
+        self._ingest_index = None
+        self._uploader = None
+        self._upload_stats = None
         self._connect()
     
     def _connect(self):
-        """Conecta a Pinecone"""
+        """Conecta a Pinecone (cliente compartido y metadatos del índice cacheados)"""
         try:
             # Verificar si el índice existe
-            pc = Pinecone(api_key=PINECONE_API_KEY)
-            index_names = [index.name for index in pc.list_indexes()]
+            description = describe_pinecone_index(PINECONE_INDEX_NAME)
             
-            if PINECONE_INDEX_NAME not in index_names:
+            if description is None:
                 print(f"⚠️  El índice '{PINECONE_INDEX_NAME}' no existe en Pinecone.")
                 print(f"   Ejecuta 'python ingest.py' primero para crear el índice y cargar los datos.")
                 self.vectordb = None
+                pinecone_health.set(False, f"El índice '{PINECONE_INDEX_NAME}' no existe")
                 return
             
-            # Intentar conectar al índice
+            # Conectar al índice con el pool de conexiones compartido
+            self._index_host = description.host
             self.vectordb = LangChainPineconeVectorStore(
-                index_name=PINECONE_INDEX_NAME,
-                embedding=self.embeddings
+                index=get_pinecone_index(self._index_host),
+                embedding=self.embeddings,
+                text_key="text"
             )
-            
-            # Verificar si el índice tiene datos
-            try:
-                # Intentar una búsqueda simple para verificar que hay datos
-                stats = pc.describe_index(PINECONE_INDEX_NAME)
-                print(f"✅ Conectado a Pinecone (índice: {PINECONE_INDEX_NAME})")
-                print(f"   Dimensiones: {stats.dimension}, Métrica: {stats.metric}")
-            except Exception as stats_error:
-                print(f"⚠️  Advertencia al verificar estadísticas del índice: {stats_error}")
+            pinecone_health.set(True)
+            print(f"✅ Conectado a Pinecone (índice: {PINECONE_INDEX_NAME})")
+            print(f"   Dimensiones: {description.dimension}, Métrica: {description.metric}")
             
         except Exception as e:
             print(f"❌ Error conectando a Pinecone: {e}")
             print(f"   Verifica tu API key y que el índice '{PINECONE_INDEX_NAME}' exista.")
             print(f"   Ejecuta 'python ingest.py' primero para crear el índice y cargar los datos.")
             self.vectordb = None
+            pinecone_health.set(False, str(e))
     
     def similarity_search(self, query: str, k: int = 3) -> List[Document]:
         """Busca documentos similares"""
+        if self.vectordb is None:
+            raise ValueError(
+                f"No se pudo conectar a Pinecone o el índice '{PINECONE_INDEX_NAME}' no existe. "
+                f"Ejecuta 'python ingest.py' primero para crear el índice y cargar los datos."
+            )
+        with span("embed", self.store_type.value):
+            vector = self.embeddings.embed_query(query)
+        return self.similarity_search_by_vector(vector, k=k)
+    
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 3) -> List[Document]:
+        """Busca documentos similares a un embedding"""
+        return self._query_index(embedding, k, PINECONE_TIMEOUT)
+    
+    def _query_index(self, embedding: List[float], k: int, timeout: float) -> List[Document]:
+        """Consulta el índice con el cliente síncrono; timeout en segundos"""
         if self.vectordb is None:
             raise ValueError(
                 f"No se pudo conectar a Pinecone o el índice '{PINECONE_INDEX_NAME}' no existe. "
                 f"Ejecuta 'python ingest.py' primero para crear el índice y cargar los datos."
             )
         try:
-            return self.vectordb.similarity_search(query, k=k)
+            # Índice compartido (no el de self.vectordb): después del fork cada worker usa el suyo
+            with span("remote_search", self.store_type.value):
+                response = get_pinecone_index(self._index_host).query(
+                    vector=list(embedding),
+                    top_k=k,
+                    include_metadata=True,
+                    _request_timeout=timeout
+                )
         except Exception as e:
             raise ValueError(
                 f"Error al buscar en Pinecone: {str(e)}. "
                 f"Verifica que el índice '{PINECONE_INDEX_NAME}' tenga datos cargados."
             )
+        return _to_documents(response.matches)
     
-    def from_documents(self, documents: List[Document], embeddings=None) -> None:
-        """Crea el vectorstore a partir de documentos"""
-        if embeddings is None:
-            embeddings = self.embeddings
-        
-        # Verificar si el índice existe, si no, crearlo
-        pc = Pinecone(api_key=PINECONE_API_KEY)
-        index_names = [index.name for index in pc.list_indexes()]
-        
-        if PINECONE_INDEX_NAME not in index_names:
+    def _use_async_client(self) -> bool:
+        return self.vectordb is not None and PineconeAsyncio is not None and self._index_host is not None
+    
+    async def _aquery_by_vector(self, vector: List[float], k: int) -> List[Document]:
+        """Consulta el índice con el cliente asíncrono nativo"""
+        try:
+            index = await get_pinecone_async_index(self._index_host)
+            with span("remote_search", self.store_type.value):
+                response = await asyncio.wait_for(
+                    index.query(vector=vector, top_k=k, include_metadata=True),
+                    timeout=PINECONE_TIMEOUT
+                )
+        except Exception as e:
+            raise ValueError(
+                f"Error al buscar en Pinecone: {str(e)}. "
+                f"Verifica que el índice '{PINECONE_INDEX_NAME}' tenga datos cargados."
+            )
+        return _to_documents(response.matches)
+    
+    async def _aremote_query(self, vector: List[float], k: int) -> List[Document]:
+        """
+        Una consulta al índice: cliente asíncrono nativo o, si no está, el síncrono en el
+        executor con timeout igual al plazo del guard (cancelarla no libera el hilo)
+        """
+        if self._use_async_client():
+            return await self._aquery_by_vector(vector, k)
+        timeout = min(PINECONE_TIMEOUT, get_guard(self.store_type.value).deadline)
+        return await run_in_executor(self._query_index, vector, k, timeout)
+    
+    async def asimilarity_search(self, query: str, k: int = 3) -> List[Document]:
+        """
+        Busca documentos similares usando el cliente asíncrono de Pinecone, con plazo,
+        hedging y respaldo en la réplica FAISS (ver resilience.py)
+        """
+        if self.vectordb is None:
+            return await super().asimilarity_search(query, k=k)
+        with span("embed", self.store_type.value):
+            vector = await run_in_executor(self.embeddings.embed_query, query)
+        return await get_guard(self.store_type.value).search(self._aremote_query, vector, k, hedge=self._use_async_client())
+    
+    async def abatch_similarity_search(self, queries: List[str], k: int = 3) -> List[List[Document]]:
+        """
+        Busca varias queries: un solo paso de embeddings y consultas concurrentes
+        (Pinecone no tiene una API de consulta multi-vector)
+        """
+        if self.vectordb is None:
+            return await super().abatch_similarity_search(queries, k=k)
+        observe_batch(self.store_type.value, len(queries))
+        with span("embed", self.store_type.value, batch_size=len(queries)):
+            vectors = await run_in_executor(embed_queries, self.embeddings, queries)
+        guard = get_guard(self.store_type.value)
+        hedge = self._use_async_client()
+        return list(await asyncio.gather(*(guard.search(self._aremote_query, vector, k, hedge=hedge) for vector in vectors)))
+    
+    def _ensure_index(self, pc: Pinecone) -> None:
+        """Crea el índice en Pinecone si no existe"""
+        if describe_pinecone_index(PINECONE_INDEX_NAME, refresh=True) is None:
             print(f"📦 Creando índice {PINECONE_INDEX_NAME} en Pinecone...")
             # Dimensiones del modelo all-MiniLM-L6-v2
             region = os.getenv("PINECONE_ENVIRONMENT", "us-east-1").replace("-aws", "").replace("-gcp", "")
@@ -94,20 +185,77 @@ class PineconeVectorStore(VectorStoreBase):
                 metric="cosine",
                 spec=ServerlessSpec(cloud="aws", region=region)
             )
+            forget_pinecone_index(PINECONE_INDEX_NAME)
             print(f"✅ Índice {PINECONE_INDEX_NAME} creado exitosamente")
         else:
             print(f"✅ Usando índice existente {PINECONE_INDEX_NAME}")
-        
-        # Crear vectorstore en Pinecone
-        # from_documents acepta embedding (singular) como segundo argumento posicional
-        self.vectordb = LangChainPineconeVectorStore.from_documents(
-            documents,
-            embeddings,  # embedding como segundo argumento posicional
-            index_name=PINECONE_INDEX_NAME  # index_name como kwarg
-        )
+    
+    def from_documents(self, documents: List[Document], embeddings=None) -> None:
+        """Crea el vectorstore a partir de documentos (subida en paralelo, ver bulk_upload.py)"""
+        if embeddings is None:
+            embeddings = get_document_embeddings()
+        upload_documents(self, documents, embeddings)
         print(f"✅ Vectorstore Pinecone creado (índice: {PINECONE_INDEX_NAME})")
     
+    def begin_ingest(self, incremental: bool = False) -> None:
+        """Crea el índice si hace falta y prepara la subida en paralelo por lotes"""
+        pc = get_pinecone_client()
+        self._ensure_index(pc)
+        self._ingest_index = get_pinecone_index(describe_pinecone_index(PINECONE_INDEX_NAME).host)
+        if not incremental:
+            try:
+                self._ingest_index.delete(delete_all=True)
+            except Exception:
+                # El namespace no existe todavía (índice vacío)
+                pass
+        self._uploader = BulkUploader(self._upload_batch, name="Pinecone")
+    
+    def _upload_batch(self, documents: List[Document], vectors: List[List[float]], ids: List[str]) -> None:
+        """Una petición de upsert (idempotente: los IDs ya vienen fijados)"""
+        self._ingest_index.upsert(vectors=[
+            {
+                "id": doc_id,
+                "values": list(vector),
+                "metadata": {**doc.metadata, "text": doc.page_content}
+            }
+            for doc_id, doc, vector in zip(ids, documents, vectors)
+        ])
+    
+    def upsert_embeddings(self, documents: List[Document], vectors: List[List[float]], ids: List[str] = None) -> None:
+        """Encola un lote de documentos con embeddings ya calculados (se sube en segundo plano)"""
+        self._uploader.submit(documents, vectors, assign_ids(documents, ids))
+    
+    def delete_embeddings(self, ids: List[str]) -> None:
+        """Borra vectores por ID (después de terminar los upserts en vuelo)"""
+        self._uploader.flush()
+        self._ingest_index.delete(ids=ids)
+    
+    def finish_ingest(self) -> None:
+        """Espera la subida pendiente y reconecta el vectorstore al índice cargado"""
+        try:
+            self._uploader.flush()
+        finally:
+            self._uploader.close()
+        self._upload_stats = self._uploader.stats()
+        print_upload_stats(self._upload_stats, "Pinecone")
+        self._uploader = None
+        self._ingest_index = None
+        self._connect()
+    
+    def upload_stats(self):
+        """Estadísticas de la última subida masiva"""
+        return self._upload_stats
+    
     def is_available(self) -> bool:
-        """Verifica si el vectorstore está disponible"""
-        return self.vectordb is not None
+        """Verifica si el vectorstore está disponible (chequeo cacheado, ver clients.StoreHealth)"""
+        return self.vectordb is not None and pinecone_health.is_healthy()
+
+def _to_documents(matches) -> List[Document]:
+    """Convierte los matches de Pinecone en Documents (el texto viaja en la metadata)"""
+    docs = []
+    for match in matches:
+        metadata = dict(match.metadata or {})
+        text = metadata.pop("text", "")
+        docs.append(Document(page_content=text, metadata=metadata))
+    return docs
 
@@ -0,0 +1,356 @@
+"""
+Búsquedas resilientes en los stores remotos (Pinecone, Weaviate)
+- Plazo por consulta (REMOTE_SEARCH_DEADLINE_MS): una llamada lenta ya no retiene la
+  petición hasta el timeout del cliente
+- Hedging: si la consulta no respondió tras el p95 de la latencia reciente se envía una
+  segunda idéntica y se usa la primera que responda (la otra se cancela); así la cola de
+  latencia deja de seguir al peor caso del servicio remoto a cambio de ~5% más consultas
+- Circuit breaker: tras CIRCUIT_FAILURE_THRESHOLD fallos o plazos vencidos seguidos el
+  circuito se abre y las consultas no van al store remoto durante CIRCUIT_RESET_SECONDS;
+  luego una sola consulta de prueba decide si se cierra o vuelve a abrirse
+- Réplica FAISS: con el circuito abierto, o si la consulta falla o vence el plazo, se
+  busca en el índice FAISS local del mismo corpus (VECTOR_STORE_TYPE=faiss python ingest.py).
+  Corre en su propio executor: las llamadas remotas colgadas que ocupan el executor acotado
+  (cancelar un hilo no lo libera) no la hacen esperar
+- Las consultas que bloquean un hilo (cliente síncrono) van con hedge=False: un hedge solo
+  duplicaría los hilos colgados; esas llamadas llevan su propio timeout igual al plazo
+- Un guard por store y por proceso: sobrevive a las recargas en caliente del store
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from langchain_core.documents import Document
+from .base import run_on_executor
+from .faiss_store import FAISSVectorStore
+from metrics import Family
+from config import (
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_SECONDS,
+    FAISS_FALLBACK_ENABLED,
+    FAISS_FALLBACK_WORKERS,
+    HEDGE_MIN_DELAY_MS,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_PERCENTILE,
+    HEDGING_ENABLED,
+    REMOTE_SEARCH_DEADLINE_MS
+)
+
+# Latencias recientes usadas para el percentil del hedging
+LATENCY_WINDOW = 512
+# Cada cuánto se vuelve a mirar si hay una versión nueva de la réplica FAISS (segundos)
+REPLICA_CHECK_SECONDS = 60.0
+# Metadato de los documentos que respondió la réplica (p. ej. para no cachearlos como del store remoto)
+FALLBACK_METADATA_KEY = "fallback_store"
+
+QueryFn = Callable[[List[float], int], Awaitable[List[Document]]]
+
+class LatencyTracker:
+    """Ventana de latencias recientes con el percentil recalculado cada pocas muestras"""
+    
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples = deque(maxlen=window)
+        self._pending = 0
+        self._cache: Dict[float, float] = {}
+    
+    def __len__(self) -> int:
+        return len(self._samples)
+    
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+        self._pending += 1
+    
+    def percentile(self, p: float) -> Optional[float]:
+        """Percentil p (0-100) en segundos; None sin muestras"""
+        if not self._samples:
+            return None
+        if self._pending >= 16:
+            self._cache.clear()
+            self._pending = 0
+        if p not in self._cache:
+            ordered = sorted(self._samples)
+            self._cache[p] = ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+        return self._cache[p]
+
+class CircuitBreaker:
+    """Circuito cerrado / abierto / semiabierto según los fallos seguidos del store remoto"""
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, name: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD, reset_seconds: float = CIRCUIT_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened = 0
+        self._opened_at = 0.0
+        self._probing = False
+    
+    def allow(self) -> bool:
+        """True si la consulta puede ir al store remoto (en semiabierto, solo la de prueba)"""
+        if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+            self.state = self.HALF_OPEN
+            self._probing = False
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+    
+    def record_success(self) -> None:
+        self.failures = 0
+        self._probing = False
+        if self.state != self.CLOSED:
+            self.state = self.CLOSED
+            print(f"✅ {self.name}: circuito cerrado, vuelve a recibir consultas")
+    
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+            self.state = self.OPEN
+            self.opened += 1
+            self._opened_at = time.monotonic()
+            print(f"🔥 {self.name}: circuito abierto tras {self.failures} fallos seguidos; {self.reset_seconds:g}s sin consultas remotas")
+    
+    def release(self) -> None:
+        """La consulta de prueba se canceló sin resultado: otra puede probar"""
+        self._probing = False
+
+# ---------------------------------------------------------------- Réplica FAISS
+
+_replica: Optional[FAISSVectorStore] = None
+_replica_checked_at: Optional[float] = None
+_replica_lock = threading.Lock()
+_replica_executor: Optional[ThreadPoolExecutor] = None
+
+def load_replica() -> Optional[FAISSVectorStore]:
+    """
+    Carga la réplica FAISS local (o la recarga si se publicó una versión nueva)
+    
+    Returns:
+        La réplica, o None si no hay un índice FAISS publicado
+    """
+    global _replica, _replica_checked_at
+    with _replica_lock:
+        now = time.monotonic()
+        if _replica_checked_at is not None and now - _replica_checked_at < REPLICA_CHECK_SECONDS:
+            return _replica
+        _replica_checked_at = now
+        if _replica is not None and _replica.published_version() == _replica.index_version():
+            return _replica
+        try:
+            store = FAISSVectorStore()
+        except Exception as e:
+            print(f"⚠️  No se pudo cargar la réplica FAISS: {e}")
+            return _replica
+        if store.is_available():
+            _replica = store
+            print(f"📌 Réplica FAISS lista para respaldo (versión {store.index_version()})")
+        elif _replica is None:
+            print("⚠️  Sin réplica FAISS para respaldo: ejecuta 'VECTOR_STORE_TYPE=faiss python ingest.py' con los mismos documentos")
+        return _replica
+
+async def get_replica() -> Optional[FAISSVectorStore]:
+    """Réplica FAISS si FAISS_FALLBACK_ENABLED; la carga fuera del executor de búsquedas"""
+    if not FAISS_FALLBACK_ENABLED:
+        return None
+    if _replica_checked_at is not None and time.monotonic() - _replica_checked_at < REPLICA_CHECK_SECONDS:
+        return _replica
+    return await asyncio.to_thread(load_replica)
+
+def _get_replica_executor() -> ThreadPoolExecutor:
+    """Hilos reservados para las búsquedas en la réplica (separados del executor acotado)"""
+    global _replica_executor
+    if _replica_executor is None:
+        with _replica_lock:
+            if _replica_executor is None:
+                _replica_executor = ThreadPoolExecutor(max_workers=FAISS_FALLBACK_WORKERS, thread_name_prefix="faiss-fallback")
+    return _replica_executor
+
+def _reset_after_fork() -> None:
+    """Los hilos del executor de la réplica no sobreviven al fork; el hijo crea el suyo"""
+    global _replica_executor, _replica_lock
+    _replica_executor = None
+    _replica_lock = threading.Lock()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+def is_fallback(docs: List[Document]) -> bool:
+    """True si el resultado lo respondió la réplica FAISS y no el store remoto"""
+    return any(doc.metadata.get(FALLBACK_METADATA_KEY) for doc in docs)
+
+# ---------------------------------------------------------------- Guard
+
+def _consume(task: asyncio.Task) -> None:
+    # La consulta perdedora puede fallar después: que no quede como excepción sin leer
+    if not task.cancelled():
+        task.exception()
+
+class RemoteSearchGuard:
+    """
+    Plazo, hedging, circuit breaker y respaldo FAISS para las consultas de un store remoto
+    
+    Args:
+        name: Nombre del store (etiqueta de las métricas)
+        deadline_ms: Plazo total de cada consulta, incluido el hedge
+    """
+    
+    def __init__(self, name: str, deadline_ms: float = REMOTE_SEARCH_DEADLINE_MS):
+        self.name = name
+        self.deadline = deadline_ms / 1000
+        self.breaker = CircuitBreaker(name)
+        self.latency = LatencyTracker()
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_winners: Dict[str, int] = {"primary": 0, "hedge": 0}
+        self.deadline_exceeded = 0
+        self.fallbacks: Dict[str, int] = {"circuit_open": 0, "deadline": 0, "error": 0}
+    
+    def hedge_delay(self) -> Optional[float]:
+        """Espera antes del hedge (segundos); None si no se hace hedging"""
+        if not HEDGING_ENABLED or len(self.latency) < HEDGE_MIN_SAMPLES or self.breaker.state != CircuitBreaker.CLOSED:
+            return None
+        delay = max(self.latency.percentile(HEDGE_PERCENTILE), HEDGE_MIN_DELAY_MS / 1000)
+        return delay if delay < self.deadline else None
+    
+    async def search(self, query: QueryFn, vector: List[float], k: int, hedge: bool = True) -> List[Document]:
+        """
+        Consulta el store remoto con query(vector, k) y, si está degradado, la réplica FAISS
+        
+        Args:
+            hedge: False si query bloquea un hilo del executor (cancelarla no lo libera)
+        
+        Raises:
+            El error del store remoto (o ValueError por plazo vencido o circuito abierto)
+            si no hay réplica de respaldo
+        """
+        self.requests += 1
+        if not self.breaker.allow():
+            return await self._fallback(vector, k, "circuit_open", ValueError(
+                f"{self.name} degradado: circuito abierto tras {self.breaker.failures} fallos seguidos"
+            ))
+        try:
+            docs = await asyncio.wait_for(self._hedged(query, vector, k, hedge), timeout=self.deadline)
+        except asyncio.TimeoutError:
+            self.deadline_exceeded += 1
+            self.breaker.record_failure()
+            return await self._fallback(vector, k, "deadline", ValueError(
+                f"La búsqueda en {self.name} superó el plazo de {self.deadline * 1000:.0f} ms"
+            ))
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except Exception as e:
+            self.breaker.record_failure()
+            return await self._fallback(vector, k, "error", e)
+        self.breaker.record_success()
+        return docs
+    
+    async def _timed(self, query: QueryFn, vector: List[float], k: int) -> List[Document]:
+        start = time.perf_counter()
+        docs = await query(vector, k)
+        self.latency.observe(time.perf_counter() - start)
+        return docs
+    
+    async def _hedged(self, query: QueryFn, vector: List[float], k: int, hedge: bool = True) -> List[Document]:
+        """Primera respuesta exitosa entre la consulta y, si tarda más que el p95, su hedge"""
+        delay = self.hedge_delay() if hedge else None
+        primary = asyncio.ensure_future(self._timed(query, vector, k))
+        if delay is None:
+            return await primary
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return primary.result()
+            hedge = asyncio.ensure_future(self._timed(query, vector, k))
+            tasks.append(hedge)
+            self.hedged += 1
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self.hedge_winners["hedge" if task is hedge else "primary"] += 1
+                        return task.result()
+            # Fallaron las dos: se informa el error de la original
+            return primary.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                task.add_done_callback(_consume)
+    
+    async def _fallback(self, vector: List[float], k: int, reason: str, error: BaseException) -> List[Document]:
+        replica = await get_replica()
+        if replica is None:
+            raise error
+        self.fallbacks[reason] += 1
+        docs = await run_on_executor(_get_replica_executor(), replica.similarity_search_by_vector, vector, k=k)
+        # Copias marcadas: la marca viaja con cada documento (lotes del coalescer, gather)
+        return [
+            Document(page_content=doc.page_content, metadata={**doc.metadata, FALLBACK_METADATA_KEY: "faiss"})
+            for doc in docs
+        ]
+    
+    def stats(self) -> Dict[str, Any]:
+        """Estado del circuito, tasas de hedge y de respaldo y latencia p95 reciente"""
+        p95 = self.latency.percentile(HEDGE_PERCENTILE)
+        delay = self.hedge_delay()
+        fallbacks = sum(self.fallbacks.values())
+        return {
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "circuit_opened": self.breaker.opened,
+            "requests": self.requests,
+            "deadline_ms": self.deadline * 1000,
+            f"p{HEDGE_PERCENTILE:g}_ms": round(p95 * 1000, 2) if p95 is not None else None,
+            "hedge_delay_ms": round(delay * 1000, 2) if delay is not None else None,
+            "hedged": self.hedged,
+            "hedge_winners": dict(self.hedge_winners),
+            "hedge_rate": round(self.hedged / self.requests, 4) if self.requests else 0.0,
+            "deadline_exceeded": self.deadline_exceeded,
+            "fallbacks": dict(self.fallbacks),
+            "fallback_rate": round(fallbacks / self.requests, 4) if self.requests else 0.0,
+            "replica_version": _replica.index_version() if _replica is not None else None,
+        }
+
+_guards: Dict[str, RemoteSearchGuard] = {}
+
+def get_guard(name: str) -> RemoteSearchGuard:
+    """Guard del store remoto name (uno por proceso)"""
+    if name not in _guards:
+        _guards[name] = RemoteSearchGuard(name)
+    return _guards[name]
+
+def resilience_stats() -> Dict[str, Dict[str, Any]]:
+    """Estado de los guards de este proceso: {store: stats}"""
+    return {name: guard.stats() for name, guard in _guards.items()}
+
+_CIRCUIT_VALUES = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+
+def resilience_families() -> List[Family]:
+    """Familias de Prometheus de los guards, leídas de sus propios contadores en cada scrape"""
+    guards = list(_guards.items())
+    return [
+        ("rag_remote_searches_total", "counter", "Consultas a stores remotos (denominador de las tasas de hedge y respaldo)",
+         [({"store": name}, guard.requests) for name, guard in guards]),
+        ("rag_hedged_requests_total", "counter", "Consultas con hedge, por consulta que respondió primero (none: fallaron o venció el plazo)",
+         [({"store": name, "winner": winner}, value) for name, guard in guards
+          for winner, value in {**guard.hedge_winners, "none": guard.hedged - sum(guard.hedge_winners.values())}.items()]),
+        ("rag_deadline_exceeded_total", "counter", "Consultas remotas que superaron REMOTE_SEARCH_DEADLINE_MS",
+         [({"store": name}, guard.deadline_exceeded) for name, guard in guards]),
+        ("rag_fallbacks_total", "counter", "Consultas respondidas por la réplica FAISS, por motivo",
+         [({"store": name, "reason": reason}, value) for name, guard in guards for reason, value in guard.fallbacks.items()]),
+        ("rag_circuit_state", "gauge", "Estado del circuit breaker (0 cerrado, 1 semiabierto, 2 abierto)",
+         [({"store": name}, _CIRCUIT_VALUES[guard.breaker.state]) for name, guard in guards]),
+    ]
@@ -0,0 +1,43 @@
+"""
+Versionado de índices
+ingest.py publica una nueva versión tras cada carga; la API la usa para invalidar cachés
+"""
+import os
+import time
+import uuid
+from typing import Dict, Tuple
+from config import INDEX_VERSIONS_PATH
+
+# Caché por store: (mtime_ns del archivo, versión leída)
+_cached_versions: Dict[str, Tuple[int, str]] = {}
+
+def _version_file(store_type: str):
+    return INDEX_VERSIONS_PATH / f"{store_type}.version"
+
+def new_version() -> str:
+    """Identificador de versión único y ordenable por fecha"""
+    return f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+def bump_index_version(store_type: str) -> str:
+    """Registra una nueva versión del índice del store y la retorna"""
+    version = new_version()
+    INDEX_VERSIONS_PATH.mkdir(parents=True, exist_ok=True)
+    path = _version_file(store_type)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(version)
+    os.replace(tmp_path, path)
+    return version
+
+def read_index_version(store_type: str) -> str:
+    """Retorna la versión publicada del índice del store ("0" si nunca se ingirió)"""
+    path = _version_file(store_type)
+    try:
+        mtime_ns = path.stat().st_mtime_ns
+    except OSError:
+        return "0"
+    cached = _cached_versions.get(store_type)
+    if cached is not None and cached[0] == mtime_ns:
+        return cached[1]
+    version = path.read_text().strip() or "0"
+    _cached_versions[store_type] = (mtime_ns, version)
+    return version
@@ -1,96 +1,195 @@
 """
 Implementación de Weaviate vector store
 """
+import asyncio
 from typing import List
 from langchain_weaviate import WeaviateVectorStore as LangChainWeaviateVectorStore
 from langchain_core.documents import Document
-from .base import VectorStoreBase
+from .base import VectorStoreBase, run_in_executor
+from .bulk_upload import BulkUploader, assign_ids, print_upload_stats, upload_documents
+from .clients import get_weaviate_async_client, get_weaviate_client, weaviate_health
+from .resilience import get_guard
 from config import (
-    WEAVIATE_URL,
-    WEAVIATE_API_KEY,
-    WEAVIATE_INDEX_NAME,
-    EMBEDDING_MODEL
+    VectorStoreType,
+    WEAVIATE_INDEX_NAME
 )
-from langchain_huggingface import HuggingFaceEmbeddings
-import weaviate
-from weaviate.classes.init import Auth
+from embeddings import get_embeddings, get_document_embeddings, embed_queries
+from metrics import observe_batch, span
+from weaviate.classes.config import Configure
+from weaviate.classes.data import DataObject
+from weaviate.classes.query import Filter
 
 class WeaviateVectorStore(VectorStoreBase):
     """Implementación de vector store usando Weaviate (cloud o local)"""
     
+    store_type = VectorStoreType.WEAVIATE
+    
     def __init__(self):
-        self.embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+        self.embeddings = get_embeddings()
         self.vectordb = None
-        self.client = None
+        self._uploader = None
+        self._upload_stats = None
         self._connect()
     
+    @property
+    def client(self):
+        """Cliente síncrono compartido (vector_stores/clients.py); None si no se pudo conectar"""
+        return get_weaviate_client() if self.vectordb is not None else None
+    
     def _connect(self):
-        """Conecta a Weaviate"""
+        """Conecta a Weaviate con el cliente compartido del proceso"""
         try:
-            # Crear cliente de Weaviate
-            if WEAVIATE_API_KEY:
-                # Para Weaviate Cloud
-                cluster_url = WEAVIATE_URL.replace("https://", "").replace("http://", "")
-                self.client = weaviate.connect_to_weaviate_cloud(
-                    cluster_url=cluster_url,
-                    auth_credentials=Auth.api_key(WEAVIATE_API_KEY)
-                )
-            else:
-                # Para Weaviate local
-                host = WEAVIATE_URL.replace("http://", "").replace("https://", "").split(":")[0]
-                self.client = weaviate.connect_to_local(host=host)
-            
-            if self.client.is_ready():
+            client = get_weaviate_client()
+            if client.is_ready():
                 self.vectordb = LangChainWeaviateVectorStore(
-                    client=self.client,
+                    client=client,
                     index_name=WEAVIATE_INDEX_NAME,
                     embedding=self.embeddings,
                     text_key="text"
                 )
+                weaviate_health.set(True)
                 print(f"✅ Conectado a Weaviate (clase: {WEAVIATE_INDEX_NAME})")
             else:
                 raise Exception("Weaviate no está listo")
         except Exception as e:
             print(f"⚠️  Error conectando a Weaviate: {e}")
             self.vectordb = None
-            if self.client:
-                self.client.close()
-                self.client = None
+            weaviate_health.set(False, str(e))
     
     def similarity_search(self, query: str, k: int = 3) -> List[Document]:
         """Busca documentos similares"""
         if self.vectordb is None:
             raise ValueError("No se pudo conectar a Weaviate. Verifica tu configuración.")
-        return self.vectordb.similarity_search(query, k=k)
+        with span("embed", self.store_type.value):
+            vector = self.embeddings.embed_query(query)
+        return self.similarity_search_by_vector(vector, k=k)
+    
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 3) -> List[Document]:
+        """Busca documentos similares a un embedding"""
+        if self.vectordb is None:
+            raise ValueError("No se pudo conectar a Weaviate. Verifica tu configuración.")
+        # Cliente compartido (no el de self.vectordb): después del fork cada worker usa el suyo
+        collection = get_weaviate_client().collections.get(WEAVIATE_INDEX_NAME)
+        with span("remote_search", self.store_type.value):
+            response = collection.query.near_vector(near_vector=list(embedding), limit=k)
+        return _to_documents(response.objects)
+    
+    async def _aquery_by_vector(self, vector: List[float], k: int) -> List[Document]:
+        """Consulta la colección con el cliente asíncrono nativo compartido"""
+        client = await get_weaviate_async_client()
+        collection = client.collections.get(WEAVIATE_INDEX_NAME)
+        with span("remote_search", self.store_type.value):
+            response = await collection.query.near_vector(near_vector=vector, limit=k)
+        return _to_documents(response.objects)
+    
+    async def asimilarity_search(self, query: str, k: int = 3) -> List[Document]:
+        """
+        Busca documentos similares usando el cliente asíncrono de Weaviate, con plazo,
+        hedging y respaldo en la réplica FAISS (ver resilience.py)
+        """
+        if self.vectordb is None:
+            raise ValueError("No se pudo conectar a Weaviate. Verifica tu configuración.")
+        with span("embed", self.store_type.value):
+            vector = await run_in_executor(self.embeddings.embed_query, query)
+        return await get_guard(self.store_type.value).search(self._aquery_by_vector, vector, k)
+    
+    async def abatch_similarity_search(self, queries: List[str], k: int = 3) -> List[List[Document]]:
+        """
+        Busca varias queries: un solo paso de embeddings y consultas near_vector concurrentes
+        (Weaviate no tiene una API de consulta multi-vector)
+        """
+        if self.vectordb is None:
+            raise ValueError("No se pudo conectar a Weaviate. Verifica tu configuración.")
+        observe_batch(self.store_type.value, len(queries))
+        with span("embed", self.store_type.value, batch_size=len(queries)):
+            vectors = await run_in_executor(embed_queries, self.embeddings, queries)
+        guard = get_guard(self.store_type.value)
+        return list(await asyncio.gather(*(guard.search(self._aquery_by_vector, vector, k) for vector in vectors)))
     
     def from_documents(self, documents: List[Document], embeddings=None) -> None:
-        """Crea el vectorstore a partir de documentos"""
+        """Crea el vectorstore a partir de documentos (subida en paralelo, ver bulk_upload.py)"""
         if embeddings is None:
-            embeddings = self.embeddings
-        
-        # Asegurar que el cliente esté conectado
-        if self.client is None or not self.client.is_ready():
+            embeddings = get_document_embeddings()
+        upload_documents(self, documents, embeddings)
+        print(f"✅ Vectorstore Weaviate creado (clase: {WEAVIATE_INDEX_NAME})")
+    
+    def begin_ingest(self, incremental: bool = False) -> None:
+        """Conecta y crea la colección (sin vectorizador propio) si no existe"""
+        if self.vectordb is None:
             self._connect()
         
-        if self.vectordb is None:
+        if self.client is None:
             raise ValueError("No se pudo conectar a Weaviate")
         
-        # Crear vectorstore en Weaviate
-        self.vectordb = LangChainWeaviateVectorStore.from_documents(
-            documents=documents,
-            embedding=embeddings,
-            client=self.client,
-            index_name=WEAVIATE_INDEX_NAME,
-            text_key="text"
-        )
-        print(f"✅ Vectorstore Weaviate creado (clase: {WEAVIATE_INDEX_NAME})")
+        if not incremental and self.client.collections.exists(WEAVIATE_INDEX_NAME):
+            self.client.collections.delete(WEAVIATE_INDEX_NAME)
+        
+        if not self.client.collections.exists(WEAVIATE_INDEX_NAME):
+            self.client.collections.create(
+                name=WEAVIATE_INDEX_NAME,
+                vectorizer_config=Configure.Vectorizer.none()
+            )
+        self._uploader = BulkUploader(self._upload_batch, name="Weaviate")
     
-    def is_available(self) -> bool:
-        """Verifica si el vectorstore está disponible"""
-        return self.vectordb is not None and self.client is not None and self.client.is_ready()
+    def _upload_batch(self, documents: List[Document], vectors: List[List[float]], ids: List[str]) -> None:
+        """
+        Una petición insert_many con UUIDs fijos: es un batch import, que sobrescribe el
+        objeto con el mismo UUID (upsert), así que reintentarla o reingerir un chunk no duplica
+        """
+        collection = self.client.collections.get(WEAVIATE_INDEX_NAME)
+        objects = [
+            DataObject(
+                properties={**doc.metadata, "text": doc.page_content},
+                vector=list(vector),
+                uuid=doc_id
+            )
+            for doc_id, doc, vector in zip(ids, documents, vectors)
+        ]
+        result = collection.data.insert_many(objects)
+        if result.has_errors:
+            # Suelen ser timeouts del servidor: RuntimeError se reintenta (ver bulk_upload.is_transient)
+            errors = [str(error.message) for error in list(result.errors.values())[:3]]
+            raise RuntimeError(f"Error insertando en Weaviate: {errors}")
+    
+    def upsert_embeddings(self, documents: List[Document], vectors: List[List[float]], ids: List[str] = None) -> None:
+        """Encola un lote de documentos con embeddings ya calculados (se sube en segundo plano)"""
+        self._uploader.submit(documents, vectors, assign_ids(documents, ids))
     
-    def __del__(self):
-        """Cierra la conexión al destruir el objeto"""
-        if self.client:
-            self.client.close()
+    def _delete(self, ids: List[str]) -> None:
+        collection = self.client.collections.get(WEAVIATE_INDEX_NAME)
+        collection.data.delete_many(where=Filter.by_id().contains_any(ids))
+    
+    def delete_embeddings(self, ids: List[str]) -> None:
+        """Borra objetos por UUID (después de terminar las inserciones en vuelo)"""
+        if self._uploader is not None:
+            self._uploader.flush()
+        self._delete(ids)
+    
+    def finish_ingest(self) -> None:
+        """Espera la subida pendiente y confirma la carga en la colección"""
+        try:
+            self._uploader.flush()
+        finally:
+            self._uploader.close()
+        self._upload_stats = self._uploader.stats()
+        print_upload_stats(self._upload_stats, "Weaviate")
+        self._uploader = None
+        print(f"✅ Vectorstore Weaviate actualizado (clase: {WEAVIATE_INDEX_NAME})")
+    
+    def upload_stats(self):
+        """Estadísticas de la última subida masiva"""
+        return self._upload_stats
+    
+    def is_available(self) -> bool:
+        """Verifica si el vectorstore está disponible (chequeo cacheado, ver clients.StoreHealth)"""
+        return self.vectordb is not None and weaviate_health.is_healthy()
+
+def _to_documents(objects) -> List[Document]:
+    """Convierte los objetos de Weaviate en Documents (el texto es la propiedad "text")"""
+    docs = []
+    for obj in objects:
+        metadata = dict(obj.properties or {})
+        text = metadata.pop("text", "")
+        docs.append(Document(page_content=text, metadata=metadata))
+    return docs
 
@@ -1,6 +1,14 @@
 """
 Script de benchmarking integrado para comparar FAISS, Pinecone y Weaviate
+Cada store corre en un subproceso propio (VECTOR_STORE_TYPE fijado antes de importar config):
+sin módulos recargados, clientes ni cachés de modelos heredados de otro store. El subproceso
+mide la memoria base, hace un calentamiento y reporta sus resultados al proceso padre,
+que los agrega en el reporte comparativo. --cpus fija los núcleos de cada subproceso.
 """
+import argparse
+import gc
+import json
+import subprocess
 import time
 import sys
 import os
@@ -11,9 +19,12 @@ import statistics
 # Agregar el backend al path
 sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
 
-from langchain_huggingface import HuggingFaceEmbeddings
-from config import VectorStoreType, EMBEDDING_MODEL
-from vector_stores import get_vector_store
+from benchmark_results import collect_environment, disable_caches, save_results
+disable_caches()
+
+from config import VectorStoreType
+from process_stats import rss_mb, peak_rss_mb
+from retrieval_metrics import percentile
 
 # Queries de prueba
 TEST_QUERIES = [
@@ -24,6 +35,19 @@ TEST_QUERIES = [
     "¿Puedo retirar en cualquier momento?",
 ]
 
+STORES = [
+    (VectorStoreType.FAISS, "FAISS"),
+    (VectorStoreType.PINECONE, "Pinecone"),
+    (VectorStoreType.WEAVIATE, "Weaviate"),
+]
+RESULT_PREFIX = "BENCHMARK_RESULT "
+
+# Variables que fijan los hilos de las librerías numéricas (--threads)
+THREAD_ENV_VARS = ["OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"]
+
+def _round_mb(value):
+    return round(value, 1) if value is not None else None
+
 class VectorStoreBenchmark:
     def __init__(self, name: str, store_type: VectorStoreType):
         self.name = name
@@ -31,29 +55,38 @@ class VectorStoreBenchmark:
         self.vectordb = None
         self.embeddings = None
         self.results = []
+        self.index_info: Dict[str, Any] = {}
+        self.memory: Dict[str, Any] = {}
+        self.timings: Dict[str, float] = {}
+        self.error = None
     
     def setup(self):
-        """Configura el vector store para benchmarking"""
+        """
+        Configura el vector store para benchmarking
+        
+        Debe ejecutarse en un proceso cuyo VECTOR_STORE_TYPE sea este store (ver run_worker):
+        la configuración de Pinecone/Weaviate se lee al importar config
+        """
         print(f"\n🔧 Configurando {self.name}...")
         try:
-            # Cambiar temporalmente el tipo de vector store
-            original_type = os.getenv("VECTOR_STORE_TYPE")
-            os.environ["VECTOR_STORE_TYPE"] = self.store_type.value
-            
-            # Recargar config y crear vector store
-            from config import VECTOR_STORE_TYPE
-            import importlib
-            import config
-            importlib.reload(config)
+            from embeddings import get_embeddings
+            from vector_stores import get_vector_store
             
-            self.embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
-            self.vectordb = get_vector_store()
+            # Memoria base: intérprete y librerías, antes de cargar modelo y store
+            gc.collect()
+            self.memory["baseline_mb"] = _round_mb(rss_mb())
+            start = time.perf_counter()
+            self.embeddings = get_embeddings()
+            self.timings["model_load_seconds"] = round(time.perf_counter() - start, 3)
+            self.memory["after_model_mb"] = _round_mb(rss_mb())
             
-            # Restaurar tipo original
-            if original_type:
-                os.environ["VECTOR_STORE_TYPE"] = original_type
-            else:
-                os.environ.pop("VECTOR_STORE_TYPE", None)
+            start = time.perf_counter()
+            self.vectordb = get_vector_store(self.store_type)
+            self.timings["store_load_seconds"] = round(time.perf_counter() - start, 3)
+            gc.collect()
+            self.memory["after_store_mb"] = _round_mb(rss_mb())
+            if hasattr(self.vectordb, "index_info"):
+                self.index_info = self.vectordb.index_info()
             
             if self.vectordb and self.vectordb.is_available():
                 print(f"✅ {self.name} configurado correctamente")
@@ -63,8 +96,20 @@ class VectorStoreBenchmark:
                 return False
         except Exception as e:
             print(f"❌ Error configurando {self.name}: {e}")
+            self.error = str(e)
             return False
     
+    def warmup(self, queries: List[str], rounds: int = 1) -> None:
+        """Búsquedas descartadas: modelo, conexiones, caché de páginas y JIT calientes antes de medir"""
+        if rounds <= 0:
+            return
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for query in queries:
+                self.search(query)
+        self.timings["warmup_seconds"] = round(time.perf_counter() - start, 3)
+        print(f"🔥 Calentamiento: {rounds * len(queries)} búsquedas en {self.timings['warmup_seconds']:.2f}s")
+    
     def search(self, query: str, k: int = 3) -> List[Any]:
         """Realiza una búsqueda y retorna los resultados"""
         return self.vectordb.similarity_search(query, k=k)
@@ -75,9 +120,9 @@ class VectorStoreBenchmark:
         results_count = []
         
         for _ in range(iterations):
-            start = time.time()
+            start = time.perf_counter()
             docs = self.search(query, k)
-            elapsed = time.time() - start
+            elapsed = time.perf_counter() - start
             times.append(elapsed)
             results_count.append(len(docs))
         
@@ -109,10 +154,67 @@ class VectorStoreBenchmark:
             print(f"  📊 Resultados encontrados: {result['results_count']:.0f}")
         
         self.results = results
+        self.memory["after_benchmark_mb"] = _round_mb(rss_mb())
+        # ru_maxrss y /proc/self/statm se muestrean distinto: el pico nunca es menor que el actual
+        self.memory["peak_mb"] = _round_mb(max(filter(None, [peak_rss_mb(), rss_mb()]), default=None))
         return results
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Resultados serializables (del subproceso al proceso padre)"""
+        return {
+            "store": self.store_type.value,
+            "results": self.results,
+            "index_info": self.index_info,
+            "memory": self.memory,
+            "timings": self.timings,
+            "error": self.error,
+        }
+    
+    @classmethod
+    def from_dict(cls, name: str, data: Dict[str, Any]) -> "VectorStoreBenchmark":
+        bench = cls(name, VectorStoreType(data["store"]))
+        bench.results = data["results"]
+        bench.index_info = data["index_info"]
+        bench.memory = data["memory"]
+        bench.timings = data["timings"]
+        bench.error = data["error"]
+        return bench
 
-def generate_comparison_report(benchmarks: List[VectorStoreBenchmark]):
-    """Genera un reporte comparativo"""
+def result_rows(benchmarks: List[VectorStoreBenchmark], queries: List[str] = TEST_QUERIES) -> List[Dict[str, Any]]:
+    """Filas estructuradas: una por store y query, más un resumen por store (query "*")"""
+    rows = []
+    for bench in benchmarks:
+        all_times = []
+        for query, result in zip(queries, bench.results):
+            times_ms = [t * 1000 for t in result["times"]]
+            all_times += times_ms
+            rows.append({
+                "store": bench.store_type.value,
+                "query": query,
+                "avg_ms": round(result["avg_time"] * 1000, 3),
+                "min_ms": round(result["min_time"] * 1000, 3),
+                "max_ms": round(result["max_time"] * 1000, 3),
+                "std_ms": round(result["std_dev"] * 1000, 3),
+                "p50_ms": round(percentile(times_ms, 50), 3),
+                "p95_ms": round(percentile(times_ms, 95), 3),
+                "results_count": result["results_count"],
+            })
+        if all_times:
+            rows.append({
+                "store": bench.store_type.value,
+                "query": "*",
+                "avg_ms": round(statistics.mean(all_times), 3),
+                "min_ms": round(min(all_times), 3),
+                "max_ms": round(max(all_times), 3),
+                "std_ms": round(statistics.stdev(all_times), 3) if len(all_times) > 1 else 0.0,
+                "p50_ms": round(percentile(all_times, 50), 3),
+                "p95_ms": round(percentile(all_times, 95), 3),
+                "results_count": statistics.mean(r["results_count"] for r in bench.results),
+            })
+    return rows
+
+def generate_comparison_report(benchmarks: List[VectorStoreBenchmark], queries: List[str] = TEST_QUERIES) -> List[Dict[str, Any]]:
+    """Genera un reporte comparativo y retorna sus filas estructuradas (ver result_rows)"""
     print("\n" + "="*80)
     print("REPORTE COMPARATIVO: FAISS vs PINECONE vs WEAVIATE")
     print("="*80)
@@ -139,39 +241,171 @@ def generate_comparison_report(benchmarks: List[VectorStoreBenchmark]):
         
         print(f"{bench.name:<15} {overall_avg:>10.2f}ms      {overall_min:>10.2f}ms   {overall_max:>10.2f}ms   {overall_std:>10.2f}ms")
     
+    # Memoria de cada subproceso
+    print("\n\n💾 MEMORIA (RSS por subproceso)")
+    print("-" * 80)
+    print(f"{'Sistema':<15} {'Base':>10} {'+Modelo':>10} {'+Store':>10} {'Final':>10} {'Pico':>10}")
+    print("-" * 80)
+    for bench in benchmarks:
+        memory = bench.memory
+        if memory.get("baseline_mb") is None:
+            continue
+        model = memory["after_model_mb"] - memory["baseline_mb"]
+        store = memory["after_store_mb"] - memory["after_model_mb"]
+        print(
+            f"{bench.name:<15} {memory['baseline_mb']:>8.1f}MB {model:>+8.1f}MB {store:>+8.1f}MB "
+            f"{memory.get('after_benchmark_mb') or 0:>8.1f}MB {memory.get('peak_mb') or 0:>8.1f}MB"
+        )
+    
     # Comparativa por query
     print("\n\n📝 COMPARATIVA POR QUERY")
     print("-" * 80)
     
-    for i, query in enumerate(TEST_QUERIES):
+    for i, query in enumerate(queries):
         print(f"\nQuery {i+1}: {query}")
         print("-" * 80)
         for bench in benchmarks:
             if bench.results and i < len(bench.results):
                 result = bench.results[i]
                 print(f"  {bench.name:<15} {result['avg_time']*1000:>8.2f}ms (min: {result['min_time']*1000:.2f}ms, max: {result['max_time']*1000:.2f}ms)")
+    
+    return result_rows(benchmarks, queries)
+
+def load_queries(path: Path = None, limit: int = None) -> List[str]:
+    """Queries de un archivo (una por línea, p. ej. de generate_corpus.py) o las de prueba"""
+    if path is None:
+        return TEST_QUERIES
+    queries = [line.strip() for line in path.read_text(encoding="utf-8").splitlines() if line.strip()]
+    return queries[:limit] if limit else queries
+
+def parse_cpus(value: str) -> List[int]:
+    """Lista de núcleos: "0,2,4" o rangos "0-3" """
+    cpus = []
+    for part in value.split(","):
+        if "-" in part:
+            first, last = part.split("-")
+            cpus += range(int(first), int(last) + 1)
+        elif part:
+            cpus.append(int(part))
+    return cpus
+
+def pin_process(cpus: List[int]) -> None:
+    """Fija el proceso actual a los núcleos dados (solo Linux)"""
+    if not hasattr(os, "sched_setaffinity"):
+        print("⚠️  Este sistema no permite fijar núcleos (os.sched_setaffinity); se ignora --cpus")
+        return
+    os.sched_setaffinity(0, cpus)
+    print(f"📌 Proceso fijado a los núcleos {sorted(os.sched_getaffinity(0))}")
+
+def run_worker(store_type: VectorStoreType, name: str, queries: List[str], iterations: int, warmup: int, cpus: List[int] = None) -> Dict[str, Any]:
+    """Benchmark de un store dentro del subproceso; retorna sus resultados serializables"""
+    if cpus:
+        pin_process(cpus)
+    bench = VectorStoreBenchmark(name, store_type)
+    if bench.setup():
+        bench.warmup(queries, warmup)
+        bench.run_benchmark(queries, iterations=iterations)
+    elif bench.error is None:
+        bench.error = "no disponible (datos no ingeridos)"
+    return bench.to_dict()
+
+def run_isolated(store_type: VectorStoreType, name: str, args) -> VectorStoreBenchmark:
+    """Ejecuta el benchmark de un store en un subproceso nuevo y recoge sus resultados"""
+    command = [
+        sys.executable, str(Path(__file__).resolve()),
+        "--worker", store_type.value,
+        "--iterations", str(args.iterations),
+        "--warmup", str(args.warmup),
+        "--max-queries", str(args.max_queries),
+    ]
+    if args.queries_file:
+        command += ["--queries-file", str(args.queries_file.resolve())]
+    if args.cpus:
+        command += ["--cpus", args.cpus]
+    
+    env = dict(os.environ)
+    env["VECTOR_STORE_TYPE"] = store_type.value
+    env["PYTHONUNBUFFERED"] = "1"
+    if args.threads:
+        for var in THREAD_ENV_VARS:
+            env[var] = str(args.threads)
+    
+    result = None
+    process = subprocess.Popen(command, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    output = []
+    for line in process.stdout:
+        if line.startswith(RESULT_PREFIX):
+            result = json.loads(line[len(RESULT_PREFIX):])
+        else:
+            output.append(line.rstrip())
+            print(f"   {line.rstrip()}")
+    process.wait()
+    
+    if result is None:
+        bench = VectorStoreBenchmark(name, store_type)
+        bench.error = output[-1] if output else f"el subproceso terminó con código {process.returncode}"
+        return bench
+    return VectorStoreBenchmark.from_dict(name, result)
 
 def main():
     """Función principal"""
+    parser = argparse.ArgumentParser(description="Comparativa de latencia entre vector stores")
+    parser.add_argument("--queries-file", type=Path, help="Archivo con una query por línea")
+    parser.add_argument("--max-queries", type=int, default=20, help="Máximo de queries tomadas del archivo")
+    parser.add_argument("--iterations", type=int, default=5, help="Repeticiones por query")
+    parser.add_argument("--warmup", type=int, default=1, help="Pasadas de calentamiento sobre las queries (no se miden)")
+    parser.add_argument("--stores", default=",".join(store.value for store, _ in STORES), help="Stores a comparar, separados por coma")
+    parser.add_argument("--cpus", help="Núcleos para cada subproceso (p. ej. 0-3 o 0,2); solo Linux")
+    parser.add_argument("--threads", type=int, help="Hilos de OpenMP/MKL/OpenBLAS en cada subproceso")
+    parser.add_argument("--output", type=Path, help="Guardar los resultados con metadatos del entorno (.json o .csv)")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    queries = load_queries(args.queries_file, args.max_queries)
+    names = {store.value: name for store, name in STORES}
+    
+    if args.worker:
+        store_type = VectorStoreType(args.worker)
+        cpus = parse_cpus(args.cpus) if args.cpus else None
+        result = run_worker(store_type, names[store_type.value], queries, args.iterations, args.warmup, cpus)
+        print(RESULT_PREFIX + json.dumps(result))
+        return
+    
     print("🚀 Iniciando comparativa de Vector Stores")
     print("="*80)
     
     benchmarks = []
     
-    # Setup y benchmark de cada sistema
-    for store_type, name in [
-        (VectorStoreType.FAISS, "FAISS"),
-        (VectorStoreType.PINECONE, "Pinecone"),
-        (VectorStoreType.WEAVIATE, "Weaviate")
-    ]:
-        bench = VectorStoreBenchmark(name, store_type)
-        if bench.setup():
-            bench.run_benchmark(TEST_QUERIES, iterations=5)
+    # Setup y benchmark de cada sistema, cada uno en su propio subproceso
+    for value in [item.strip().lower() for item in args.stores.split(",") if item.strip()]:
+        store_type = VectorStoreType(value)
+        print(f"\n{'='*80}\n📦 {names[value]} (subproceso aislado)")
+        bench = run_isolated(store_type, names[value], args)
+        if bench.results:
             benchmarks.append(bench)
+        else:
+            print(f"⚠️  {names[value]} omitido: {bench.error}")
     
     # Generar reporte comparativo
     if benchmarks:
-        generate_comparison_report(benchmarks)
+        rows = generate_comparison_report(benchmarks, queries)
+        if args.output:
+            environment = collect_environment(
+                vector_store=[bench.store_type.value for bench in benchmarks],
+                index={bench.store_type.value: bench.index_info for bench in benchmarks if bench.index_info},
+                memory={bench.store_type.value: bench.memory for bench in benchmarks},
+                setup={bench.store_type.value: bench.timings for bench in benchmarks}
+            )
+            params = {
+                "queries": len(queries),
+                "iterations": args.iterations,
+                "k": 3,
+                "warmup": args.warmup,
+                "isolated": True,
+                "cpus": args.cpus,
+                "threads": args.threads,
+            }
+            save_results(args.output, "search", rows, params, environment)
+            print(f"\n💾 Resultados guardados en {args.output}")
     else:
         print("\n❌ No se pudo configurar ningún vector store. Verifica las configuraciones.")
 
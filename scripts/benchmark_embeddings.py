@@ -0,0 +1,218 @@
+"""
+Benchmark de backends de embeddings: torch vs ONNX float32 vs ONNX int8
+Para cada backend mide:
+- Carga: tiempo y memoria (RSS) del modelo
+- Throughput de documentos (embed_documents sobre chunks del corpus)
+- Latencia de una query (embed_query: p50, p95, media)
+- Compatibilidad con el backend torch (la referencia con la que se construyen los índices):
+  similitud coseno por chunk (mínima y media), index_recall@k (queries del backend contra
+  un índice de vectores torch) y neighbor_recall@k (queries e índice del backend)
+
+Un backend pasa si su coseno mínimo contra torch es >= su tolerancia (por defecto 0.999
+para onnx y 0.98 para onnx-int8); si alguno no pasa el script termina con código 1.
+
+Uso (desde backend/, con el modelo exportado por export_onnx_embeddings.py):
+    python ../scripts/benchmark_embeddings.py
+    python ../scripts/benchmark_embeddings.py --backends torch,onnx-int8 --threads 4 --texts 2000
+    python ../scripts/benchmark_embeddings.py --output results/embeddings.json
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+# Agregar el backend al path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+import numpy as np
+from langchain_community.document_loaders import TextLoader
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from config import CHUNK_OVERLAP, CHUNK_SIZE, DATA_PATH, EMBEDDING_MODEL, EMBEDDING_THREADS, EmbeddingBackend
+from embeddings import create_embeddings
+from ingest_pipeline import discover_files
+from process_stats import rss_mb
+from benchmark_results import collect_environment, save_results
+from retrieval_metrics import exact_top_k, percentile
+
+# Coseno mínimo contra torch para considerar los vectores compatibles con un índice existente
+TOLERANCES = {
+    EmbeddingBackend.TORCH: 1.0,
+    EmbeddingBackend.ONNX: 0.999,
+    EmbeddingBackend.ONNX_INT8: 0.98,
+}
+
+TEST_QUERIES = [
+    "¿Cuándo inicia el cuarto retiro de AFP?",
+    "¿Cuánto es el monto máximo que puedo retirar?",
+    "¿Cómo sé cuándo me toca retirar según mi DNI?",
+    "¿Qué es una UIT y cuánto vale?",
+    "¿Puedo retirar en cualquier momento?",
+    "¿Qué documentos necesito para solicitar el retiro?",
+    "¿En cuántos días depositan el dinero?",
+    "¿Los jubilados pueden retirar sus fondos?",
+]
+
+def load_texts(data_dir: Path, count: int) -> Tuple[List[str], int]:
+    """
+    Chunks del corpus (mismo split que el ingest), repetidos hasta completar count
+    
+    Returns:
+        (textos, cantidad de chunks distintos al inicio de la lista)
+    """
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    chunks = []
+    for path in discover_files(data_dir):
+        chunks.extend(chunk.page_content for chunk in splitter.split_documents(TextLoader(str(path)).load()))
+        if len(chunks) >= count:
+            break
+    if not chunks:
+        raise ValueError(f"No se encontraron archivos .txt en {data_dir}")
+    return [chunks[i % len(chunks)] for i in range(count)], min(len(chunks), count)
+
+def _normalized(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+def _recall(retrieved: np.ndarray, truth: np.ndarray) -> float:
+    return float(np.mean([len(set(r) & set(t)) / len(t) for r, t in zip(retrieved, truth)]))
+
+def benchmark_backend(
+    backend: EmbeddingBackend,
+    texts: List[str],
+    queries: List[str],
+    threads: int,
+    iterations: int
+) -> Dict[str, Any]:
+    """Carga el backend y mide throughput de documentos y latencia de queries"""
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    embeddings = create_embeddings(EMBEDDING_MODEL, backend=backend, threads=threads)
+    load_seconds = time.perf_counter() - start
+    rss_after = rss_mb()
+    
+    # Calentamiento: primera inferencia (asignación de buffers, optimización del grafo)
+    embeddings.embed_documents(texts[:8])
+    embeddings.embed_query(queries[0])
+    
+    start = time.perf_counter()
+    doc_vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    docs_seconds = time.perf_counter() - start
+    
+    times = []
+    for _ in range(iterations):
+        for query in queries:
+            start = time.perf_counter()
+            embeddings.embed_query(query)
+            times.append((time.perf_counter() - start) * 1000)
+    query_vectors = np.asarray([embeddings.embed_query(query) for query in queries], dtype=np.float32)
+    
+    return {
+        "backend": backend.value,
+        "threads": threads,
+        "load_seconds": round(load_seconds, 3),
+        "rss_delta_mb": round(rss_after - rss_before, 1) if rss_before is not None and rss_after is not None else None,
+        "texts": len(texts),
+        "embed_seconds": round(docs_seconds, 3),
+        "docs_per_second": round(len(texts) / docs_seconds, 2) if docs_seconds > 0 else 0.0,
+        "mean_ms": round(statistics.mean(times), 3),
+        "p50_ms": round(percentile(times, 50), 3),
+        "p95_ms": round(percentile(times, 95), 3),
+        "_doc_vectors": doc_vectors,
+        "_query_vectors": query_vectors,
+    }
+
+def add_accuracy(row: Dict[str, Any], reference: Dict[str, Any], unique: int, k: int, tolerance: float) -> None:
+    """
+    Agrega al resultado la compatibilidad de sus vectores con los de la referencia (torch)
+    
+    Los recall se calculan sobre los primeros unique chunks (sin repeticiones, que
+    empatarían en el top-k).
+    """
+    ref_docs, ref_queries = _normalized(reference["_doc_vectors"]), _normalized(reference["_query_vectors"])
+    docs, queries = _normalized(row["_doc_vectors"]), _normalized(row["_query_vectors"])
+    cosine = np.einsum("ij,ij->i", ref_docs, docs)
+    truth = exact_top_k(ref_docs[:unique], ref_queries, k)
+    row.update({
+        "min_cosine": round(float(cosine.min()), 5),
+        "mean_cosine": round(float(cosine.mean()), 5),
+        "index_recall": round(_recall(exact_top_k(ref_docs[:unique], queries, k), truth), 4),
+        "neighbor_recall": round(_recall(exact_top_k(docs[:unique], queries, k), truth), 4),
+        "tolerance": tolerance,
+        "passed": bool(cosine.min() >= tolerance - 1e-6),
+    })
+
+def print_report(rows: List[Dict[str, Any]], k: int) -> None:
+    print("\n" + "="*110)
+    print("📊 BACKENDS DE EMBEDDINGS")
+    print("="*110)
+    print(f"{'Backend':<11} {'Carga (s)':>9} {'RSS +MB':>8} {'Docs/s':>9} {'Query p50':>10} {'p95':>8} "
+          f"{'Cos mín':>8} {'Cos medio':>10} {f'Idx R@{k}':>9} {f'Vec R@{k}':>9}  Tolerancia")
+    print("-"*110)
+    for row in rows:
+        rss = f"{row['rss_delta_mb']:.0f}" if row["rss_delta_mb"] is not None else "n/d"
+        status = f"{'✅' if row['passed'] else '❌'} >= {row['tolerance']}"
+        print(f"{row['backend']:<11} {row['load_seconds']:>9.2f} {rss:>8} {row['docs_per_second']:>9.1f} "
+              f"{row['p50_ms']:>8.2f}ms {row['p95_ms']:>6.2f}ms {row['min_cosine']:>8.5f} {row['mean_cosine']:>10.5f} "
+              f"{row['index_recall']:>9.3f} {row['neighbor_recall']:>9.3f}  {status}")
+    reference = rows[0]
+    for row in rows[1:]:
+        speedup = row["docs_per_second"] / reference["docs_per_second"] if reference["docs_per_second"] else 0
+        latency = reference["p50_ms"] / row["p50_ms"] if row["p50_ms"] else 0
+        print(f"🚀 {row['backend']}: {speedup:.2f}x throughput de documentos, {latency:.2f}x latencia de query vs torch")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara throughput y exactitud de los backends de embeddings")
+    parser.add_argument("--backends", default="torch,onnx,onnx-int8",
+                        help="Backends separados por coma (torch siempre se incluye como referencia)")
+    parser.add_argument("--threads", type=int, default=EMBEDDING_THREADS,
+                        help="Hilos intra-op (0 = por defecto de cada runtime)")
+    parser.add_argument("--texts", type=int, default=1000, help="Chunks a calcular para el throughput")
+    parser.add_argument("--data-dir", type=Path, default=DATA_PATH, help="Carpeta de documentos .txt")
+    parser.add_argument("--iterations", type=int, default=20, help="Repeticiones de cada query")
+    parser.add_argument("--k", type=int, default=10, help="Vecinos para index_recall y neighbor_recall")
+    parser.add_argument("--min-cosine", type=float, default=None,
+                        help="Tolerancia común (coseno mínimo vs torch) en lugar de la de cada backend")
+    parser.add_argument("--output", type=Path, default=None, help="Guardar resultados (.json o .csv)")
+    args = parser.parse_args()
+    
+    backends = [EmbeddingBackend(name.strip()) for name in args.backends.split(",") if name.strip()]
+    backends = [EmbeddingBackend.TORCH] + [backend for backend in backends if backend != EmbeddingBackend.TORCH]
+    texts, unique = load_texts(args.data_dir, args.texts)
+    print(f"🧪 {len(texts)} chunks ({unique} distintos) de {args.data_dir}, {len(TEST_QUERIES)} queries x {args.iterations}, "
+          f"{args.threads or 'default'} hilos")
+    
+    rows = []
+    for backend in backends:
+        print(f"\n📦 Backend {backend.value}...")
+        try:
+            row = benchmark_backend(backend, texts, TEST_QUERIES, args.threads, args.iterations)
+        except (ImportError, FileNotFoundError) as e:
+            print(f"❌ {backend.value} no disponible: {e}")
+            if backend == EmbeddingBackend.TORCH:
+                return 2
+            continue
+        print(f"✅ {row['docs_per_second']:.1f} docs/s, query p50 {row['p50_ms']:.2f}ms")
+        rows.append(row)
+    
+    for row in rows:
+        tolerance = args.min_cosine if args.min_cosine is not None else TOLERANCES[EmbeddingBackend(row["backend"])]
+        add_accuracy(row, rows[0], unique, args.k, tolerance)
+    results = [{key: value for key, value in row.items() if not key.startswith("_")} for row in rows]
+    print_report(results, args.k)
+    
+    if args.output:
+        params = {"backends": [backend.value for backend in backends], "threads": args.threads, "texts": args.texts,
+                  "iterations": args.iterations, "k": args.k, "min_cosine": args.min_cosine}
+        save_results(args.output, "embeddings", results, params,
+                     collect_environment(data_dir=str(args.data_dir), embedding_backend=params["backends"],
+                                         embedding_threads=args.threads))
+    
+    failed = [row["backend"] for row in results if not row["passed"]]
+    if failed:
+        print(f"\n❌ Fuera de tolerancia: {', '.join(failed)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""
+Benchmark de throughput de ingest por vector store
+Mide por separado cada fase del pipeline de ingest (carga/split, embeddings, subida/inserción
+en el índice y persistencia final) para cada store, tamaño de corpus y tamaño de lote, y
+reporta documentos/s, vectores/s y memoria pico (RSS)
+
+Cada combinación corre en un subproceso propio (memoria pico limpia y config por store),
+con un directorio de trabajo temporal: el índice FAISS de ./vector_stores_data no se toca.
+Pinecone y Weaviate escriben en un índice aparte (<nombre>-bench / <nombre>_Bench).
+Los corpus se generan con generate_corpus.py (misma semilla → mismo corpus).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+SCRIPTS_DIR = Path(__file__).parent
+BACKEND_DIR = SCRIPTS_DIR.parent / "backend"
+
+# Agregar el backend al path
+sys.path.insert(0, str(BACKEND_DIR))
+
+from benchmark_results import collect_environment, save_results
+
+RESULT_PREFIX = "INGEST_RESULT "
+
+def run_worker(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Ejecuta un ingest completo en este proceso y retorna sus métricas"""
+    from process_stats import rss_mb, peak_rss_mb
+    setup_start = time.perf_counter()
+    from embeddings import get_document_embeddings
+    from ingest_pipeline import IngestPipeline, discover_files
+    from vector_stores import get_vector_store
+    embeddings = get_document_embeddings()
+    vectordb = get_vector_store()
+    setup_seconds = time.perf_counter() - setup_start
+    # Memoria con el modelo y el store cargados: el pico por encima de esto es del ingest
+    baseline_rss = rss_mb()
+    
+    pipeline = IngestPipeline(vectordb, embeddings, batch_size=config["batch_size"])
+    report = pipeline.run(discover_files(Path(config["data_dir"])))
+    stages = {stage["stage"]: stage for stage in report["stages"]}
+    wall = report["wall_seconds"]
+    files = stages["discover"]["items"]
+    vectors = stages["upsert"]["items"]
+    peak_rss = peak_rss_mb()
+    # Stores remotos: la subida corre en paralelo al pipeline (ver vector_stores/bulk_upload.py)
+    upload = vectordb.upload_stats() or {}
+    
+    def rate(items: int, seconds: float) -> float:
+        return round(items / seconds, 2) if seconds > 0 else 0.0
+    
+    return {
+        "files": files,
+        "vectors": vectors,
+        "wall_seconds": wall,
+        "load_split_seconds": stages["load_split"]["busy_seconds"],
+        "embed_seconds": stages["embed"]["busy_seconds"],
+        "upsert_seconds": stages["upsert"]["busy_seconds"],
+        "finish_seconds": report["finish_seconds"],
+        "docs_per_second": rate(files, wall),
+        "vectors_per_second": rate(vectors, wall),
+        "embed_vectors_per_second": rate(stages["embed"]["items"], stages["embed"]["busy_seconds"]),
+        "upsert_vectors_per_second": rate(vectors, stages["upsert"]["busy_seconds"]),
+        "upload_vectors_per_second": upload.get("vectors_per_second"),
+        "upload_retries": upload.get("retries"),
+        "setup_seconds": round(setup_seconds, 3),
+        "baseline_rss_mb": round(baseline_rss, 1) if baseline_rss is not None else None,
+        "peak_rss_mb": round(peak_rss, 1) if peak_rss is not None else None,
+    }
+
+def ensure_corpus(chunks: int, corpus_dir: Path, seed: int) -> Path:
+    """Genera (una vez) el corpus sintético de chunks elementos y retorna su carpeta de documentos"""
+    target = corpus_dir / f"chunks_{chunks}_seed_{seed}"
+    if not (target / "corpus.json").exists():
+        print(f"🧪 Generando corpus de {chunks} chunks en {target}...")
+        subprocess.run(
+            [sys.executable, str(SCRIPTS_DIR / "generate_corpus.py"), "--chunks", str(chunks), "--seed", str(seed), "--output-dir", str(target), "--force"],
+            check=True,
+            stdout=subprocess.DEVNULL
+        )
+    return target / "docs"
+
+def bench_env(store: str, use_embedding_cache: bool) -> Dict[str, str]:
+    """Variables de entorno del subproceso: store elegido e índices remotos separados"""
+    import config  # carga el .env en os.environ
+    env = dict(os.environ)
+    env["VECTOR_STORE_TYPE"] = store
+    env["PYTHONPATH"] = os.pathsep.join([str(BACKEND_DIR), env.get("PYTHONPATH", "")])
+    if not use_embedding_cache:
+        # Sin caché en disco la fase de embeddings mide el modelo, no la lectura de la caché
+        env["EMBEDDING_CACHE_ENABLED"] = "false"
+    env["PINECONE_INDEX_NAME"] = f"{os.getenv('PINECONE_INDEX_NAME', 'afp-chatbot')}-bench"
+    env["WEAVIATE_INDEX_NAME"] = f"{os.getenv('WEAVIATE_INDEX_NAME', 'AFP_Chatbot')}_Bench"
+    return env
+
+def run_case(store: str, data_dir: Path, batch_size: int, env: Dict[str, str]) -> Dict[str, Any]:
+    """Ejecuta una combinación en un subproceso con directorio de trabajo temporal"""
+    config = {"data_dir": str(data_dir.resolve()), "batch_size": batch_size}
+    with tempfile.TemporaryDirectory(prefix="ingest-bench-") as workdir:
+        completed = subprocess.run(
+            [sys.executable, str(Path(__file__).resolve()), "--worker", json.dumps(config)],
+            cwd=workdir,
+            env=env,
+            capture_output=True,
+            text=True
+        )
+    for line in reversed(completed.stdout.splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    error = (completed.stderr.strip().splitlines() or ["sin salida"])[-1]
+    return {"error": error}
+
+def print_row(row: Dict[str, Any]) -> None:
+    if row.get("error"):
+        print(f"   ❌ {row['store']:<9} N={row['corpus_chunks']:<9} lote={row['batch_size']:<5} {row['error']}")
+        return
+    print(
+        f"   {row['store']:<9} N={row['corpus_chunks']:<9} lote={row['batch_size']:<5} "
+        f"{row['vectors_per_second']:>9.1f} vec/s  split={row['load_split_seconds']:.2f}s "
+        f"embed={row['embed_seconds']:.2f}s upsert={row['upsert_seconds']:.2f}s "
+        f"persist={row['finish_seconds']:.2f}s  pico={row['peak_rss_mb']}MB"
+    )
+
+def parse_int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Benchmark de throughput de ingest por vector store")
+    parser.add_argument("--stores", default="faiss", help="Stores separados por coma (faiss,pinecone,weaviate)")
+    parser.add_argument("--sizes", type=parse_int_list, default=[1000, 10000], help="Tamaños de corpus en chunks")
+    parser.add_argument("--batch-sizes", type=parse_int_list, default=[32, 64, 256], help="Tamaños de lote de embeddings/upsert")
+    parser.add_argument("--data-dir", type=Path, help="Usar esta carpeta de documentos en lugar de corpus sintéticos")
+    parser.add_argument("--corpus-dir", type=Path, default=Path("benchmark_data"), help="Carpeta donde se generan los corpus")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--use-embedding-cache", action="store_true", help="Permitir la caché en disco de embeddings")
+    parser.add_argument("--output", type=Path, default=Path("ingest_benchmark.json"), help="Resultados en JSON")
+    parser.add_argument("--csv", type=Path, help="Resultados también en CSV")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.worker:
+        print(RESULT_PREFIX + json.dumps(run_worker(json.loads(args.worker))))
+        return
+    
+    print("🚀 Benchmark de ingest")
+    print("="*80)
+    if args.data_dir:
+        corpora = [(None, args.data_dir)]
+    else:
+        corpora = [(size, ensure_corpus(size, args.corpus_dir, args.seed)) for size in args.sizes]
+    
+    rows = []
+    for store in [item.strip() for item in args.stores.split(",") if item.strip()]:
+        env = bench_env(store, args.use_embedding_cache)
+        for size, data_dir in corpora:
+            for batch_size in args.batch_sizes:
+                row = {"store": store, "corpus_chunks": size, "batch_size": batch_size}
+                row.update(run_case(store, data_dir, batch_size, env))
+                if size is None and "vectors" in row:
+                    row["corpus_chunks"] = row["vectors"]
+                rows.append(row)
+                print_row(row)
+    
+    params = {"batch_sizes": args.batch_sizes, "seed": args.seed, "embedding_cache": args.use_embedding_cache}
+    environment = collect_environment(
+        vector_store=sorted({row["store"] for row in rows}),
+        corpus_sizes=sorted({row["corpus_chunks"] for row in rows if row["corpus_chunks"] is not None})
+    )
+    save_results(args.output, "ingest", rows, params, environment)
+    print(f"\n💾 Resultados guardados en {args.output}")
+    if args.csv:
+        save_results(args.csv, "ingest", rows, params, environment)
+        print(f"💾 CSV guardado en {args.csv}")
+
+if __name__ == "__main__":
+    main()
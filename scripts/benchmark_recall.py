@@ -0,0 +1,285 @@
+"""
+Benchmark de recall vs latencia con ground truth exacto
+Calcula el top-k exacto por fuerza bruta (NumPy) sobre los mismos embeddings del corpus y
+reporta recall@k, MRR y nDCG@k junto a la latencia de:
+- distintos tipos de índice FAISS construidos en memoria (--factory), barriendo nprobe/efSearch
+- el vector store configurado (VECTOR_STORE_TYPE), tal como está ingerido
+Al final imprime la frontera de Pareto (recall vs latencia p50)
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+# Agregar el backend al path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from benchmark_results import collect_environment, disable_caches, save_results
+disable_caches()
+
+import numpy as np
+import faiss
+from langchain_community.document_loaders import TextLoader
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from config import VECTOR_STORE_TYPE, DATA_PATH, CHUNK_SIZE, CHUNK_OVERLAP, INGEST_BATCH_SIZE, FAISS_TRAIN_SIZE
+from embeddings import get_embeddings, get_document_embeddings, embed_queries
+from ingest_manifest import content_hash
+from ingest_pipeline import discover_files
+from vector_stores import get_vector_store
+from vector_stores.faiss_index import apply_search_params, build_index, describe_index
+from retrieval_metrics import exact_top_k, recall_at_k, reciprocal_rank, ndcg_at_k, percentile, pareto_frontier
+
+# Queries de prueba
+TEST_QUERIES = [
+    "¿Cuándo inicia el cuarto retiro de AFP?",
+    "¿Cuánto es el monto máximo que puedo retirar?",
+    "¿Cómo sé cuándo me toca retirar según mi DNI?",
+    "¿Qué es una UIT y cuánto vale?",
+    "¿Puedo retirar en cualquier momento?",
+]
+
+DEFAULT_FACTORIES = ["Flat", "IVF{nlist},Flat", "HNSW32", "IVF{nlist},PQ{m}", "SQ8"]
+DEFAULT_NPROBE = [1, 2, 4, 8, 16, 32, 64, 128]
+DEFAULT_EF_SEARCH = [16, 32, 64, 128, 256]
+
+def load_chunks(data_path: Path) -> List[str]:
+    """Chunks del corpus, divididos igual que en el ingest"""
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    chunks = []
+    for path in discover_files(data_path):
+        chunks.extend(chunk.page_content for chunk in splitter.split_documents(TextLoader(str(path)).load()))
+    return chunks
+
+def sample_queries(chunks: List[str], count: int, seed: int) -> List[str]:
+    """Queries tomadas del inicio de chunks aleatorios (reproducibles con la semilla)"""
+    rng = random.Random(seed)
+    picked = rng.sample(chunks, min(count, len(chunks)))
+    return [" ".join(chunk.split()[:12]) for chunk in picked]
+
+def embed_corpus(chunks: List[str]) -> np.ndarray:
+    """Embeddings del corpus (desde la caché en disco si ya se ingirió)"""
+    embeddings = get_document_embeddings()
+    vectors = []
+    for i in range(0, len(chunks), INGEST_BATCH_SIZE):
+        vectors.extend(embeddings.embed_documents(chunks[i:i + INGEST_BATCH_SIZE]))
+    return np.asarray(vectors, dtype=np.float32)
+
+def resolve_factory(factory: str, n: int, dim: int) -> str:
+    """Completa {nlist} (≈ 4·√n) y {m} (subcuantizadores de PQ que dividen a dim)"""
+    nlist = max(1, int(4 * n ** 0.5))
+    m = next(m for m in (dim // 8, dim // 4, dim // 2, dim) if m and dim % m == 0)
+    return factory.format(nlist=nlist, m=m)
+
+def evaluate(
+    name: str,
+    search: Callable[[np.ndarray, int], List[str]],
+    query_vectors: np.ndarray,
+    truth: List[List[str]],
+    k: int,
+    repeats: int
+) -> Dict[str, Any]:
+    """
+    Ejecuta las queries una por una (como en producción) y calcula calidad y latencia
+    
+    Args:
+        name: Etiqueta de la configuración
+        search: Función (vector, k) → claves de los documentos retornados, en orden
+        query_vectors: Embeddings de las queries
+        truth: Claves del top-k exacto de cada query
+        k: Resultados por query
+        repeats: Repeticiones de cada query para medir la latencia
+    """
+    latencies = []
+    recalls, rrs, ndcgs = [], [], []
+    for vector, expected in zip(query_vectors, truth):
+        retrieved = search(vector, k)
+        for _ in range(repeats):
+            start = time.perf_counter()
+            search(vector, k)
+            latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(recall_at_k(retrieved, expected))
+        rrs.append(reciprocal_rank(retrieved, expected))
+        ndcgs.append(ndcg_at_k(retrieved, expected))
+    return {
+        "config": name,
+        "recall": round(float(np.mean(recalls)), 4),
+        "mrr": round(float(np.mean(rrs)), 4),
+        "ndcg": round(float(np.mean(ndcgs)), 4),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "mean_ms": round(float(np.mean(latencies)), 3),
+    }
+
+def sweep_faiss_index(index, label: str, search, query_vectors, truth, args) -> List[Dict[str, Any]]:
+    """Evalúa un índice FAISS (mediante search) para cada valor de nprobe/efSearch que le aplique"""
+    info = describe_index(index)
+    if "nlist" in info:
+        settings = [("nprobe", value) for value in args.nprobe if value <= info["nlist"]]
+    elif "efSearch" in info:
+        settings = [("efSearch", value) for value in args.ef_search]
+    else:
+        settings = [(None, None)]
+    
+    points = []
+    for param, value in settings:
+        if param == "nprobe":
+            apply_search_params(index, nprobe=value)
+        elif param == "efSearch":
+            apply_search_params(index, ef_search=value)
+        name = f"{label} {param}={value}" if param else label
+        point = evaluate(name, search, query_vectors, truth, args.k, args.repeats)
+        point.update({"factory": label, "param": param, "value": value})
+        points.append(point)
+        print_point(point)
+    return points
+
+def benchmark_factories(corpus: np.ndarray, keys: List[str], query_vectors, truth, args) -> List[Dict[str, Any]]:
+    """Construye en memoria cada tipo de índice y lo evalúa"""
+    points = []
+    for pattern in args.factory:
+        factory = resolve_factory(pattern, len(corpus), corpus.shape[1])
+        print(f"\n🔧 Construyendo índice FAISS '{factory}' con {len(corpus)} vectores...")
+        start = time.perf_counter()
+        sample = corpus[np.random.default_rng(args.seed).permutation(len(corpus))[:FAISS_TRAIN_SIZE]]
+        index = build_index(factory, sample)
+        index.add(corpus)
+        build_seconds = time.perf_counter() - start
+        size_bytes = len(faiss.serialize_index(index))
+        print(f"   Construido en {build_seconds:.2f}s, {size_bytes / len(corpus):.0f} bytes/vector")
+        
+        def search(vector: np.ndarray, k: int) -> List[str]:
+            _, rows = index.search(vector[None, :], k)
+            return [keys[row] for row in rows[0] if row != -1]
+        
+        for point in sweep_faiss_index(index, factory, search, query_vectors, truth, args):
+            point.update({"build_seconds": round(build_seconds, 3), "bytes_per_vector": round(size_bytes / len(corpus), 1)})
+            points.append(point)
+    return points
+
+def benchmark_store(query_vectors, truth, args) -> List[Dict[str, Any]]:
+    """Evalúa el vector store configurado con sus parámetros actuales (y el barrido, si es FAISS)"""
+    print(f"\n📦 Cargando vector store {VECTOR_STORE_TYPE.value}...")
+    vectordb = get_vector_store()
+    if not vectordb.is_available():
+        print(f"⚠️  {VECTOR_STORE_TYPE.value} no está disponible (datos no ingeridos)")
+        return []
+    
+    def search(vector: np.ndarray, k: int) -> List[str]:
+        docs = vectordb.similarity_search_by_vector(vector.tolist(), k=k)
+        return [content_hash(doc.page_content) for doc in docs]
+    
+    label = f"{VECTOR_STORE_TYPE.value} (store)"
+    if hasattr(vectordb, "set_search_params"):
+        # El índice FAISS ingerido se barre igual que los construidos en memoria
+        return sweep_faiss_index(vectordb.vectordb.index, label, search, query_vectors, truth, args)
+    point = evaluate(label, search, query_vectors, truth, args.k, args.repeats)
+    point.update({"factory": label, "param": None, "value": None})
+    print_point(point)
+    return [point]
+
+def print_point(point: Dict[str, Any]) -> None:
+    print(
+        f"   {point['config']:<36} recall={point['recall']:.3f} mrr={point['mrr']:.3f} "
+        f"ndcg={point['ndcg']:.3f} p50={point['p50_ms']:.3f}ms p95={point['p95_ms']:.3f}ms"
+    )
+
+def print_pareto(points: List[Dict[str, Any]]) -> None:
+    """Imprime la frontera de Pareto recall vs latencia p50"""
+    print("\n" + "="*80)
+    print("📈 FRONTERA DE PARETO (recall@k vs latencia p50)")
+    print("="*80)
+    print(f"{'Configuración':<40} {'Recall':>8} {'nDCG':>8} {'p50 (ms)':>10} {'p95 (ms)':>10}")
+    print("-" * 80)
+    for point in pareto_frontier(points):
+        print(f"{point['config']:<40} {point['recall']:>8.3f} {point['ndcg']:>8.3f} {point['p50_ms']:>10.3f} {point['p95_ms']:>10.3f}")
+
+def plot_pareto(points: List[Dict[str, Any]], path: str) -> None:
+    """Gráfico recall vs latencia por configuración (requiere matplotlib)"""
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("⚠️  matplotlib no está instalado; no se genera el gráfico")
+        return
+    fig, ax = plt.subplots(figsize=(8, 5))
+    for factory in dict.fromkeys(point["factory"] for point in points):
+        series = sorted((p for p in points if p["factory"] == factory), key=lambda p: p["p50_ms"])
+        ax.plot([p["p50_ms"] for p in series], [p["recall"] for p in series], marker="o", label=factory)
+    frontier = pareto_frontier(points)
+    ax.plot([p["p50_ms"] for p in frontier], [p["recall"] for p in frontier], "k--", linewidth=1, label="Pareto")
+    ax.set_xscale("log")
+    ax.set_xlabel("Latencia p50 (ms)")
+    ax.set_ylabel("Recall@k")
+    ax.legend(fontsize=8)
+    fig.tight_layout()
+    fig.savefig(path)
+    print(f"🖼️  Gráfico guardado en {path}")
+
+def parse_int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Benchmark de recall vs latencia con ground truth exacto")
+    parser.add_argument("-k", type=int, default=10, help="Resultados por query (recall@k)")
+    parser.add_argument(
+        "--factory",
+        action="append",
+        help="Factory string de FAISS a evaluar (repetible; admite {nlist} y {m}). Por defecto: " + " | ".join(DEFAULT_FACTORIES)
+    )
+    parser.add_argument("--nprobe", type=parse_int_list, default=DEFAULT_NPROBE, help="Valores de nprobe a barrer (IVF)")
+    parser.add_argument("--ef-search", type=parse_int_list, default=DEFAULT_EF_SEARCH, help="Valores de efSearch a barrer (HNSW)")
+    parser.add_argument("--sample-queries", type=int, default=100, help="Queries extra tomadas de chunks del corpus")
+    parser.add_argument("--queries-file", type=Path, help="Archivo con una query por línea (reemplaza a las queries de prueba)")
+    parser.add_argument("--data-dir", type=Path, default=DATA_PATH, help="Carpeta de documentos (la misma usada en el ingest)")
+    parser.add_argument("--repeats", type=int, default=3, help="Repeticiones por query para medir latencia")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-store", action="store_true", help="No evaluar el vector store configurado")
+    parser.add_argument("--output", type=Path, help="Guardar todos los puntos con metadatos del entorno (.json o .csv)")
+    parser.add_argument("--plot", help="Guardar el gráfico recall vs latencia (PNG)")
+    args = parser.parse_args()
+    args.factory = args.factory or DEFAULT_FACTORIES
+    
+    print("🚀 Benchmark de recall vs latencia")
+    print("="*80)
+    
+    chunks = load_chunks(args.data_dir)
+    if not chunks:
+        print(f"❌ No se encontraron documentos en {args.data_dir}")
+        return
+    if args.queries_file:
+        queries = [line.strip() for line in args.queries_file.read_text().splitlines() if line.strip()]
+    else:
+        queries = list(TEST_QUERIES)
+    queries += sample_queries(chunks, args.sample_queries, args.seed)
+    
+    print(f"\n🔢 Calculando embeddings de {len(chunks)} chunks y {len(queries)} queries...")
+    corpus = embed_corpus(chunks)
+    query_vectors = np.asarray(embed_queries(get_embeddings(), queries), dtype=np.float32)
+    keys = [content_hash(chunk) for chunk in chunks]
+    
+    start = time.perf_counter()
+    truth_rows = exact_top_k(corpus, query_vectors, args.k)
+    truth = [[keys[row] for row in rows] for rows in truth_rows]
+    print(f"✅ Ground truth exacto (k={args.k}) calculado en {time.perf_counter() - start:.2f}s")
+    
+    points = benchmark_factories(corpus, keys, query_vectors, truth, args)
+    if not args.no_store:
+        points += benchmark_store(query_vectors, truth, args)
+    if not points:
+        return
+    
+    print_pareto(points)
+    if args.output:
+        params = {"k": args.k, "queries": len(queries), "repeats": args.repeats, "factories": args.factory, "seed": args.seed}
+        environment = collect_environment(corpus_size=len(chunks), data_dir=str(args.data_dir))
+        save_results(args.output, "recall", points, params, environment)
+        print(f"\n💾 Resultados guardados en {args.output}")
+    if args.plot:
+        plot_pareto(points, args.plot)
+
+if __name__ == "__main__":
+    main()
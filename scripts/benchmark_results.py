@@ -0,0 +1,304 @@
+"""
+Resultados de benchmark en formato estructurado y comparación entre ejecuciones
+- save_results: guarda las filas de un benchmark en JSON (o CSV) junto con el entorno:
+  modelo de embeddings, store e índice, tamaño del corpus, CPU, versiones de librerías y commit
+- compare: compara dos ejecuciones JSON del mismo benchmark y marca las regresiones de latencia,
+  throughput o calidad (recall/MRR/nDCG) que superan el umbral; retorna código 1 si hay alguna,
+  así que sirve para validar una actualización de FAISS, langchain o del modelo:
+    python ../scripts/benchmark_results.py compare base.json nuevo.json --threshold 0.1
+"""
+import argparse
+import csv
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from importlib import metadata
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Agregar el backend al path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+SCHEMA_VERSION = 1
+
+# Cachés desactivadas en los benchmarks: las queries repetidas medirían la caché, no el store
+BENCHMARK_ENV = {
+    "QUERY_CACHE_SIZE": "0",
+    "SEMANTIC_CACHE_ENABLED": "false",
+}
+
+# Librerías cuyo cambio de versión puede mover los resultados
+PACKAGES = [
+    "faiss-cpu", "faiss-gpu", "numpy", "torch", "sentence-transformers", "transformers",
+    "langchain", "langchain-core", "langchain-community", "langchain-huggingface",
+    "langchain-pinecone", "pinecone", "pinecone-client", "langchain-weaviate", "weaviate-client",
+    "onnxruntime", "fastapi", "uvicorn",
+]
+
+# Campos que identifican una fila de cada benchmark (las filas con la misma clave se comparan)
+KEY_FIELDS = {
+    "search": ["store", "query"],
+    "recall": ["config"],
+    "load": ["step"],
+    "ingest": ["store", "corpus_chunks", "batch_size"],
+    "embeddings": ["backend", "threads"],
+}
+
+# Métricas comparables: "lower" si menos es mejor, "higher" si más es mejor
+LATENCY_METRICS = {
+    "avg_ms": "lower", "mean_ms": "lower", "min_ms": "lower", "max_ms": "lower",
+    "p50_ms": "lower", "p95_ms": "lower", "p99_ms": "lower", "p999_ms": "lower",
+    "throughput_qps": "higher", "error_rate": "lower",
+    "wall_seconds": "lower", "load_split_seconds": "lower", "embed_seconds": "lower",
+    "upsert_seconds": "lower", "finish_seconds": "lower",
+    "docs_per_second": "higher", "vectors_per_second": "higher", "peak_rss_mb": "lower",
+    "load_seconds": "lower", "upload_vectors_per_second": "higher",
+}
+# Métricas de calidad en [0, 1]: el umbral es absoluto (caída en puntos), no relativo
+QUALITY_METRICS = {
+    "recall": "higher", "mrr": "higher", "ndcg": "higher",
+    "min_cosine": "higher", "index_recall": "higher", "neighbor_recall": "higher",
+}
+
+def _cpu_model() -> str:
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+def _git_commit() -> Optional[str]:
+    try:
+        completed = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).parent,
+            capture_output=True,
+            text=True,
+            timeout=5
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return completed.stdout.strip() or None
+
+def disable_caches() -> None:
+    """
+    Aplica BENCHMARK_ENV salvo lo que ya venga en el entorno; llamar antes de importar config
+    """
+    for key, value in BENCHMARK_ENV.items():
+        os.environ.setdefault(key, value)
+
+def library_versions() -> Dict[str, str]:
+    """Versiones instaladas de PACKAGES (se omiten las que no están)"""
+    versions = {}
+    for package in PACKAGES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            continue
+    return versions
+
+def collect_environment(**extra) -> Dict[str, Any]:
+    """
+    Metadatos del entorno de la ejecución
+    
+    Args:
+        **extra: Datos propios del benchmark (tamaño del corpus, stores, índice...)
+    """
+    from config import (
+        EMBEDDING_MODEL, EMBEDDING_DEVICE, EMBEDDING_BACKEND, EMBEDDING_THREADS, VECTOR_STORE_TYPE,
+        FAISS_INDEX_FACTORY, FAISS_NPROBE, FAISS_EF_SEARCH, CHUNK_SIZE, CHUNK_OVERLAP
+    )
+    environment = {
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu": _cpu_model(),
+        "cpu_count": os.cpu_count(),
+        "embedding_model": EMBEDDING_MODEL,
+        "embedding_device": EMBEDDING_DEVICE,
+        "embedding_backend": EMBEDDING_BACKEND.value,
+        "embedding_threads": EMBEDDING_THREADS,
+        "vector_store": VECTOR_STORE_TYPE.value,
+        "faiss_index_factory": FAISS_INDEX_FACTORY,
+        "faiss_nprobe": FAISS_NPROBE,
+        "faiss_ef_search": FAISS_EF_SEARCH,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "libraries": library_versions(),
+    }
+    environment.update(extra)
+    return environment
+
+def save_results(
+    path: Path,
+    benchmark: str,
+    results: List[Dict[str, Any]],
+    params: Optional[Dict[str, Any]] = None,
+    environment: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Guarda una ejecución: JSON con entorno, parámetros y filas, o CSV (una fila por resultado
+    con los metadatos del entorno en columnas env_*) si la ruta termina en .csv
+    
+    Returns:
+        El documento guardado
+    """
+    document = {
+        "schema_version": SCHEMA_VERSION,
+        "benchmark": benchmark,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment if environment is not None else collect_environment(),
+        "params": params or {},
+        "results": results,
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix.lower() == ".csv":
+        env_columns = {
+            f"env_{key}": value for key, value in document["environment"].items()
+            if not isinstance(value, (dict, list))
+        }
+        fields = list(dict.fromkeys(field for row in results for field in row))
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=["benchmark", "created_at"] + fields + list(env_columns))
+            writer.writeheader()
+            for row in results:
+                writer.writerow({"benchmark": benchmark, "created_at": document["created_at"], **row, **env_columns})
+    else:
+        path.write_text(json.dumps(document, indent=2, ensure_ascii=False), encoding="utf-8")
+    return document
+
+def load_results(path: Path) -> Dict[str, Any]:
+    """Carga una ejecución guardada en JSON"""
+    try:
+        document = json.loads(path.read_text(encoding="utf-8"))
+    except json.JSONDecodeError:
+        raise ValueError(f"{path} no es JSON (compare solo acepta resultados guardados en .json)")
+    if "benchmark" not in document or "results" not in document:
+        raise ValueError(f"{path} no es un archivo de resultados de benchmark")
+    return document
+
+def _row_key(row: Dict[str, Any], fields: List[str]) -> Tuple:
+    return tuple(row.get(field) for field in fields)
+
+def compare_results(
+    baseline: Dict[str, Any],
+    candidate: Dict[str, Any],
+    threshold: float = 0.10,
+    quality_threshold: float = 0.01
+) -> List[Dict[str, Any]]:
+    """
+    Compara las filas con la misma clave de dos ejecuciones del mismo benchmark
+    
+    Args:
+        baseline: Ejecución de referencia
+        candidate: Ejecución a validar
+        threshold: Empeoramiento relativo tolerado en latencia/throughput/tiempos (0.10 = 10%)
+        quality_threshold: Caída absoluta tolerada en recall/MRR/nDCG
+    
+    Returns:
+        Una entrada por métrica comparada, con el cambio y si es regresión
+    """
+    if baseline["benchmark"] != candidate["benchmark"]:
+        raise ValueError(f"Benchmarks distintos: {baseline['benchmark']} vs {candidate['benchmark']}")
+    fields = KEY_FIELDS.get(baseline["benchmark"], [])
+    candidate_rows = {_row_key(row, fields): row for row in candidate["results"]}
+    comparisons = []
+    for row in baseline["results"]:
+        key = _row_key(row, fields)
+        other = candidate_rows.get(key)
+        if other is None:
+            continue
+        for metric, better in {**LATENCY_METRICS, **QUALITY_METRICS}.items():
+            old, new = row.get(metric), other.get(metric)
+            if not isinstance(old, (int, float)) or not isinstance(new, (int, float)):
+                continue
+            delta = new - old
+            worse = -delta if better == "higher" else delta
+            if metric in QUALITY_METRICS:
+                regression = worse > quality_threshold
+                change = delta
+            else:
+                change = delta / old if old else 0.0
+                regression = old > 0 and worse / old > threshold
+            comparisons.append({
+                "key": dict(zip(fields, key)),
+                "metric": metric,
+                "baseline": old,
+                "candidate": new,
+                "change": round(change, 4),
+                "regression": regression,
+            })
+    return comparisons
+
+def environment_diff(baseline: Dict[str, Any], candidate: Dict[str, Any]) -> List[Tuple[str, Any, Any]]:
+    """Diferencias de entorno (incluidas versiones de librerías) entre dos ejecuciones"""
+    old_env, new_env = baseline.get("environment", {}), candidate.get("environment", {})
+    old_flat = {**{k: v for k, v in old_env.items() if k != "libraries"}, **{f"libraries.{k}": v for k, v in old_env.get("libraries", {}).items()}}
+    new_flat = {**{k: v for k, v in new_env.items() if k != "libraries"}, **{f"libraries.{k}": v for k, v in new_env.get("libraries", {}).items()}}
+    return [
+        (key, old_flat.get(key), new_flat.get(key))
+        for key in sorted(set(old_flat) | set(new_flat))
+        if old_flat.get(key) != new_flat.get(key)
+    ]
+
+def print_comparison(baseline: Dict[str, Any], candidate: Dict[str, Any], comparisons: List[Dict[str, Any]], verbose: bool) -> None:
+    changes = environment_diff(baseline, candidate)
+    if changes:
+        print("\n🔧 Cambios de entorno")
+        print("-" * 80)
+        for key, old, new in changes:
+            print(f"   {key:<36} {str(old):<20} → {new}")
+    
+    print(f"\n📊 Métricas comparadas: {len(comparisons)}")
+    print("-" * 80)
+    for item in comparisons:
+        if not (item["regression"] or verbose):
+            continue
+        key = " ".join(f"{name}={value}" for name, value in item["key"].items())
+        if item["metric"] in QUALITY_METRICS:
+            change = f"{item['change']:+.4f}"
+        else:
+            change = f"{item['change'] * 100:+.1f}%"
+        mark = "❌" if item["regression"] else "  "
+        print(f"{mark} {key:<44} {item['metric']:<18} {item['baseline']:>10} → {item['candidate']:<10} ({change})")
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Utilidades de resultados de benchmark")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    compare = subparsers.add_parser("compare", help="Compara dos ejecuciones y marca regresiones")
+    compare.add_argument("baseline", type=Path, help="Resultados de referencia (JSON)")
+    compare.add_argument("candidate", type=Path, help="Resultados a validar (JSON)")
+    compare.add_argument("--threshold", type=float, default=0.10, help="Empeoramiento relativo tolerado en latencia y throughput")
+    compare.add_argument("--quality-threshold", type=float, default=0.01, help="Caída absoluta tolerada en recall/MRR/nDCG")
+    compare.add_argument("--verbose", action="store_true", help="Mostrar también las métricas sin regresión")
+    args = parser.parse_args()
+    
+    try:
+        baseline = load_results(args.baseline)
+        candidate = load_results(args.candidate)
+        comparisons = compare_results(baseline, candidate, args.threshold, args.quality_threshold)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        sys.exit(2)
+    
+    print(f"🔍 Comparando {baseline['benchmark']}: {args.baseline} → {args.candidate}")
+    print("="*80)
+    print_comparison(baseline, candidate, comparisons, args.verbose)
+    regressions = [item for item in comparisons if item["regression"]]
+    if not comparisons:
+        print("\n⚠️  No hay filas comunes entre las dos ejecuciones")
+    elif regressions:
+        print(f"\n❌ {len(regressions)} regresiones por encima del umbral")
+        sys.exit(1)
+    else:
+        print("\n✅ Sin regresiones por encima del umbral")
+
+if __name__ == "__main__":
+    main()
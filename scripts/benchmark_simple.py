@@ -2,6 +2,7 @@
 Script simplificado de benchmarking que prueba cada vector store
 Requiere cambiar VECTOR_STORE_TYPE en .env manualmente
 """
+import argparse
 import time
 import sys
 from pathlib import Path
@@ -11,8 +12,12 @@ import statistics
 # Agregar el backend al path
 sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
 
+from benchmark_results import collect_environment, disable_caches, save_results
+disable_caches()
+
 from vector_stores import get_vector_store
 from config import VECTOR_STORE_TYPE
+from retrieval_metrics import percentile
 
 # Queries de prueba
 TEST_QUERIES = [
@@ -23,7 +28,7 @@ TEST_QUERIES = [
     "¿Puedo retirar en cualquier momento?",
 ]
 
-def benchmark_current_store(iterations: int = 5):
+def benchmark_current_store(iterations: int = 5, queries: List[str] = TEST_QUERIES, output: Path = None):
     """Ejecuta benchmark del vector store actualmente configurado"""
     print("="*80)
     print(f"🚀 Benchmarking: {VECTOR_STORE_TYPE.value.upper()}")
@@ -42,23 +47,24 @@ def benchmark_current_store(iterations: int = 5):
         print("✅ Vectorstore cargado correctamente")
         
         # Ejecutar benchmarks
-        print(f"\n🔍 Ejecutando {len(TEST_QUERIES)} queries con {iterations} iteraciones cada una...")
+        print(f"\n🔍 Ejecutando {len(queries)} queries con {iterations} iteraciones cada una...")
         results = []
         
-        for i, query in enumerate(TEST_QUERIES, 1):
-            print(f"\n[{i}/{len(TEST_QUERIES)}] Query: '{query}'")
+        for i, query in enumerate(queries, 1):
+            print(f"\n[{i}/{len(queries)}] Query: '{query}'")
             times = []
             
             for j in range(iterations):
-                start = time.time()
+                start = time.perf_counter_ns()
                 docs = vectordb.similarity_search(query, k=3)
-                elapsed = time.time() - start
-                times.append(elapsed)
+                times.append((time.perf_counter_ns() - start) / 1e9)
             
             avg_time = statistics.mean(times) * 1000
             min_time = min(times) * 1000
             max_time = max(times) * 1000
             std_dev = statistics.stdev(times) * 1000 if len(times) > 1 else 0
+            times_ms = [t * 1000 for t in times]
+            p50, p95, p99 = (percentile(times_ms, q) for q in (50, 95, 99))
             
             result = {
                 "query": query,
@@ -66,11 +72,16 @@ def benchmark_current_store(iterations: int = 5):
                 "min_time": min(times),
                 "max_time": max(times),
                 "std_dev": std_dev / 1000,
-                "results_count": len(docs)
+                "p50_ms": p50,
+                "p95_ms": p95,
+                "p99_ms": p99,
+                "results_count": len(docs),
+                "times": times
             }
             results.append(result)
             
             print(f"  ⏱️  Promedio: {avg_time:.2f}ms | Min: {min_time:.2f}ms | Max: {max_time:.2f}ms | Std: {std_dev:.2f}ms")
+            print(f"  📈 p50: {p50:.2f}ms | p95: {p95:.2f}ms | p99: {p99:.2f}ms")
             print(f"  📊 Resultados: {len(docs)}")
         
         # Resumen
@@ -82,11 +93,46 @@ def benchmark_current_store(iterations: int = 5):
         overall_min = min([r['min_time'] for r in results]) * 1000
         overall_max = max([r['max_time'] for r in results]) * 1000
         overall_std = statistics.mean([r['std_dev'] for r in results]) * 1000
+        all_times = [t * 1000 for r in results for t in r['times']]
+        overall_p50, overall_p95, overall_p99 = (percentile(all_times, q) for q in (50, 95, 99))
         
         print(f"Tiempo promedio: {overall_avg:.2f}ms")
         print(f"Tiempo mínimo:   {overall_min:.2f}ms")
         print(f"Tiempo máximo:   {overall_max:.2f}ms")
         print(f"Desviación std:  {overall_std:.2f}ms")
+        print(f"p50 / p95 / p99: {overall_p50:.2f}ms / {overall_p95:.2f}ms / {overall_p99:.2f}ms")
+        
+        if output:
+            rows = [
+                {
+                    "store": VECTOR_STORE_TYPE.value,
+                    "query": r["query"],
+                    "avg_ms": round(r["avg_time"] * 1000, 3),
+                    "min_ms": round(r["min_time"] * 1000, 3),
+                    "max_ms": round(r["max_time"] * 1000, 3),
+                    "std_ms": round(r["std_dev"] * 1000, 3),
+                    "p50_ms": round(r["p50_ms"], 3),
+                    "p95_ms": round(r["p95_ms"], 3),
+                    "p99_ms": round(r["p99_ms"], 3),
+                    "results_count": r["results_count"],
+                }
+                for r in results
+            ]
+            rows.append({
+                "store": VECTOR_STORE_TYPE.value,
+                "query": "*",
+                "avg_ms": round(overall_avg, 3),
+                "min_ms": round(overall_min, 3),
+                "max_ms": round(overall_max, 3),
+                "std_ms": round(overall_std, 3),
+                "p50_ms": round(overall_p50, 3),
+                "p95_ms": round(overall_p95, 3),
+                "p99_ms": round(overall_p99, 3),
+            })
+            index = vectordb.index_info() if hasattr(vectordb, "index_info") else None
+            environment = collect_environment(index={VECTOR_STORE_TYPE.value: index} if index else {})
+            save_results(output, "search", rows, {"queries": len(queries), "iterations": iterations, "k": 3}, environment)
+            print(f"\n💾 Resultados guardados en {output}")
         
         return results
         
@@ -96,13 +142,24 @@ def benchmark_current_store(iterations: int = 5):
 
 def main():
     """Función principal"""
+    parser = argparse.ArgumentParser(description="Benchmark del vector store configurado")
+    parser.add_argument("--queries-file", type=Path, help="Archivo con una query por línea (p. ej. de generate_corpus.py)")
+    parser.add_argument("--max-queries", type=int, default=20, help="Máximo de queries tomadas del archivo")
+    parser.add_argument("--iterations", type=int, default=5, help="Repeticiones por query")
+    parser.add_argument("--output", type=Path, help="Guardar los resultados con metadatos del entorno (.json o .csv)")
+    args = parser.parse_args()
+    queries = TEST_QUERIES
+    if args.queries_file:
+        queries = [line.strip() for line in args.queries_file.read_text(encoding="utf-8").splitlines() if line.strip()]
+        queries = queries[:args.max_queries]
+    
     print("🚀 Benchmarking Simplificado")
     print("="*80)
     print(f"\n📝 Vector Store configurado: {VECTOR_STORE_TYPE.value.upper()}")
     print("💡 Para probar otro vector store, cambia VECTOR_STORE_TYPE en backend/.env")
     print("   y ejecuta este script nuevamente\n")
     
-    benchmark_current_store(iterations=5)
+    benchmark_current_store(iterations=args.iterations, queries=queries, output=args.output)
     
     print("\n" + "="*80)
     print("💡 Para comparar con otros vector stores:")
@@ -0,0 +1,132 @@
+"""
+Exporta el modelo de embeddings (sentence-transformers) a ONNX para EMBEDDING_BACKEND=onnx
+Genera en EMBEDDING_ONNX_PATH/<modelo>:
+- model.onnx (float32) y model_int8.onnx (cuantización dinámica de pesos a int8)
+- el tokenizer y export.json (pooling, normalización, longitud máxima, dimensión)
+
+Al terminar compara los vectores de cada archivo con los del modelo PyTorch en unas
+frases de prueba; la comparación completa está en benchmark_embeddings.py.
+
+Requiere: pip install onnx onnxruntime
+
+Uso (desde backend/):
+    python ../scripts/export_onnx_embeddings.py
+    python ../scripts/export_onnx_embeddings.py --model sentence-transformers/all-MiniLM-L6-v2 --no-int8
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Agregar el backend al path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+import numpy as np
+from config import EMBEDDING_MODEL, EMBEDDING_ONNX_PATH, EmbeddingBackend
+from embeddings import create_embeddings
+from embeddings.disk_cache import model_slug
+from embeddings.onnx_backend import EXPORT_META_FILE, FLOAT_MODEL_FILE, INT8_MODEL_FILE
+
+CHECK_SENTENCES = [
+    "¿Cuándo inicia el cuarto retiro de AFP?",
+    "El monto máximo de retiro es de 4 UIT.",
+    "Los afiliados pueden presentar su solicitud según el último dígito de su DNI.",
+]
+
+def export_model(model_name: str, output_dir: Path, opset: int = 14) -> dict:
+    """Exporta el transformer a ONNX (ejes dinámicos de lote y secuencia) y guarda el tokenizer"""
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Normalize, Pooling
+    
+    model = SentenceTransformer(model_name, device="cpu")
+    transformer = model[0].auto_model.eval()
+    tokenizer = model.tokenizer
+    pooling = next(module for module in model if isinstance(module, Pooling))
+    normalize = any(isinstance(module, Normalize) for module in model)
+    
+    sample = tokenizer(CHECK_SENTENCES, padding=True, return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    
+    class _LastHiddenState(torch.nn.Module):
+        """Retorna solo los embeddings de tokens (el pooling se hace en onnx_backend)"""
+        
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+        
+        def forward(self, *inputs):
+            return self.model(**dict(zip(input_names, inputs))).last_hidden_state
+    
+    output_dir.mkdir(parents=True, exist_ok=True)
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    with torch.no_grad():
+        torch.onnx.export(
+            _LastHiddenState(transformer),
+            tuple(sample[name] for name in input_names),
+            str(output_dir / FLOAT_MODEL_FILE),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            do_constant_folding=True
+        )
+    tokenizer.save_pretrained(str(output_dir))
+    
+    meta = {
+        "model": model_name,
+        "pooling": pooling.get_pooling_mode_str(),
+        "normalize": normalize,
+        "max_seq_length": model.max_seq_length,
+        "dimension": model.get_sentence_embedding_dimension(),
+        "opset": opset,
+    }
+    (output_dir / EXPORT_META_FILE).write_text(json.dumps(meta, indent=2))
+    print(f"✅ {FLOAT_MODEL_FILE} exportado (pooling={meta['pooling']}, normalize={normalize}, dim={meta['dimension']})")
+    return meta
+
+def quantize_model(output_dir: Path) -> None:
+    """Cuantización dinámica: pesos de las capas lineales a int8, activaciones en float"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    quantize_dynamic(
+        model_input=str(output_dir / FLOAT_MODEL_FILE),
+        model_output=str(output_dir / INT8_MODEL_FILE),
+        weight_type=QuantType.QInt8
+    )
+    print(f"✅ {INT8_MODEL_FILE} generado")
+
+def check_vectors(model_name: str, backends) -> None:
+    """Similitud coseno mínima contra el modelo PyTorch en las frases de prueba"""
+    reference = np.asarray(create_embeddings(model_name, backend=EmbeddingBackend.TORCH).embed_documents(CHECK_SENTENCES))
+    for backend in backends:
+        vectors = np.asarray(create_embeddings(model_name, backend=backend).embed_documents(CHECK_SENTENCES))
+        cosine = (reference * vectors).sum(axis=1) / (
+            np.linalg.norm(reference, axis=1) * np.linalg.norm(vectors, axis=1)
+        )
+        print(f"   {backend.value:<10} coseno mínimo vs torch: {cosine.min():.5f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta el modelo de embeddings a ONNX (float32 e int8)")
+    parser.add_argument("--model", default=EMBEDDING_MODEL, help="Modelo sentence-transformers")
+    parser.add_argument("--output-dir", type=Path, default=None,
+                        help="Carpeta de salida (por defecto EMBEDDING_ONNX_PATH/<modelo>)")
+    parser.add_argument("--opset", type=int, default=14, help="Versión de opset ONNX")
+    parser.add_argument("--no-int8", action="store_true", help="No generar el modelo cuantizado")
+    args = parser.parse_args()
+    
+    output_dir = args.output_dir or EMBEDDING_ONNX_PATH / model_slug(args.model)
+    print(f"📦 Exportando {args.model} a {output_dir}...")
+    export_model(args.model, output_dir, opset=args.opset)
+    backends = [EmbeddingBackend.ONNX]
+    if not args.no_int8:
+        quantize_model(output_dir)
+        backends.append(EmbeddingBackend.ONNX_INT8)
+    
+    if args.output_dir is None:
+        print("\n🔍 Verificando vectores...")
+        check_vectors(args.model, backends)
+    print(f"\n💡 Activa el backend con EMBEDDING_BACKEND={backends[-1].value} en .env")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Generador de corpus sintético reproducible para benchmarking a escala
+Produce N chunks (10k–10M) agrupados por temas, con distribución de longitudes controlable,
+más un conjunto de queries de los mismos temas:
+    <carpeta>/docs/shard_XXXX/doc_XXXXXXX.txt   corpus (un párrafo por chunk)
+    <carpeta>/queries.txt                        una query por línea (queries.jsonl incluye el tema)
+    <carpeta>/corpus.json                        parámetros y tamaño del corpus
+La salida se consume directamente con:
+    python ingest.py --data-dir <carpeta>/docs
+    python ../scripts/benchmark_recall.py --data-dir <carpeta>/docs --queries-file <carpeta>/queries.txt
+    python ../scripts/load_test.py --queries-file <carpeta>/queries.txt
+Cada párrafo generado mide entre CHUNK_SIZE/2 y CHUNK_SIZE caracteres (por defecto), así que el
+splitter del ingest no lo divide ni lo une con otro: un párrafo = un chunk
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+# Agregar el backend al path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+import numpy as np
+from config import CHUNK_SIZE
+
+# El splitter conserva el separador "\n\n" al inicio de cada párrafo: cuenta para la longitud
+PARAGRAPH_SEPARATOR = "\n\n"
+MAX_PARAGRAPH_CHARS = CHUNK_SIZE - len(PARAGRAPH_SEPARATOR)
+
+SYLLABLES = [
+    "a", "e", "i", "o", "u", "ba", "be", "bi", "bo", "ca", "ce", "ci", "co", "cu", "da", "de", "di", "do",
+    "fa", "fe", "fi", "ga", "go", "la", "le", "li", "lo", "lu", "ma", "me", "mi", "mo", "na", "ne", "ni",
+    "no", "pa", "pe", "pi", "po", "ra", "re", "ri", "ro", "sa", "se", "si", "so", "ta", "te", "ti", "to",
+    "va", "ve", "vi", "za", "zo", "ción", "dad", "mente", "tra", "pre", "con", "des", "ar", "er", "ir", "al",
+]
+
+def make_vocabulary(rng: np.random.Generator, size: int, exclude: set) -> List[str]:
+    """Palabras pseudo-españolas únicas (2 a 4 sílabas)"""
+    words: List[str] = []
+    seen = set(exclude)
+    while len(words) < size:
+        length = int(rng.integers(2, 5))
+        word = "".join(SYLLABLES[i] for i in rng.integers(0, len(SYLLABLES), length))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+def zipf_weights(size: int, exponent: float) -> np.ndarray:
+    """Probabilidades ∝ 1/rango^exponente (pocas palabras o temas muy frecuentes)"""
+    weights = 1.0 / np.arange(1, size + 1) ** exponent
+    return weights / weights.sum()
+
+class CorpusGenerator:
+    """
+    Genera párrafos por temas: cada palabra sale del vocabulario del tema (con probabilidad
+    topic_ratio) o del vocabulario común, ambos con frecuencias Zipf. Los temas también
+    tienen popularidad Zipf, así que los clusters tienen tamaños distintos.
+    """
+    
+    def __init__(
+        self,
+        seed: int = 42,
+        topics: int = 100,
+        topic_vocab: int = 200,
+        background_vocab: int = 5000,
+        topic_ratio: float = 0.6,
+        topic_skew: float = 0.7,
+        mean_chars: float = 400,
+        sigma: float = 0.25,
+        min_chars: int = CHUNK_SIZE // 2 + 1,
+        max_chars: int = MAX_PARAGRAPH_CHARS
+    ):
+        self.rng = np.random.default_rng(seed)
+        self.topic_ratio = topic_ratio
+        self.mean_chars = mean_chars
+        self.sigma = sigma
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.background = make_vocabulary(self.rng, background_vocab, set())
+        self.topic_words = []
+        used = set(self.background)
+        for _ in range(topics):
+            words = make_vocabulary(self.rng, topic_vocab, used)
+            used.update(words)
+            self.topic_words.append(words)
+        self.topic_p = zipf_weights(topics, topic_skew)
+        self.topic_word_p = zipf_weights(topic_vocab, 1.1)
+        self.background_p = zipf_weights(background_vocab, 1.1)
+        average_word = np.mean([len(word) for word in self.background]) + 1
+        self._words_per_char = 1.0 / average_word
+    
+    def _words(self, topics: np.ndarray, counts: np.ndarray) -> List[List[str]]:
+        """Palabras de cada párrafo (vectorizado para todo el lote)"""
+        total = int(counts.sum())
+        owners = np.repeat(topics, counts)
+        from_topic = self.rng.random(total) < self.topic_ratio
+        topic_ranks = self.rng.choice(len(self.topic_word_p), total, p=self.topic_word_p)
+        background_ranks = self.rng.choice(len(self.background_p), total, p=self.background_p)
+        words = [
+            self.topic_words[owner][rank] if use_topic else self.background[background_rank]
+            for owner, rank, use_topic, background_rank in zip(owners, topic_ranks, from_topic, background_ranks)
+        ]
+        bounds = np.concatenate([[0], np.cumsum(counts)])
+        return [words[bounds[i]:bounds[i + 1]] for i in range(len(counts))]
+    
+    def paragraphs(self, count: int) -> List[Dict[str, Any]]:
+        """Genera count párrafos con su tema"""
+        topics = self.rng.choice(len(self.topic_p), count, p=self.topic_p)
+        lengths = self.rng.lognormal(np.log(self.mean_chars), self.sigma, count)
+        lengths = np.clip(lengths, self.min_chars, self.max_chars).astype(int)
+        # Palabras de sobra; el párrafo se recorta a la longitud objetivo
+        counts = (lengths * self._words_per_char * 1.5).astype(int) + 4
+        result = []
+        for topic, length, words in zip(topics, lengths, self._words(topics, counts)):
+            text = " ".join(words)
+            if len(text) >= length:
+                text = text[:text.rfind(" ", 0, length)]
+            # Se rellena con palabras comunes si el recorte quedó corto
+            while len(text) + 1 < self.min_chars:
+                text += " " + self.background[int(self.rng.integers(0, 50))]
+            result.append({"topic": int(topic), "text": text[0].upper() + text[1:] + "."})
+        return result
+    
+    def queries(self, count: int, min_words: int = 3, max_words: int = 8) -> List[Dict[str, Any]]:
+        """Queries cortas sobre los mismos temas (mayoría de palabras del tema)"""
+        topics = self.rng.choice(len(self.topic_p), count, p=self.topic_p)
+        counts = self.rng.integers(min_words, max_words + 1, count)
+        return [
+            {"topic": int(topic), "query": " ".join(words)}
+            for topic, words in zip(topics, self._words(topics, counts))
+        ]
+
+def generate(args) -> Dict[str, Any]:
+    """Escribe los archivos del corpus, las queries y los metadatos"""
+    generator = CorpusGenerator(
+        seed=args.seed,
+        topics=args.topics,
+        topic_vocab=args.topic_vocab,
+        background_vocab=args.background_vocab,
+        topic_ratio=args.topic_ratio,
+        topic_skew=args.topic_skew,
+        mean_chars=args.mean_chars,
+        sigma=args.sigma,
+        min_chars=args.min_chars,
+        max_chars=args.max_chars
+    )
+    output: Path = args.output_dir
+    docs_dir = output / "docs"
+    output.mkdir(parents=True, exist_ok=True)
+    if docs_dir.exists() and any(docs_dir.rglob("*.txt")):
+        if not args.force:
+            raise FileExistsError(f"{docs_dir} ya contiene documentos (usa --force para sobrescribir)")
+        for old in docs_dir.rglob("doc_*.txt"):
+            old.unlink()
+    
+    start = time.perf_counter()
+    written = 0
+    total_chars = 0
+    file_index = 0
+    while written < args.chunks:
+        count = min(args.chunks_per_file, args.chunks - written)
+        paragraphs = generator.paragraphs(count)
+        # Carpetas de 1000 archivos para no tener directorios enormes
+        path = docs_dir / f"shard_{file_index // 1000:04d}" / f"doc_{file_index:07d}.txt"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(PARAGRAPH_SEPARATOR.join(paragraph["text"] for paragraph in paragraphs) + "\n", encoding="utf-8")
+        written += count
+        total_chars += sum(len(paragraph["text"]) for paragraph in paragraphs)
+        file_index += 1
+        if file_index % 100 == 0:
+            print(f"   ... {written}/{args.chunks} chunks ({written / (time.perf_counter() - start):.0f}/s)")
+    
+    queries = generator.queries(args.queries)
+    (output / "queries.txt").write_text("".join(f"{item['query']}\n" for item in queries), encoding="utf-8")
+    with open(output / "queries.jsonl", "w", encoding="utf-8") as f:
+        for item in queries:
+            f.write(json.dumps(item, ensure_ascii=False) + "\n")
+    
+    metadata = {
+        "chunks": written,
+        "files": file_index,
+        "queries": len(queries),
+        "avg_chunk_chars": round(total_chars / written, 1) if written else 0,
+        "chunk_size": CHUNK_SIZE,
+        "params": {key: (str(value) if isinstance(value, Path) else value) for key, value in vars(args).items()},
+        "generation_seconds": round(time.perf_counter() - start, 2),
+    }
+    (output / "corpus.json").write_text(json.dumps(metadata, indent=2))
+    return metadata
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Genera un corpus sintético y queries para benchmarking")
+    parser.add_argument("--chunks", type=int, default=10000, help="Número de chunks a generar")
+    parser.add_argument("--output-dir", type=Path, default=Path("data_synthetic"), help="Carpeta de salida")
+    parser.add_argument("--queries", type=int, default=1000, help="Número de queries a generar")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--topics", type=int, default=100, help="Número de temas (clusters)")
+    parser.add_argument("--topic-vocab", type=int, default=200, help="Palabras propias de cada tema")
+    parser.add_argument("--background-vocab", type=int, default=5000, help="Palabras comunes a todos los temas")
+    parser.add_argument("--topic-ratio", type=float, default=0.6, help="Fracción de palabras del tema (más = clusters más separados)")
+    parser.add_argument("--topic-skew", type=float, default=0.7, help="Exponente Zipf de la popularidad de los temas (0 = uniforme)")
+    parser.add_argument("--mean-chars", type=float, default=400, help="Longitud media de los chunks (lognormal)")
+    parser.add_argument("--sigma", type=float, default=0.25, help="Dispersión de la longitud (sigma de la lognormal)")
+    parser.add_argument("--min-chars", type=int, default=CHUNK_SIZE // 2 + 1, help="Longitud mínima (menos que CHUNK_SIZE/2 permite que el splitter una chunks)")
+    parser.add_argument("--max-chars", type=int, default=MAX_PARAGRAPH_CHARS, help="Longitud máxima (más hace que el splitter divida los chunks)")
+    parser.add_argument("--chunks-per-file", type=int, default=1000, help="Chunks por archivo .txt")
+    parser.add_argument("--force", action="store_true", help="Sobrescribir un corpus existente en la carpeta")
+    args = parser.parse_args()
+    
+    print("🚀 Generando corpus sintético")
+    print("="*60)
+    try:
+        metadata = generate(args)
+    except FileExistsError as e:
+        print(f"❌ {e}")
+        return
+    print(f"\n✅ Corpus generado en {args.output_dir / 'docs'}")
+    print(f"   Chunks: {metadata['chunks']} en {metadata['files']} archivos (media {metadata['avg_chunk_chars']} caracteres)")
+    print(f"   Queries: {metadata['queries']} ({args.output_dir / 'queries.txt'})")
+    print(f"   Tiempo: {metadata['generation_seconds']:.1f}s")
+
+if __name__ == "__main__":
+    main()
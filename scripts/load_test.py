@@ -0,0 +1,293 @@
+"""
+Generador de carga concurrente para los vector stores y la API
+- Modo store: llama directamente a VectorStoreBase.asimilarity_search
+- Modo http: llama a /search o /afp-query de un servidor en marcha (requiere httpx)
+- Lazo cerrado (--concurrency): N clientes que envían la siguiente query al recibir la respuesta
+- Lazo abierto (--rate): llegadas a ritmo fijo o Poisson, independientes de las respuestas;
+  la latencia se mide desde el instante programado, así que incluye la espera en cola
+Cada escalón reporta throughput, latencias p50/p95/p99/p99.9 y tasa de error; los escalones
+suben hasta detectar saturación (el throughput deja de crecer o aparecen errores)
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Agregar el backend al path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from benchmark_results import collect_environment, disable_caches, save_results
+disable_caches()
+
+from retrieval_metrics import percentile
+
+# Queries de prueba
+TEST_QUERIES = [
+    "¿Cuándo inicia el cuarto retiro de AFP?",
+    "¿Cuánto es el monto máximo que puedo retirar?",
+    "¿Cómo sé cuándo me toca retirar según mi DNI?",
+    "¿Qué es una UIT y cuánto vale?",
+    "¿Puedo retirar en cualquier momento?",
+]
+
+DEFAULT_CONCURRENCY = [1, 2, 4, 8, 16, 32, 64, 128]
+
+class StepResult:
+    """Latencias (ns) y errores de un escalón de carga"""
+    
+    def __init__(self, label: str):
+        self.label = label
+        self.latencies_ns: List[int] = []
+        self.errors = 0
+        self.elapsed_s = 0.0
+        self.offered_qps: Optional[float] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        latencies_ms = [latency / 1e6 for latency in self.latencies_ns]
+        total = len(self.latencies_ns) + self.errors
+        return {
+            "step": self.label,
+            "requests": total,
+            "errors": self.errors,
+            "error_rate": round(self.errors / total, 4) if total else 0.0,
+            "throughput_qps": round(len(self.latencies_ns) / self.elapsed_s, 2) if self.elapsed_s else 0.0,
+            "p50_ms": round(percentile(latencies_ms, 50), 3),
+            "p95_ms": round(percentile(latencies_ms, 95), 3),
+            "p99_ms": round(percentile(latencies_ms, 99), 3),
+            "p999_ms": round(percentile(latencies_ms, 99.9), 3),
+            "max_ms": round(max(latencies_ms), 3) if latencies_ms else 0.0,
+            "offered_qps": round(self.offered_qps, 2) if self.offered_qps is not None else None,
+        }
+
+async def make_store_request(k: int) -> Tuple[Callable[[str], Awaitable[Any]], Callable[[], Awaitable[None]]]:
+    """(request, close) que consultan directamente el vector store configurado"""
+    from vector_stores import aclose_clients, get_vector_store
+    vectordb = get_vector_store()
+    if not vectordb.is_available():
+        raise RuntimeError("Vectorstore no disponible. Ejecuta 'python ingest.py' primero.")
+    
+    async def request(query: str):
+        return await vectordb.asimilarity_search(query, k=k)
+    
+    async def close():
+        await vectordb.aclose()
+        await aclose_clients()
+    
+    return request, close
+
+async def make_http_request(
+    url: str,
+    endpoint: str,
+    timeout: float,
+    max_connections: int
+) -> Tuple[Callable[[str], Awaitable[Any]], Callable[[], Awaitable[None]]]:
+    """(request, close) HTTP contra la API (un cliente con pool de conexiones compartido)"""
+    try:
+        import httpx
+    except ImportError:
+        raise RuntimeError("El modo http requiere httpx: pip install httpx")
+    client = httpx.AsyncClient(
+        base_url=url,
+        timeout=timeout,
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    )
+    
+    async def request(query: str):
+        if endpoint == "afp-query":
+            response = await client.post("/afp-query", json={"question": query})
+        else:
+            response = await client.get("/search", params={"query": query})
+        response.raise_for_status()
+        return response
+    
+    return request, client.aclose
+
+async def run_closed_loop(request, queries: List[str], concurrency: int, duration: float) -> StepResult:
+    """N clientes concurrentes durante duration segundos"""
+    result = StepResult(f"c={concurrency}")
+    deadline = time.perf_counter_ns() + int(duration * 1e9)
+    
+    async def client(offset: int):
+        i = offset
+        while time.perf_counter_ns() < deadline:
+            query = queries[i % len(queries)]
+            i += concurrency
+            start = time.perf_counter_ns()
+            try:
+                await request(query)
+                result.latencies_ns.append(time.perf_counter_ns() - start)
+            except Exception:
+                result.errors += 1
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(concurrency)))
+    result.elapsed_s = time.perf_counter() - start
+    return result
+
+async def run_open_loop(
+    request,
+    queries: List[str],
+    rate: float,
+    duration: float,
+    poisson: bool,
+    max_in_flight: int,
+    rng: random.Random
+) -> StepResult:
+    """Llegadas a rate queries/s durante duration segundos (sin esperar respuestas)"""
+    result = StepResult(f"rate={rate:g}")
+    in_flight = set()
+    
+    async def fire(query: str, scheduled_ns: int):
+        try:
+            await request(query)
+            # Desde el instante programado: el retraso por saturación cuenta como latencia
+            result.latencies_ns.append(time.perf_counter_ns() - scheduled_ns)
+        except Exception:
+            result.errors += 1
+    
+    start_ns = time.perf_counter_ns()
+    next_ns = start_ns
+    end_ns = start_ns + int(duration * 1e9)
+    i = 0
+    while next_ns < end_ns:
+        delay = (next_ns - time.perf_counter_ns()) / 1e9
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(in_flight) >= max_in_flight:
+            # Demasiadas peticiones pendientes: se descarta la llegada y se cuenta como error
+            result.errors += 1
+        else:
+            task = asyncio.ensure_future(fire(queries[i % len(queries)], next_ns))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        i += 1
+        interval = rng.expovariate(rate) if poisson else 1.0 / rate
+        next_ns += int(interval * 1e9)
+    if in_flight:
+        await asyncio.gather(*in_flight)
+    result.elapsed_s = (time.perf_counter_ns() - start_ns) / 1e9
+    result.offered_qps = i / duration
+    return result
+
+def is_saturated(previous: Optional[Dict[str, Any]], current: Dict[str, Any], min_gain: float, max_error_rate: float) -> bool:
+    """
+    Saturación: errores por encima del umbral, throughput que no crece al menos min_gain
+    respecto del escalón anterior o (lazo abierto) que no alcanza el ritmo de llegadas generado
+    """
+    if current["error_rate"] > max_error_rate:
+        return True
+    if current["offered_qps"] is not None:
+        return current["throughput_qps"] < current["offered_qps"] * (1 - min_gain)
+    if previous is None:
+        return False
+    return current["throughput_qps"] < previous["throughput_qps"] * (1 + min_gain)
+
+def print_header() -> None:
+    print(f"\n{'Escalón':<12} {'Req':>8} {'QPS':>10} {'p50':>9} {'p95':>9} {'p99':>9} {'p99.9':>9} {'Error %':>8}")
+    print("-" * 80)
+
+def print_step(step: Dict[str, Any]) -> None:
+    print(
+        f"{step['step']:<12} {step['requests']:>8} {step['throughput_qps']:>10.1f} {step['p50_ms']:>9.2f} "
+        f"{step['p95_ms']:>9.2f} {step['p99_ms']:>9.2f} {step['p999_ms']:>9.2f} {step['error_rate'] * 100:>8.2f}"
+    )
+
+def parse_number_list(value: str) -> List[float]:
+    return [float(item) for item in value.split(",") if item]
+
+async def run(args) -> List[Dict[str, Any]]:
+    queries = list(TEST_QUERIES)
+    if args.queries_file:
+        queries = [line.strip() for line in args.queries_file.read_text().splitlines() if line.strip()]
+    random.Random(args.seed).shuffle(queries)
+    
+    if args.mode == "http":
+        max_connections = args.max_in_flight if args.rate else int(max(args.concurrency))
+        request, close = await make_http_request(args.url, args.endpoint, args.timeout, max_connections)
+        target = f"{args.url}/{args.endpoint}"
+    else:
+        request, close = await make_store_request(args.k)
+        from config import VECTOR_STORE_TYPE
+        target = f"store {VECTOR_STORE_TYPE.value}"
+    
+    steps: List[Dict[str, Any]] = []
+    try:
+        print(f"🔥 Calentamiento ({args.warmup:.0f}s) contra {target}...")
+        await run_closed_loop(request, queries, 1, args.warmup)
+        print_header()
+        
+        rng = random.Random(args.seed)
+        loads = args.rate if args.rate else args.concurrency
+        for load in loads:
+            if args.rate:
+                result = await run_open_loop(request, queries, load, args.duration, args.arrival == "poisson", args.max_in_flight, rng)
+            else:
+                result = await run_closed_loop(request, queries, int(load), args.duration)
+            step = result.to_dict()
+            step["load"] = load
+            print_step(step)
+            saturated = is_saturated(
+                steps[-1] if steps else None,
+                step,
+                args.min_gain,
+                args.max_error_rate
+            )
+            steps.append(step)
+            if saturated and not args.no_stop:
+                print(f"\n🛑 Saturación alcanzada en {step['step']}")
+                break
+    finally:
+        await close()
+    return steps
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Prueba de carga con latencias por percentil y curva de saturación")
+    parser.add_argument("--mode", choices=["store", "http"], default="store", help="Vector store directo o API HTTP")
+    parser.add_argument("--url", default="http://localhost:8000", help="URL base de la API (modo http)")
+    parser.add_argument("--endpoint", choices=["search", "afp-query"], default="search", help="Endpoint a probar (modo http)")
+    parser.add_argument("--concurrency", type=parse_number_list, default=DEFAULT_CONCURRENCY, help="Escalones de concurrencia (lazo cerrado)")
+    parser.add_argument("--rate", type=parse_number_list, help="Escalones de queries/s (lazo abierto); reemplaza a --concurrency")
+    parser.add_argument("--arrival", choices=["uniform", "poisson"], default="poisson", help="Distribución de llegadas en lazo abierto")
+    parser.add_argument("--max-in-flight", type=int, default=1024, help="Peticiones pendientes máximas en lazo abierto")
+    parser.add_argument("--duration", type=float, default=10.0, help="Segundos por escalón")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Segundos de calentamiento")
+    parser.add_argument("-k", type=int, default=3, help="Resultados por query (modo store)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Timeout por petición HTTP (s)")
+    parser.add_argument("--queries-file", type=Path, help="Archivo con una query por línea")
+    parser.add_argument("--min-gain", type=float, default=0.05, help="Crecimiento mínimo de throughput para no considerar saturación")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="Tasa de error que se considera saturación")
+    parser.add_argument("--no-stop", action="store_true", help="Ejecutar todos los escalones aunque haya saturación")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, help="Guardar los escalones con metadatos del entorno (.json o .csv)")
+    args = parser.parse_args()
+    
+    print("🚀 Prueba de carga")
+    print("="*80)
+    try:
+        steps = asyncio.run(run(args))
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return
+    
+    if steps:
+        best = max(steps, key=lambda step: step["throughput_qps"])
+        print(f"\n📊 Throughput máximo: {best['throughput_qps']:.1f} QPS en {best['step']} (p99 {best['p99_ms']:.2f}ms)")
+    if args.output:
+        params = {
+            "mode": args.mode,
+            "target": args.url if args.mode == "http" else None,
+            "endpoint": args.endpoint if args.mode == "http" else None,
+            "loop": "open" if args.rate else "closed",
+            "arrival": args.arrival if args.rate else None,
+            "duration": args.duration,
+            "k": args.k,
+        }
+        save_results(args.output, "load", steps, params, collect_environment())
+        print(f"💾 Resultados guardados en {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Servidor simulado de la API REST de Pinecone (en memoria) para probar el ingest sin cuenta
+Implementa lo que usa el backend: listar, describir, crear y borrar índices (plano de control)
+y upsert, delete, query y describe_index_stats (plano de datos), ambos en el mismo puerto.
+
+Con --fail-rate y --latency-ms se inyectan errores 503/429 y latencia en los upserts para
+ver los reintentos con backoff y el efecto de REMOTE_UPSERT_CONCURRENCY. Con --query-latency-ms,
+--slow-query-rate y --slow-query-ms las consultas tienen latencia y una cola lenta, para ver el
+hedging, el plazo por consulta y el respaldo en la réplica FAISS (vector_stores/resilience.py).
+
+Uso:
+    python scripts/mock_pinecone.py --port 5080 --fail-rate 0.1 --latency-ms 50
+    
+    # en backend/.env (o como variables de entorno):
+    VECTOR_STORE_TYPE=pinecone
+    PINECONE_API_KEY=mock
+    PINECONE_HOST=http://localhost:5080
+    python ingest.py --full
+
+También sirve Pinecone Local (docker run -p 5080-5090:5080-5090 ghcr.io/pinecone-io/pinecone-local),
+el emulador oficial, con el mismo PINECONE_HOST.
+"""
+import argparse
+import json
+import math
+import random
+import signal
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+class MockPinecone:
+    """Índices en memoria y contadores de peticiones"""
+    
+    def __init__(
+        self,
+        address: str,
+        fail_rate: float = 0.0,
+        latency_ms: float = 0.0,
+        query_latency_ms: float = 0.0,
+        slow_query_rate: float = 0.0,
+        slow_query_ms: float = 0.0
+    ):
+        self.address = address
+        self.fail_rate = fail_rate
+        self.latency_ms = latency_ms
+        self.query_latency_ms = query_latency_ms
+        self.slow_query_rate = slow_query_rate
+        self.slow_query_ms = slow_query_ms
+        self.indexes: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.upserted = 0
+        self.injected_failures = 0
+        self.queries = 0
+        self.slow_queries = 0
+    
+    def index_model(self, name: str) -> Dict[str, Any]:
+        index = self.indexes[name]
+        return {
+            "name": name,
+            "dimension": index["dimension"],
+            "metric": index["metric"],
+            # El plano de datos de cada índice cuelga del mismo servidor
+            "host": f"{self.address}/data/{name}",
+            "spec": {"serverless": {"cloud": "aws", "region": "us-east-1"}},
+            "status": {"ready": True, "state": "Ready"},
+            "deletion_protection": "disabled",
+            "vector_type": "dense",
+        }
+    
+    def control(self, method: str, parts: list, body: Dict[str, Any]) -> Tuple[int, Optional[Dict[str, Any]]]:
+        with self.lock:
+            if method == "GET" and len(parts) == 1:
+                return 200, {"indexes": [self.index_model(name) for name in self.indexes]}
+            if method == "POST" and len(parts) == 1:
+                name = body["name"]
+                if name in self.indexes:
+                    return 409, {"error": {"code": "ALREADY_EXISTS", "message": f"Index {name} already exists"}, "status": 409}
+                self.indexes[name] = {"dimension": body.get("dimension"), "metric": body.get("metric", "cosine"), "namespaces": {}}
+                return 201, self.index_model(name)
+            name = parts[1]
+            if name not in self.indexes:
+                return 404, {"error": {"code": "NOT_FOUND", "message": f"Index {name} not found"}, "status": 404}
+            if method == "GET":
+                return 200, self.index_model(name)
+            if method == "DELETE":
+                del self.indexes[name]
+                return 202, None
+        return 405, {"error": {"code": "INVALID_ARGUMENT", "message": "Método no soportado"}, "status": 405}
+    
+    def data(self, name: str, operation: str, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        if name not in self.indexes:
+            return 404, {"code": 5, "message": f"Index {name} not found"}
+        index = self.indexes[name]
+        namespace = index["namespaces"].setdefault(body.get("namespace", ""), {})
+        if operation == "vectors/upsert":
+            if self.latency_ms:
+                time.sleep(self.latency_ms / 1000)
+            if random.random() < self.fail_rate:
+                with self.lock:
+                    self.injected_failures += 1
+                return random.choice([(503, {"code": 14, "message": "Service unavailable (simulado)"}),
+                                      (429, {"code": 8, "message": "Too many requests (simulado)"})])
+            with self.lock:
+                for vector in body.get("vectors", []):
+                    namespace[vector["id"]] = (vector["values"], vector.get("metadata") or {})
+                self.upserted += len(body.get("vectors", []))
+            return 200, {"upsertedCount": len(body.get("vectors", []))}
+        if operation == "vectors/delete":
+            with self.lock:
+                if body.get("deleteAll"):
+                    namespace.clear()
+                for vector_id in body.get("ids") or []:
+                    namespace.pop(vector_id, None)
+            return 200, {}
+        if operation == "describe_index_stats":
+            count = sum(len(vectors) for vectors in index["namespaces"].values())
+            return 200, {
+                "namespaces": {ns: {"vectorCount": len(vectors)} for ns, vectors in index["namespaces"].items()},
+                "dimension": index["dimension"],
+                "indexFullness": 0.0,
+                "totalVectorCount": count,
+            }
+        if operation == "query":
+            delay = self.query_latency_ms
+            if random.random() < self.slow_query_rate:
+                delay = self.slow_query_ms
+                with self.lock:
+                    self.slow_queries += 1
+            with self.lock:
+                self.queries += 1
+            if delay:
+                time.sleep(delay / 1000)
+            query = body["vector"]
+            with self.lock:
+                items = list(namespace.items())
+            scored = sorted(((_cosine(query, values), vector_id, metadata) for vector_id, (values, metadata) in items), reverse=True)
+            matches = [
+                {"id": vector_id, "score": score, "metadata": metadata if body.get("includeMetadata") else None}
+                for score, vector_id, metadata in scored[:body.get("topK", 10)]
+            ]
+            return 200, {"matches": matches, "namespace": body.get("namespace", "")}
+        return 404, {"code": 12, "message": f"Operación {operation} no soportada"}
+
+def _cosine(a, b) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+def make_handler(mock: MockPinecone):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, como la API real
+        
+        def _handle(self, method: str) -> None:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+            parts = [part for part in self.path.split("?")[0].split("/") if part]
+            with mock.lock:
+                mock.requests += 1
+            if parts and parts[0] == "indexes":
+                status, payload = mock.control(method, parts, body)
+            elif len(parts) >= 3 and parts[0] == "data":
+                status, payload = mock.data(parts[1], "/".join(parts[2:]), body)
+            else:
+                status, payload = 404, {"message": "Ruta no encontrada"}
+            data = json.dumps(payload).encode() if payload is not None else b""
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        
+        def do_GET(self):
+            self._handle("GET")
+        
+        def do_POST(self):
+            self._handle("POST")
+        
+        def do_DELETE(self):
+            self._handle("DELETE")
+        
+        def log_message(self, format, *args):
+            pass
+    
+    return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description="API de Pinecone simulada en memoria (para probar el ingest)")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=5080)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fracción de upserts que responden 503/429")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latencia agregada a cada upsert")
+    parser.add_argument("--query-latency-ms", type=float, default=0.0, help="Latencia agregada a cada consulta")
+    parser.add_argument("--slow-query-rate", type=float, default=0.0, help="Fracción de consultas lentas (cola de latencia)")
+    parser.add_argument("--slow-query-ms", type=float, default=1000.0, help="Latencia de las consultas lentas")
+    args = parser.parse_args()
+    
+    mock = MockPinecone(
+        f"{args.host}:{args.port}",
+        fail_rate=args.fail_rate,
+        latency_ms=args.latency_ms,
+        query_latency_ms=args.query_latency_ms,
+        slow_query_rate=args.slow_query_rate,
+        slow_query_ms=args.slow_query_ms
+    )
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(mock))
+    print(f"🧪 Pinecone simulado en http://{args.host}:{args.port} (fallos {args.fail_rate:.0%}, latencia {args.latency_ms:.0f}ms)")
+    print(f"   PINECONE_HOST=http://{args.host}:{args.port} PINECONE_API_KEY=mock")
+    # kill / docker stop: mismo cierre que Ctrl+C (con el resumen de peticiones)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\n📊 {mock.requests} peticiones, {mock.upserted} vectores, {mock.injected_failures} fallos inyectados, {mock.queries} consultas ({mock.slow_queries} lentas)")
+
+if __name__ == "__main__":
+    main()
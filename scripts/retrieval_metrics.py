@@ -0,0 +1,90 @@
+"""
+Métricas de calidad de recuperación y utilidades comunes de los benchmarks
+- Ground truth exacto por fuerza bruta (NumPy)
+- recall@k, MRR y nDCG@k respecto de ese ground truth
+- Percentiles y frontera de Pareto (recall vs latencia)
+"""
+import math
+from typing import Any, Dict, List, Sequence
+import numpy as np
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int, block_size: int = 256) -> np.ndarray:
+    """
+    Vecinos más cercanos exactos por distancia L2 (fuerza bruta)
+    
+    Con embeddings normalizados el orden es el mismo que por similitud coseno,
+    así que sirve también para stores que usan coseno (Pinecone, Weaviate).
+    
+    Args:
+        corpus: Matriz (n, dim) de embeddings del corpus
+        queries: Matriz (q, dim) de embeddings de las queries
+        k: Vecinos por query
+        block_size: Queries por bloque (acota la memoria de la matriz de distancias)
+    
+    Returns:
+        Matriz (q, min(k, n)) con las filas del corpus ordenadas de más a menos cercana
+    """
+    k = min(k, len(corpus))
+    corpus_norms = np.einsum("ij,ij->i", corpus, corpus)
+    results = []
+    for start in range(0, len(queries), block_size):
+        block = queries[start:start + block_size]
+        # ||q - x||² = ||x||² - 2 q·x (+ ||q||², constante por query)
+        distances = corpus_norms[None, :] - 2.0 * block @ corpus.T
+        candidates = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        order = np.take_along_axis(distances, candidates, axis=1).argsort(axis=1, kind="stable")
+        results.append(np.take_along_axis(candidates, order, axis=1))
+    return np.vstack(results) if results else np.zeros((0, k), dtype=np.int64)
+
+def _unique(items: Sequence[str]) -> List[str]:
+    seen = set()
+    return [item for item in items if not (item in seen or seen.add(item))]
+
+def recall_at_k(retrieved: Sequence[str], truth: Sequence[str]) -> float:
+    """Fracción del top-k exacto que aparece en los resultados"""
+    truth_set = set(truth)
+    if not truth_set:
+        return 1.0
+    return len(truth_set & set(retrieved)) / len(truth_set)
+
+def reciprocal_rank(retrieved: Sequence[str], truth: Sequence[str]) -> float:
+    """1 / posición del vecino exacto más cercano en los resultados (0 si no está)"""
+    if not truth:
+        return 1.0
+    retrieved = _unique(retrieved)
+    return 1.0 / (retrieved.index(truth[0]) + 1) if truth[0] in retrieved else 0.0
+
+def ndcg_at_k(retrieved: Sequence[str], truth: Sequence[str]) -> float:
+    """
+    nDCG@k con relevancia graduada: el i-ésimo vecino exacto vale k - i
+    (los resultados que no están en el top-k exacto valen 0)
+    """
+    truth = _unique(truth)
+    if not truth:
+        return 1.0
+    k = len(truth)
+    gains = {item: k - i for i, item in enumerate(truth)}
+    dcg = sum(gains.get(item, 0) / math.log2(i + 2) for i, item in enumerate(_unique(retrieved)[:k]))
+    ideal = sum((k - i) / math.log2(i + 2) for i in range(k))
+    return dcg / ideal
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Percentil q (0-100) con interpolación lineal"""
+    if not values:
+        return 0.0
+    return float(np.percentile(np.asarray(values, dtype=np.float64), q))
+
+def pareto_frontier(points: List[Dict[str, Any]], quality: str = "recall", cost: str = "p50_ms") -> List[Dict[str, Any]]:
+    """
+    Puntos no dominados: ninguno otro tiene igual o mejor calidad con igual o menor costo
+    
+    Returns:
+        Puntos de la frontera ordenados por costo creciente
+    """
+    frontier = []
+    best_quality = -math.inf
+    for point in sorted(points, key=lambda p: (p[cost], -p[quality])):
+        if point[quality] > best_quality:
+            frontier.append(point)
+            best_quality = point[quality]
+    return frontier